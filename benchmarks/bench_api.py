@@ -0,0 +1,318 @@
+"""API load test against a large synthetic database.
+
+Builds a SQLite database of ``--products`` x ``--checks`` price_history rows
+with the ``src.models`` schema, plus the hourly/daily rollups. Building
+tens of millions of rows takes a while, so pass ``--db`` to keep the
+database and reuse it on later runs with the same settings.
+
+The FastAPI app is then driven in-process (httpx ASGITransport, no sockets)
+by ``--clients`` concurrent clients per endpoint. With ``--sweep``, products
+are checked against the mock server in a background thread the whole time,
+like a running scheduler. Per endpoint the report has requests/sec, p50/p99
+latency, errors, and the ``EXPLAIN QUERY PLAN`` of every statement the
+endpoint runs. Tables read by a full scan are listed under ``scans``. Output
+is JSON like bench_sweep, and ``--compare`` diffs against a previous report.
+
+Usage:
+    python -m benchmarks.bench_api --products 10000 --checks 2000 --db /tmp/api-20m.db --output api.json
+    python -m benchmarks.bench_api --products 10000 --checks 2000 --db /tmp/api-20m.db --sweep --compare api.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+from .bench_sweep import environment, percentile
+from .mock_server import MockConfig, start_servers
+
+ENDPOINT_METRICS = ('requests_per_sec', 'p50_ms', 'p99_ms')
+BATCH_ROWS = 100_000
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'  # how SQLAlchemy stores DateTime in SQLite
+
+
+def endpoints(products: int) -> dict:
+    """name -> function(rng) returning a request path."""
+    pid = lambda rng: rng.randint(1, products)  # noqa: E731
+    return {
+        'products': lambda rng: f"/products?limit=100&after={rng.randrange(max(1, products - 100))}",
+        'product': lambda rng: f"/products/{pid(rng)}",
+        'history': lambda rng: f"/products/{pid(rng)}/history?limit=100",
+        'history_30d': lambda rng: f"/products/{pid(rng)}/history?days=30&resolution=auto&limit=1000",
+        'history_batch': lambda rng: "/history?points=200&days=90&ids=" + ','.join(
+            str(pid(rng)) for _ in range(20)),
+        'stats': lambda rng: "/stats",
+    }
+
+
+# --- DATASET ---
+
+def configure_env(args, db_path: Path, workdir: Path):
+    """Settings must be in place before src.* is imported (the engines read them)."""
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+    os.environ.pop('ASYNC_DATABASE_URL', None)
+    os.environ['CAPTURE_DIR'] = str(workdir / 'captures')
+    os.environ['PARSE_WORKERS'] = str(args.parse_workers)
+    os.environ['SCRAPE_RATE'] = os.environ['SCRAPE_BURST'] = os.environ['SCRAPE_RATE_MAX'] = '1000'
+    os.environ['RESULT_CACHE_SECONDS'] = '0'  # the simulated sweep must really fetch
+    os.environ.pop('EMAIL_USER', None)  # never send alerts from a benchmark
+
+
+def generate(db_path: Path, args) -> dict:
+    """Fill a fresh database: products pointing at the mock hosts, one check per hour each, and rollups."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from src.history import rebuild_aggregates
+    from src.models import init_db
+
+    started = time.perf_counter()
+    for suffix in ('', '-wal', '-shm'):
+        Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+    engine = create_engine(f"sqlite:///{db_path}")
+    init_db(engine)
+    rng = random.Random(args.seed)
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    first = now - timedelta(hours=args.checks)
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=OFF")
+        products, batch = [], []
+        for pid in range(1, args.products + 1):
+            price = rng.uniform(500, 100_000)
+            for i in range(args.checks):
+                if rng.random() < 0.05:  # occasional price move
+                    price = max(1.0, round(price * rng.uniform(0.9, 1.1), 2))
+                batch.append((pid, round(price, 2), (first + timedelta(hours=i)).strftime(TIMESTAMP_FORMAT), 1))
+            products.append((pid, f'Synthetic product {pid}',
+                             f'http://127.0.0.{pid % args.hosts + 1}:{args.port}/dp/B{pid:09d}', f'B{pid:09d}',
+                             round(price * 0.9, 2), round(price, 2), now.strftime(TIMESTAMP_FORMAT),
+                             now.strftime(TIMESTAMP_FORMAT), 0))
+            if len(batch) >= BATCH_ROWS:
+                cursor.executemany("INSERT INTO price_history (product_id, price, timestamp, checks) "
+                                   "VALUES (?, ?, ?, ?)", batch)
+                batch = []
+        cursor.executemany("INSERT INTO price_history (product_id, price, timestamp, checks) VALUES (?, ?, ?, ?)",
+                           batch)
+        cursor.executemany("INSERT INTO products (id, title, url, asin, target_price, last_price, last_check, "
+                           "next_check_at, fail_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", products)
+        raw.commit()
+    finally:
+        raw.close()
+    with Session(engine) as db:
+        rebuild_aggregates(db)
+    engine.dispose()
+
+    dataset = {'products': args.products, 'checks': args.checks, 'seed': args.seed, 'hosts': args.hosts,
+               'port': args.port, 'rows': args.products * args.checks, 'generate_s': round(time.perf_counter() - started, 1)}
+    Path(f"{db_path}.json").write_text(json.dumps(dataset))
+    return dataset
+
+
+def load_or_generate(db_path: Path, args) -> dict:
+    """Reuse ``db_path`` if it was generated with the same scale, seed and mock hosts (product URLs)."""
+    meta = Path(f"{db_path}.json")
+    key = ('products', 'checks', 'seed', 'hosts', 'port')
+    if db_path.exists() and meta.exists():
+        dataset = json.loads(meta.read_text())
+        if all(dataset.get(name) == getattr(args, name) for name in key):
+            return {**dataset, 'reused': True}
+    print(f"[*] generating {args.products * args.checks:,} history rows into {db_path}", file=sys.stderr)
+    return {**generate(db_path, args), 'reused': False}
+
+
+# --- QUERY PLANS ---
+
+class StatementLog:
+    """Records the SQL the API's async engine runs while ``active``."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.active = False
+        self.statements = []
+        event.listen(engine.sync_engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active and statement.lstrip().upper().startswith('SELECT'):
+            self.statements.append((statement, parameters))
+
+
+def query_plans(statements) -> list:
+    """EXPLAIN QUERY PLAN for each distinct statement, with the tables it scans in full."""
+    from src.database import engine
+
+    plans, seen = [], set()
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters or ())).all()
+            detail = [row[-1] for row in rows]
+            plans.append({
+                'sql': ' '.join(statement.split()),
+                'plan': detail,
+                # "SCAN t" reads every row; "SCAN t USING (COVERING) INDEX" walks an index in order
+                'scans': [line.split()[1] for line in detail if line.startswith('SCAN') and 'INDEX' not in line],
+            })
+    return plans
+
+
+# --- LOAD ---
+
+async def drive(client: httpx.AsyncClient, make_path, clients: int, requests: int, seed: int) -> dict:
+    """``requests`` requests split over ``clients`` concurrent loops."""
+    latencies, errors = [], 0
+
+    async def loop(n: int, rng: random.Random):
+        nonlocal errors
+        for _ in range(n):
+            path = make_path(rng)
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(loop(requests // clients + (i < requests % clients), random.Random(seed + i))
+                           for i in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_sec': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(max(latencies, default=0.0), 2),
+    }
+
+
+class BackgroundSweep:
+    """Checks random batches of products in a loop on its own thread, like the scheduler."""
+
+    def __init__(self, products: int, batch: int, seed: int):
+        self.products, self.batch = products, batch
+        self.rng = random.Random(seed)
+        self.sweeps = self.checked = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='bench-sweep', daemon=True)
+
+    def _run(self):
+        from src.checker import check_prices_job
+
+        while not self._stop.is_set():
+            ids = self.rng.sample(range(1, self.products + 1), min(self.batch, self.products))
+            self.checked += check_prices_job(product_ids=ids).products
+            self.sweeps += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+async def run(args) -> dict:
+    from src.database import async_engine
+    from src.main import app
+
+    statements = StatementLog(async_engine)
+    report = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=120) as client:
+        for name, make_path in endpoints(args.products).items():
+            if args.endpoints and name not in args.endpoints:
+                continue
+            statements.active, statements.statements = True, []
+            (await client.get(make_path(random.Random(args.seed)))).raise_for_status()  # also the warm-up
+            statements.active = False
+            result = await drive(client, make_path, args.clients, args.requests, args.seed)
+            result['queries'] = query_plans(statements.statements)
+            report[name] = result
+            print(f"[*] {name}: {result['requests_per_sec']} req/s, p50 {result['p50_ms']} ms, "
+                  f"p99 {result['p99_ms']} ms", file=sys.stderr)
+    return report
+
+
+def compare(report: dict, baseline_path: str):
+    baseline = json.loads(Path(baseline_path).read_text())
+    print(f"\n{'endpoint':<16}{'metric':<18}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, result in report['endpoints'].items():
+        for metric in ENDPOINT_METRICS:
+            old, new = baseline['endpoints'].get(name, {}).get(metric), result[metric]
+            change = f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+            print(f"{name:<16}{metric:<18}{old if old is not None else '-':>12}{new:>12}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--checks', type=int, default=1000, help='history rows per product (one per hour)')
+    parser.add_argument('--db', help='keep the generated database here and reuse it when the scale matches')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent clients per endpoint')
+    parser.add_argument('--requests', type=int, default=500, help='requests per endpoint')
+    parser.add_argument('--endpoints', nargs='*', help='only these endpoints (default: all)')
+    parser.add_argument('--sweep', action='store_true', help='check products against the mock server meanwhile')
+    parser.add_argument('--sweep-batch', type=int, default=200, help='products per background sweep')
+    parser.add_argument('--hosts', type=int, default=4, help='mock Amazon hosts (127.0.0.1..N)')
+    parser.add_argument('--port', type=int, default=8768)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--parse-workers', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--compare', help='previous JSON report to diff against')
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='api-bench-'))
+    db_path = Path(args.db).resolve() if args.db else workdir / 'api.db'
+    configure_env(args, db_path, workdir)
+    dataset = load_or_generate(db_path, args)
+    dataset['db_bytes'] = db_path.stat().st_size
+
+    servers = start_servers(args.hosts, args.port, MockConfig(args.latency_ms, 10.0, 0.0, 0.0, 0.1, 400, args.seed)) \
+        if args.sweep else []
+    sweep = None
+    try:
+        if args.sweep:
+            with BackgroundSweep(args.products, args.sweep_batch, args.seed) as sweep:
+                results = asyncio.run(run(args))
+        else:
+            results = asyncio.run(run(args))
+    finally:
+        from src.scraper import close_client, shutdown_parse_pool
+        close_client()
+        shutdown_parse_pool()
+        for server in servers:
+            server.shutdown()
+
+    report = {
+        'params': vars(args),
+        'environment': environment(),
+        'dataset': dataset,
+        'sweep': {'sweeps': sweep.sweeps, 'products_checked': sweep.checked} if sweep else None,
+        'endpoints': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Compare the price extraction tiers on fixture pages.
+
+Each tier is timed through ``run_tier`` on a fresh ``Page``, i.e. the same
+per-class strategies ``extract_with`` runs, including the parse.
+
+Usage:
+    python -m benchmarks.bench_extract [--repeat 50] [--json]
+"""
+import json
+import argparse
+import statistics
+import time
+
+from src.extract import EXTRACTORS, Page, extract_price, is_captcha, run_tier
+
+from .fixtures import load_pages
+
+
+def time_call(func, content: bytes, repeat: int):
+    """Median milliseconds per call, plus the last return value."""
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(content)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def run(repeat: int) -> dict:
+    report = {}
+    for name, content in load_pages().items():
+        row = {'bytes': len(content)}
+        ms, blocked = time_call(is_captcha, content, repeat)
+        row['captcha_check'] = {'ms': round(ms, 3), 'result': blocked}
+        for tier, _ in EXTRACTORS:
+            ms, price = time_call(lambda c: run_tier(Page(c), tier), content, repeat)
+            row[tier] = {'ms': round(ms, 3), 'price': price}
+        ms, (price, tier) = time_call(extract_price, content, repeat)
+        row['pipeline'] = {'ms': round(ms, 3), 'price': price, 'tier': tier}
+        report[name] = row
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help='print machine-readable output')
+    args = parser.parse_args()
+
+    report = run(args.repeat)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    tiers = [name for name, _ in EXTRACTORS] + ['pipeline']
+    print(f"{'page':<16}{'KB':>8}" + ''.join(f'{t + " ms":>14}' for t in tiers))
+    for name, row in report.items():
+        print(f"{name:<16}{row['bytes'] / 1024:>8.0f}" + ''.join(f"{row[t]['ms']:>14.3f}" for t in tiers))
+
+
+if __name__ == '__main__':
+    main()
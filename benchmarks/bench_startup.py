@@ -0,0 +1,129 @@
+"""Cold-start benchmark for the API and the CLI entry points.
+
+Every measurement runs in a fresh interpreter against a throwaway SQLite
+database:
+
+* ``import_ms``: time to import each entry module (src.main, src.worker, src.tracker)
+* ``ready_ms``: ``uvicorn src.main:app`` launch until ``GET /`` answers
+* ``first_request_ms``: the first ``GET /products`` after that (opens the DB)
+
+Output is JSON like bench_sweep; ``--compare`` diffs against a previous report.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5 --output startup.json
+    python -m benchmarks.bench_startup --runs 5 --compare startup.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+import httpx
+
+from .bench_sweep import environment
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+MODULES = ('src.main', 'src.worker', 'src.tracker')
+KEY_METRICS = tuple(f'import_ms.{m}' for m in MODULES) + ('ready_ms', 'first_request_ms')
+
+IMPORT_PROBE = "import sys, time; t = time.perf_counter(); __import__(sys.argv[1]); print(time.perf_counter() - t)"
+
+
+def child_env(workdir: Path) -> dict:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get('PYTHONPATH')]))
+    env['DATABASE_URL'] = f"sqlite:///{workdir / 'startup.db'}"
+    env.pop('ASYNC_DATABASE_URL', None)
+    env['SCHEDULER_TICK_MINUTES'] = '1440'  # keep sweeps out of the measurement
+    return env
+
+
+def time_import(module: str, workdir: Path) -> float:
+    out = subprocess.run([sys.executable, '-c', IMPORT_PROBE, module], cwd=workdir, env=child_env(workdir),
+                         capture_output=True, text=True, check=True).stdout
+    return float(out.strip().splitlines()[-1]) * 1000
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def time_server(workdir: Path, timeout: float = 60.0) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'src.main:app', '--port', str(port)],
+                              cwd=workdir, env=child_env(workdir),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(timeout=5) as client:
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with {server.returncode}")
+                if time.perf_counter() - started > timeout:
+                    raise RuntimeError("server did not come up")
+                try:
+                    if client.get(f"{base}/").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.01)
+            ready = time.perf_counter() - started
+            t = time.perf_counter()
+            client.get(f"{base}/products").raise_for_status()
+            first = time.perf_counter() - t
+    finally:
+        server.terminate()
+        server.wait(10)
+    return {'ready_ms': round(ready * 1000, 1), 'first_request_ms': round(first * 1000, 2)}
+
+
+def compare(report: dict, baseline_path: str):
+    baseline = json.loads(Path(baseline_path).read_text())
+    print(f"\n{'metric':<26}{'baseline':>12}{'current':>12}{'change':>10}")
+    for metric in KEY_METRICS:
+        old, new = baseline['summary'].get(metric), report['summary'][metric]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+        print(f"{metric:<26}{old if old is not None else '-':>12}{new:>12}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--compare', help='previous JSON report to diff against')
+    args = parser.parse_args()
+
+    runs = []
+    for i in range(args.runs):
+        workdir = Path(tempfile.mkdtemp(prefix='startup-bench-'))
+        (workdir / 'data').mkdir()
+        run = {f'import_ms.{m}': round(time_import(m, workdir), 1) for m in MODULES}
+        run.update(time_server(workdir))
+        runs.append(run)
+        print(f"[*] run {i + 1}: ready {run['ready_ms']} ms, import src.main {run['import_ms.src.main']} ms",
+              file=sys.stderr)
+
+    report = {
+        'params': vars(args),
+        'environment': environment(),
+        'runs': runs,
+        'summary': {metric: round(statistics.median(r[metric] for r in runs), 2) for metric in KEY_METRICS},
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
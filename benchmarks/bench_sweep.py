@@ -0,0 +1,168 @@
+"""End-to-end sweep benchmark against the local mock server.
+
+Creates a throwaway SQLite database with N synthetic products pointing at
+``benchmarks.mock_server``. It then runs full ``check_prices_job`` sweeps
+and reports fetches/sec, parse ms/page, fetch latency p50/p99 and DB write
+time. Output is JSON (with parameters and environment), so runs can be
+diffed; ``--compare`` prints the change against a previous report.
+
+Usage:
+    python -m benchmarks.bench_sweep --products 500 --sweeps 3 --output sweep.json
+    python -m benchmarks.bench_sweep --products 500 --compare sweep.json
+"""
+import os
+import sys
+import json
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+from .mock_server import MockConfig, start_servers
+
+KEY_METRICS = ('fetches_per_sec', 'parse_ms_per_page', 'fetch_p50_ms', 'fetch_p99_ms', 'db_write_ms')
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def configure_env(args, workdir: Path):
+    """Settings must be in place before src.* is imported (the engine reads them)."""
+    os.environ['DATABASE_URL'] = f"sqlite:///{workdir / 'bench.db'}"
+    os.environ['CAPTURE_DIR'] = str(workdir / 'captures')
+    os.environ['SCRAPE_CONCURRENCY'] = str(args.concurrency)
+    os.environ['SCRAPE_PER_HOST'] = str(args.per_host)
+    os.environ['PARSE_WORKERS'] = str(args.parse_workers)
+    os.environ['SCRAPE_RATE'] = os.environ['SCRAPE_BURST'] = os.environ['SCRAPE_RATE_MAX'] = str(args.rate)
+    os.environ['CAPTCHA_COOLDOWN'] = str(args.cooldown)
+    os.environ.pop('EMAIL_USER', None)  # never send alerts from a benchmark
+    os.environ['RESULT_CACHE_SECONDS'] = '0'  # back-to-back sweeps must really fetch
+
+
+def seed_products(count: int, hosts: int, port: int):
+    from sqlalchemy import insert
+
+    from src.database import SessionLocal
+    from src.models import Product
+
+    rows = [
+        {
+            'title': f'Synthetic product {i}',
+            'url': f'http://127.0.0.{i % hosts + 1}:{port}/dp/B{i:09d}',
+            'target_price': 5000.0,  # below every mock price: no deal alerts
+        }
+        for i in range(count)
+    ]
+    db = SessionLocal()
+    try:
+        db.execute(insert(Product), rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+def sweep_metrics(stats) -> dict:
+    fetch_ms = [s * 1000 for s in stats.fetch_seconds]
+    return {
+        'products': stats.products,
+        'seconds': round(stats.seconds, 3),
+        'fetches_per_sec': round(len(fetch_ms) / stats.seconds, 2) if stats.seconds else 0.0,
+        'parse_ms_per_page': round(statistics.mean(stats.parse_seconds) * 1000, 3) if stats.parse_seconds else 0.0,
+        'fetch_p50_ms': round(percentile(fetch_ms, 50), 2),
+        'fetch_p99_ms': round(percentile(fetch_ms, 99), 2),
+        'db_write_ms': round(stats.db_seconds * 1000, 2),
+        'rows_written': stats.rows_written,
+        'checks_written': stats.checks_written,
+        'outcomes': dict(stats.outcomes),
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'cpus': os.cpu_count(), 'commit': commit, 'started': datetime.utcnow().isoformat()}
+
+
+def compare(report: dict, baseline_path: str):
+    baseline = json.loads(Path(baseline_path).read_text())
+    print(f"\n{'metric':<20}{'baseline':>12}{'current':>12}{'change':>10}")
+    for metric in KEY_METRICS:
+        old, new = baseline['summary'][metric], report['summary'][metric]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+        print(f"{metric:<20}{old:>12}{new:>12}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--sweeps', type=int, default=3)
+    parser.add_argument('--hosts', type=int, default=4, help='loopback addresses to spread products over')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--latency-ms', type=float, default=100.0)
+    parser.add_argument('--jitter-ms', type=float, default=50.0)
+    parser.add_argument('--captcha-rate', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--change-rate', type=float, default=0.1)
+    parser.add_argument('--page-kb', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--per-host', type=int, default=8)
+    parser.add_argument('--parse-workers', type=int, default=0)
+    parser.add_argument('--rate', type=float, default=1000.0, help='per-host requests/sec for the rate limiter')
+    parser.add_argument('--cooldown', type=float, default=1.0, help='CAPTCHA cooldown seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--compare', help='previous JSON report to diff against')
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='sweep-bench-'))
+    configure_env(args, workdir)
+    config = MockConfig(args.latency_ms, args.jitter_ms, args.captcha_rate, args.error_rate,
+                        args.change_rate, args.page_kb, args.seed)
+    servers = start_servers(args.hosts, args.port, config)
+
+    from src.checker import check_prices_job
+    from src.database import engine
+    from src.models import init_db
+    from src.scraper import close_client, shutdown_parse_pool
+
+    init_db(engine)
+    seed_products(args.products, args.hosts, args.port)
+    sweeps = []
+    try:
+        for i in range(args.sweeps):
+            metrics = sweep_metrics(check_prices_job(force=True))
+            sweeps.append(metrics)
+            print(f"[*] sweep {i + 1}: {metrics['fetches_per_sec']} fetches/s, "
+                  f"p99 {metrics['fetch_p99_ms']} ms, outcomes {metrics['outcomes']}", file=sys.stderr)
+    finally:
+        close_client()
+        shutdown_parse_pool()
+        for server in servers:
+            server.shutdown()
+
+    report = {
+        'params': vars(args),
+        'environment': environment(),
+        'sweeps': sweeps,
+        'summary': {metric: round(statistics.median(s[metric] for s in sweeps), 3) for metric in KEY_METRICS},
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Fixture pages for the scraper benchmarks.
+
+Real pages saved from Amazon can be dropped into ``benchmarks/fixtures/``
+(``*.html``); the file name (without extension) is used as the fixture
+name. When none are present, deterministic synthetic pages shaped like a
+product page (head, inline scripts, nav, carousels, buy box deep in the
+body) are generated instead.
+"""
+import random
+from pathlib import Path
+from typing import Dict
+
+FIXTURE_DIR = Path(__file__).parent / 'fixtures'
+
+# Buy-box markup for each layout Amazon serves
+PRICE_BLOCKS = {
+    'core': (
+        '<div id="corePriceDisplay_desktop_feature_div"><div class="a-section">'
+        '<span class="a-price aok-align-center priceToPay"><span class="a-offscreen">₹{price:,.2f}</span>'
+        '<span aria-hidden="true"><span class="a-price-symbol">₹</span>'
+        '<span class="a-price-whole">{whole:,}<span class="a-price-decimal">.</span></span></span></span>'
+        '</div></div>'
+    ),
+    'apex': (
+        '<div id="apex_desktop"><div class="a-section">'
+        '<span class="a-price a-text-price a-size-medium apexPriceToPay">'
+        '<span class="a-offscreen">₹{price:,.2f}</span><span aria-hidden="true">₹{price:,.2f}</span></span>'
+        '</div></div>'
+    ),
+}
+
+CAPTCHA_PAGE = (
+    '<!doctype html><html><head><title>Amazon.in</title></head><body>'
+    '<form method="get" action="/errors/validateCaptcha"><h4>Enter the characters you see below</h4>'
+    "<p>Sorry, we just need to make sure you're not a robot.</p>"
+    '<input name="field-keywords"></form></body></html>'
+)
+
+ERROR_PAGE = (
+    '<!doctype html><html><head><title>503 - Service Unavailable</title></head>'
+    '<body><p>Sorry! Something went wrong on our end.</p></body></html>'
+)
+
+
+def _filler(rng: random.Random, size: int) -> str:
+    """Markup noise: nav links, inline JSON blobs and carousel cards."""
+    parts, total = [], 0
+    while total < size:
+        kind = rng.random()
+        if kind < 0.4:
+            chunk = ''.join(f'<li><a href="/s?k=item{rng.randrange(10**6)}&ref=nav_{i}">Category {i}</a></li>'
+                            for i in range(20))
+            chunk = f'<ul class="nav-list">{chunk}</ul>'
+        elif kind < 0.7:
+            chunk = '<script type="text/javascript">P.when("A").execute(function(){var d=%s;});</script>' % (
+                '{' + ','.join(f'"k{i}":"{rng.randrange(10**9):x}"' for i in range(40)) + '}')
+        else:
+            chunk = ''.join(
+                f'<div class="a-carousel-card"><span class="a-size-base">Rated {rng.randrange(1, 5)}.{rng.randrange(10)}'
+                f' out of 5</span><span class="a-color-secondary">{rng.randrange(1000)} reviews</span></div>'
+                for _ in range(8))
+        parts.append(chunk)
+        total += len(chunk)
+    return ''.join(parts)
+
+
+def product_page(price: float = 52990.0, layout: str = 'core', size: int = 400_000, seed: int = 0) -> str:
+    """Synthetic product page of roughly ``size`` characters with the buy box ~40% in."""
+    rng = random.Random(seed)
+    block = PRICE_BLOCKS[layout].format(price=price, whole=int(price))
+    head = '<!doctype html><html lang="en-in"><head><title>Product</title>' + _filler(rng, size // 5) + '</head><body>'
+    before = _filler(rng, size // 5)
+    after = _filler(rng, size * 3 // 5)
+    return f'{head}<div id="dp">{before}<div id="centerCol">{block}</div>{after}</div></body></html>'
+
+
+def captcha_page() -> str:
+    return CAPTCHA_PAGE
+
+
+def error_page() -> str:
+    return ERROR_PAGE
+
+
+def load_pages() -> Dict[str, bytes]:
+    """Saved fixture pages if any exist, otherwise the synthetic set."""
+    saved = {path.stem: path.read_bytes() for path in sorted(FIXTURE_DIR.glob('*.html'))}
+    if saved:
+        return saved
+    return {
+        'product_core': product_page(layout='core').encode(),
+        'product_apex': product_page(layout='apex', seed=1).encode(),
+        'captcha': captcha_page().encode(),
+    }
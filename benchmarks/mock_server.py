@@ -0,0 +1,124 @@
+"""Local stand-in for Amazon product pages.
+
+Serves product, CAPTCHA and 503 pages with configurable latency and
+failure rates. Every ``/dp/<ASIN>`` path is a product, and its price is
+derived from the ASIN, so runs with the same seed see the same pages.
+HTTP/1.1 keep-alive is supported so connection pooling behaves as in
+production.
+
+Standalone:
+    python -m benchmarks.mock_server --port 8800 --latency-ms 150 --captcha-rate 0.02
+"""
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .fixtures import captcha_page, error_page, product_page
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 100.0
+    jitter_ms: float = 50.0
+    captcha_rate: float = 0.0
+    error_rate: float = 0.0
+    change_rate: float = 0.1  # chance a product shows its alternate price
+    page_kb: int = 400
+    seed: int = 0
+
+
+class MockAmazon(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: MockConfig, stream: int = 0):
+        super().__init__(address, MockHandler)
+        self.config = config
+        self.rng = random.Random(config.seed * 1000 + stream)  # independent but reproducible per host
+        self.rng_lock = threading.Lock()
+        self.requests = 0
+        # Pre-rendered variants; rendering 400 KB per request would benchmark the server instead
+        self.pages = {
+            (layout, variant): product_page(price=10000 + 1000 * variant, layout=layout,
+                                            size=config.page_kb * 1024, seed=variant).encode()
+            for layout in ('core', 'apex') for variant in range(8)
+        }
+        self.captcha = captcha_page().encode()
+        self.error = error_page().encode()
+
+    def roll(self) -> float:
+        with self.rng_lock:
+            self.requests += 1
+            return self.rng.random()
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: MockAmazon
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        config = self.server.config
+        delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000)
+
+        roll = self.server.roll()
+        if roll < config.error_rate:
+            return self.respond(503, self.server.error)
+        if roll < config.error_rate + config.captcha_rate:
+            return self.respond(200, self.server.captcha)
+
+        asin = self.path.rstrip('/').split('/')[-1].split('?')[0]
+        base = sum(asin.encode()) % 8
+        variant = (base + 1) % 8 if self.server.roll() < config.change_rate else base
+        layout = 'apex' if base % 4 == 0 else 'core'
+        self.respond(200, self.server.pages[(layout, variant)])
+
+    def respond(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_servers(hosts: int, port: int, config: MockConfig):
+    """Start one server per loopback address (127.0.0.1 .. 127.0.0.N) so per-host limits apply."""
+    servers = []
+    for i in range(1, hosts + 1):
+        server = MockAmazon((f'127.0.0.{i}', port), config, stream=i)
+        threading.Thread(target=server.serve_forever, name=f'mock-amazon-{i}', daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--hosts', type=int, default=1)
+    parser.add_argument('--latency-ms', type=float, default=100.0)
+    parser.add_argument('--jitter-ms', type=float, default=50.0)
+    parser.add_argument('--captcha-rate', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--change-rate', type=float, default=0.1)
+    parser.add_argument('--page-kb', type=int, default=400)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency_ms, args.jitter_ms, args.captcha_rate, args.error_rate,
+                        args.change_rate, args.page_kb, args.seed)
+    start_servers(args.hosts, args.port, config)
+    print(f"[v] Mock Amazon on 127.0.0.1-{args.hosts}:{args.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""Non-blocking email alerts.
+
+Deals are pushed onto a queue and sent by one background thread, so a
+sweep never waits on SMTP. The thread:
+
+* keeps one SMTP_SSL session open and reuses it (checked with NOOP first)
+* batches deals that arrive within ALERT_DIGEST_SECONDS into one digest
+* retries failed sends with exponential backoff (ALERT_MAX_RETRIES)
+* drops repeats: a product re-alerts only if its price falls further, or
+  ALERT_DEDUPE_HOURS have passed since its last alert
+
+Queue workers each have their own dispatcher, so ``worker.py`` sets
+``session_factory`` and the dedupe decision is also claimed atomically in
+the shared ``alerts_sent`` table; whichever worker claims a deal sends it.
+"""
+import logging
+import os
+import ssl
+import time
+import queue
+import smtplib
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import ALERT_DELIVERY_SECONDS, ALERT_QUEUE_DEPTH, ALERT_SEND_SECONDS
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class Deal:
+    title: str
+    price: float
+    link: str
+    target_price: Optional[float] = None
+    found_at: datetime = field(default_factory=datetime.utcnow)
+
+
+def compose(deals: List[Deal], sender: str, receiver: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg['From'] = sender
+    msg['To'] = receiver
+    if len(deals) == 1:
+        deal = deals[0]
+        msg['Subject'] = f"🚨 Price Drop Alert: {deal.title} is ₹{deal.price}!"
+        msg.set_content(f"Great news! The price for {deal.title} has dropped to ₹{deal.price}!\n\nBuy Now: {deal.link}")
+        return msg
+
+    msg['Subject'] = f"🚨 {len(deals)} Price Drops: {', '.join(d.title for d in deals[:3])}" + ("…" if len(deals) > 3 else "")
+    lines = ["Great news! These products dropped to or below your target:\n"]
+    for deal in deals:
+        target = f" (Target: ₹{deal.target_price})" if deal.target_price else ""
+        lines.append(f"• {deal.title}: ₹{deal.price}{target}\n  {deal.link}")
+    msg.set_content("\n".join(lines))
+    return msg
+
+
+class AlertDispatcher:
+    """Single background sender. Settings are read from the environment when used."""
+
+    def __init__(self):
+        self.queue: queue.Queue = queue.Queue()
+        self.sent_count = 0
+        self.failed_count = 0
+        self._alerted: Dict[str, Tuple[float, datetime]] = {}  # link -> (price, when)
+        self.session_factory = None  # set to share dedupe state through the database
+        self._lock = threading.Lock()
+        self._smtp: Optional[smtplib.SMTP_SSL] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def digest_seconds(self) -> float:
+        return float(os.getenv('ALERT_DIGEST_SECONDS', 30))
+
+    @property
+    def dedupe_window(self) -> timedelta:
+        return timedelta(hours=float(os.getenv('ALERT_DEDUPE_HOURS', 24)))
+
+    @property
+    def max_retries(self) -> int:
+        return int(os.getenv('ALERT_MAX_RETRIES', 3))
+
+    # --- producer side (any thread) ---
+
+    def submit(self, deal: Deal) -> bool:
+        """Queue a deal unless it duplicates a recent alert. Returns True if queued."""
+        with self._lock:
+            previous = self._alerted.get(deal.link)
+            if previous and deal.price >= previous[0] and deal.found_at - previous[1] < self.dedupe_window:
+                return False
+            if self.session_factory is not None and not self._claim(deal):
+                return False
+            self._alerted[deal.link] = (deal.price, deal.found_at)
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='alert-dispatcher', daemon=True)
+                self._thread.start()
+        self.queue.put(deal)
+        return True
+
+    def _claim(self, deal: Deal) -> bool:
+        """Record the alert in ``alerts_sent`` unless another process already alerted this deal."""
+        from sqlalchemy import or_
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        from .models import AlertSent
+
+        db = self.session_factory()
+        try:
+            insert = pg_insert if db.bind.dialect.name == 'postgresql' else sqlite_insert
+            stmt = insert(AlertSent).values(link=deal.link, price=deal.price, alerted_at=deal.found_at)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['link'],
+                set_={'price': stmt.excluded.price, 'alerted_at': stmt.excluded.alerted_at},
+                where=or_(stmt.excluded.price < AlertSent.price,
+                          AlertSent.alerted_at <= deal.found_at - self.dedupe_window),
+            )
+            claimed = db.execute(stmt).rowcount == 1
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def _release(self, deals: List[Deal]):
+        """Drop this process's claims for deals that could not be sent, so they alert again."""
+        from sqlalchemy import delete, tuple_
+
+        from .models import AlertSent
+
+        db = self.session_factory()
+        try:
+            db.execute(delete(AlertSent).where(
+                tuple_(AlertSent.link, AlertSent.alerted_at).in_([(d.link, d.found_at) for d in deals])))
+            db.commit()
+        finally:
+            db.close()
+
+    def close(self, timeout: float = 10.0):
+        """Send whatever is queued, then end the SMTP session."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._disconnect()
+
+    # --- dispatcher thread ---
+
+    def _run(self):
+        while not (self._stop.is_set() and self.queue.empty()):
+            try:
+                batch = [self.queue.get(timeout=1)]
+            except queue.Empty:
+                continue
+            # Collect everything else that arrives within the digest window
+            deadline = time.monotonic() + (0 if self._stop.is_set() else self.digest_seconds)
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, remaining)) if remaining > 0 else self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._deliver(batch)
+
+    def _deliver(self, deals: List[Deal]):
+        sender = os.getenv('EMAIL_USER')
+        password = os.getenv('EMAIL_PASS')
+        receiver = os.getenv('EMAIL_RECEIVER')
+        if not sender or not password:
+            log.warning("Skipping email: Credentials missing in .env")
+            return
+
+        msg = compose(deals, sender, receiver)
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._session(sender, password).send_message(msg)
+                self.sent_count += 1
+                ALERT_SEND_SECONDS.labels('sent').observe(time.perf_counter() - started)
+                now = datetime.utcnow()
+                for deal in deals:
+                    ALERT_DELIVERY_SECONDS.observe((now - deal.found_at).total_seconds())
+                log.info(f"Email sent for {', '.join(d.title for d in deals)}", extra={'deals': len(deals)})
+                return
+            except Exception as e:
+                self._disconnect()
+                if attempt == self.max_retries:
+                    break
+                delay = 2 ** (attempt + 1)
+                log.warning(f"Email error: {e} (retrying in {delay}s)")
+                time.sleep(delay)
+
+        self.failed_count += 1
+        ALERT_SEND_SECONDS.labels('failed').observe(time.perf_counter() - started)
+        log.error(f"Email failed after {self.max_retries + 1} attempts; deals will alert again next check")
+        with self._lock:
+            for deal in deals:
+                self._alerted.pop(deal.link, None)
+        if self.session_factory is not None:
+            self._release(deals)
+
+    def _session(self, sender: str, password: str) -> smtplib.SMTP_SSL:
+        """The open SMTP session if it still answers NOOP, else a fresh login."""
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except smtplib.SMTPException:
+                pass
+            self._disconnect()
+        host = os.getenv('SMTP_HOST', 'smtp.gmail.com')
+        port = int(os.getenv('SMTP_PORT', 465))
+        self._smtp = smtplib.SMTP_SSL(host, port, context=ssl.create_default_context(), timeout=30)
+        self._smtp.login(sender, password)
+        return self._smtp
+
+    def _disconnect(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def stats(self) -> dict:
+        return {'queued': self.queue.qsize(), 'sent': self.sent_count, 'failed': self.failed_count}
+
+
+dispatcher = AlertDispatcher()
+ALERT_QUEUE_DEPTH.set_function(dispatcher.queue.qsize)
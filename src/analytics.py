@@ -0,0 +1,224 @@
+"""Per-product price analytics, materialized in ``product_stats``.
+
+Columns: all-time low/high (and when the low was hit), 7/30-day average,
+percent above the low, how often the price drops, and a 0-100 deal score.
+
+The writer folds each flushed batch into the table with ``update_stats``:
+low/high/checks/drops are running values, and the averages come from the
+daily rollups. A check is one observation with a price (see src.history),
+the same unit the rollups and ``/stats`` count, so a rebuild gives the
+same numbers as the incremental path. So ranking thousands of products is an index scan, not a
+pass over price_history. Everything is computed with pandas over the whole
+batch at once. pandas is imported on first use, not with the module, so the
+API and CLIs start without it.
+
+Build the table from scratch (e.g. for an existing database) with:
+    python -m src.analytics rebuild
+"""
+from __future__ import annotations
+
+import logging
+import sys
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Iterable, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .history import Observation, bucket_start, rebuild_aggregates
+from .models import PriceAggregate, PriceLog, Product, ProductStats
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+log = logging.getLogger(__name__)
+
+WINDOWS = {'avg_7d': 7, 'avg_30d': 30}
+
+
+def deal_score(last: pd.Series, target: pd.Series, low: pd.Series, avg_30d: pd.Series) -> pd.Series:
+    """0-100. Up to 50 points for price vs target, 30 for closeness to the all-time low,
+    20 for the discount against the 30-day average. Missing inputs score 0."""
+    vs_target = ((1.2 - last / target) / 0.4).clip(0, 1)  # 0 at 20% over target, 1 at 20% under
+    vs_low = (1 - (last - low) / low / 0.2).clip(0, 1)     # 1 at the low, 0 at 20% above it
+    vs_avg = ((avg_30d - last) / avg_30d / 0.1).clip(0, 1)  # 1 at 10%+ under the 30-day average
+    return (100 * (0.5 * vs_target.fillna(0) + 0.3 * vs_low.fillna(0) + 0.2 * vs_avg.fillna(0))).round(1)
+
+
+def _targets(db: Session, product_ids: Iterable[int]) -> pd.Series:
+    import pandas as pd
+
+    rows = db.execute(select(Product.id, Product.target_price).where(Product.id.in_(list(product_ids))))
+    return pd.Series(dict(rows.all()), dtype='float64')
+
+
+def _finish(frame: pd.DataFrame, targets: pd.Series, now: datetime) -> pd.DataFrame:
+    """Derived columns shared by the incremental and full paths. ``frame`` is indexed by product_id."""
+    frame['pct_from_low'] = ((frame['last_price'] - frame['all_time_low']) / frame['all_time_low']).round(4)
+    frame['drop_frequency'] = (frame['drops'] / (frame['checks'] - 1).where(frame['checks'] > 1)).round(4)
+    frame['deal_score'] = deal_score(frame['last_price'], targets.reindex(frame.index),
+                                     frame['all_time_low'], frame['avg_30d'])
+    frame['updated_at'] = now
+    return frame
+
+
+def _upsert(db: Session, frame: pd.DataFrame):
+    columns = [c.name for c in ProductStats.__table__.columns]
+    frame = frame.reset_index()[columns]
+    frame = frame.astype(object).where(frame.notna(), None)
+    records = frame.to_dict('records')
+    if not records:
+        return
+    insert = pg_insert if db.bind.dialect.name == 'postgresql' else sqlite_insert
+    stmt = insert(ProductStats)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['product_id'],
+        set_={name: stmt.excluded[name] for name in columns if name != 'product_id'},
+    )
+    db.execute(stmt, records)
+
+
+def _window_averages(db: Session, product_ids: List[int], now: datetime) -> pd.DataFrame:
+    """avg_7d / avg_30d per product from the daily rollups."""
+    import pandas as pd
+
+    since = bucket_start(now - timedelta(days=max(WINDOWS.values())), 'day')
+    buckets = pd.DataFrame(db.execute(
+        select(PriceAggregate.product_id, PriceAggregate.bucket_start, PriceAggregate.sum_price, PriceAggregate.checks)
+        .where(PriceAggregate.resolution == 'day', PriceAggregate.product_id.in_(product_ids),
+               PriceAggregate.bucket_start >= since)
+    ).all(), columns=['product_id', 'bucket_start', 'sum_price', 'checks'])
+    averages = pd.DataFrame(index=pd.Index(product_ids, name='product_id'))
+    for column, days in WINDOWS.items():
+        recent = buckets[buckets['bucket_start'] >= bucket_start(now - timedelta(days=days), 'day')]
+        sums = recent.groupby('product_id')[['sum_price', 'checks']].sum()
+        averages[column] = (sums['sum_price'] / sums['checks']).round(2)
+    return averages
+
+
+def update_stats(db: Session, observations: List[Observation], now: Optional[datetime] = None):
+    """Fold one batch of (product_id, price, checked_at) into product_stats.
+
+    Call after ``record_aggregates`` in the same transaction, so the
+    averages include this batch.
+    """
+    if not observations:
+        return
+    import numpy as np
+    import pandas as pd
+
+    now = now or datetime.utcnow()
+    obs = pd.DataFrame(observations, columns=['product_id', 'price', 'checked_at'])
+    obs = obs.sort_values(['product_id', 'checked_at'], kind='stable').reset_index(drop=True)
+    product_ids = obs['product_id'].unique().tolist()
+
+    stat_columns = ['last_price', 'all_time_low', 'low_at', 'all_time_high', 'checks', 'drops']
+    old = pd.DataFrame(db.execute(
+        select(ProductStats.product_id, *(getattr(ProductStats, name) for name in stat_columns))
+        .where(ProductStats.product_id.in_(product_ids))
+    ).all(), columns=['product_id'] + stat_columns).set_index('product_id')
+    # Empty results and NULL columns come back as object dtype, which numpy's fmax rejects
+    old = old.astype({name: float for name in stat_columns if name != 'low_at'})
+
+    # A drop is a price below the previous observation (or the stored last price for the first one)
+    grouped = obs.groupby('product_id')['price']
+    previous = grouped.shift().fillna(obs['product_id'].map(old['last_price']))
+    obs['drop'] = obs['price'] < previous
+
+    batch = obs.groupby('product_id').agg(last_price=('price', 'last'), low=('price', 'min'),
+                                          high=('price', 'max'), checks=('price', 'size'), drops=('drop', 'sum'))
+    batch['batch_low_at'] = obs.loc[grouped.idxmin(), ['product_id', 'checked_at']].set_index('product_id')['checked_at']
+    batch = batch.join(old.drop(columns='last_price').add_prefix('old_'))
+
+    # Strictly lower replaces the low, so low_at keeps the first time it was reached
+    new_low = batch['old_all_time_low'].isna() | (batch['low'] < batch['old_all_time_low'])
+    frame = pd.DataFrame({
+        'last_price': batch['last_price'],
+        'all_time_low': np.where(new_low, batch['low'], batch['old_all_time_low']),
+        'low_at': batch['batch_low_at'].where(new_low, batch['old_low_at']),
+        'all_time_high': np.fmax(batch['high'], batch['old_all_time_high']),
+        'checks': batch['checks'] + batch['old_checks'].fillna(0),
+        'drops': batch['drops'] + batch['old_drops'].fillna(0),
+    }, index=batch.index)
+    frame = frame.join(_window_averages(db, product_ids, now))
+    _upsert(db, _finish(frame, _targets(db, product_ids), now))
+
+
+def refresh_stats(db: Session, product_ids: Optional[Iterable[int]] = None,
+                  now: Optional[datetime] = None) -> int:
+    """Recompute product_stats from price_history for ``product_ids`` (default: all).
+
+    Unlike ``update_stats`` this does not assume the rows are newer than what
+    is already folded in, so it suits backfilled history. Does not commit.
+    Returns the number of products with stats.
+    """
+    import pandas as pd
+
+    now = now or datetime.utcnow()
+    query = select(PriceLog.product_id, PriceLog.timestamp, PriceLog.price, func.coalesce(PriceLog.checks, 1)) \
+        .order_by(PriceLog.product_id, PriceLog.timestamp)
+    stale = delete(ProductStats)
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        query = query.where(PriceLog.product_id.in_(product_ids))
+        stale = stale.where(ProductStats.product_id.in_(product_ids))
+    rows = pd.DataFrame(db.execute(query).all(), columns=['product_id', 'timestamp', 'price', 'checks'])
+    db.execute(stale)
+    if rows.empty:
+        return 0
+
+    grouped = rows.groupby('product_id')
+    rows['drop'] = rows['price'] < grouped['price'].shift()
+    frame = grouped.agg(last_price=('price', 'last'), all_time_low=('price', 'min'),
+                        all_time_high=('price', 'max'), checks=('checks', 'sum'))
+    frame['drops'] = rows.groupby('product_id')['drop'].sum()
+    frame['low_at'] = rows.loc[grouped['price'].idxmin(), ['product_id', 'timestamp']].set_index('product_id')['timestamp']
+    frame = frame.join(_window_averages(db, frame.index.tolist(), now))
+
+    _upsert(db, _finish(frame, _targets(db, frame.index), now))
+    return len(frame)
+
+
+def rebuild_stats(db: Session, now: Optional[datetime] = None) -> int:
+    """Recompute product_stats from all of price_history. Returns the number of products.
+
+    The averages are read from the daily rollups, as in ``update_stats``, so
+    rebuild those first on a database that predates them.
+    """
+    count = refresh_stats(db, now=now)
+    db.commit()
+    return count
+
+
+def _rollups_if_empty(db: Session):
+    if db.scalar(select(PriceAggregate.id).limit(1)) is None:
+        rebuild_aggregates(db)
+
+
+def backfill_if_empty(session_factory):
+    """Build product_stats (and the rollups its averages need) once for databases that predate it."""
+    db = session_factory()
+    try:
+        if db.scalar(select(ProductStats.product_id).limit(1)) is None and \
+                db.scalar(select(PriceLog.id).limit(1)) is not None:
+            _rollups_if_empty(db)
+            log.info(f"Built analytics for {rebuild_stats(db)} products")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['rebuild']:
+        sys.exit(__doc__)
+    from .database import SessionLocal, engine
+    from .models import init_db
+
+    init_db(engine)
+    session = SessionLocal()
+    try:
+        _rollups_if_empty(session)
+        print(f"[v] Rebuilt analytics for {rebuild_stats(session)} products")
+    finally:
+        session.close()
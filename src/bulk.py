@@ -0,0 +1,165 @@
+"""Bulk product import for ``POST /products/bulk``.
+
+An upload is CSV (header ``title,url,target_price``) or JSON lines with the
+same keys. Onboarding thousands of products costs three queries, not
+thousands of round trips:
+
+* one ``SELECT`` finds rows whose canonical URL or ASIN is already tracked
+  (repeats within the upload are dropped in memory)
+* one multi-row ``INSERT`` adds the rest, in the same transaction as their
+  ``import_jobs`` row
+* the new products' first checks go through the concurrent scrape path as
+  one sweep (or one enqueue in SCHEDULER_MODE=queue)
+
+Rows that fail validation are counted and the first BULK_ERRORS_KEPT are
+kept on the job. Progress (how many of the new products have been checked
+and priced) is counted from ``products.import_job_id`` when polled.
+"""
+import csv
+import io
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from .canonical import canonical_url, extract_asin
+from .models import ImportJob, Product
+
+FORMATS = ('csv', 'ndjson')
+CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/json-lines': 'ndjson',
+}
+BULK_ERRORS_KEPT = 50
+
+
+def max_rows() -> int:
+    return int(os.getenv('BULK_MAX_ROWS', 10000))
+
+
+def format_for(content_type: Optional[str]) -> Optional[str]:
+    """'csv' / 'ndjson' for a request Content-Type, None if it is neither."""
+    return CONTENT_TYPES.get((content_type or '').split(';')[0].strip().lower())
+
+
+def _validate(raw: dict) -> dict:
+    title = str(raw.get('title') or '').strip()
+    url = str(raw.get('url') or '').strip()
+    if not title:
+        raise ValueError("title is required")
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        raise ValueError(f"invalid url {url!r}")
+    try:
+        target_price = float(raw.get('target_price'))
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid target_price {raw.get('target_price')!r}") from None
+    return {'title': title, 'url': url, 'target_price': target_price}
+
+
+def _records(body: bytes, fmt: str):
+    """(line number, raw dict or the reason it isn't one) per data row."""
+    text = body.decode('utf-8-sig')
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(text, newline=''))
+        missing = {'title', 'url', 'target_price'} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"CSV header is missing {', '.join(sorted(missing))}")
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_num, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_num, f"invalid JSON: {e.msg}"
+                continue
+            yield line_num, record if isinstance(record, dict) else "expected a JSON object"
+
+
+def parse_rows(body: bytes, fmt: str) -> Tuple[List[dict], List[dict], int]:
+    """(valid rows, row errors, data rows read). Raises ValueError for an unusable upload."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+    rows, errors, read = [], [], 0
+    for line_num, record in _records(body, fmt):
+        read += 1
+        if read > max_rows():
+            raise ValueError(f"more than BULK_MAX_ROWS={max_rows()} rows")
+        try:
+            if isinstance(record, str):
+                raise ValueError(record)
+            rows.append(_validate(record))
+        except ValueError as e:
+            errors.append({'line': line_num, 'error': str(e)})
+    return rows, errors, read
+
+
+def import_products(db: Session, rows: List[dict], fmt: str, read: Optional[int] = None,
+                    errors: Optional[List[dict]] = None) -> Tuple[ImportJob, List[int]]:
+    """Dedupe ``rows`` against the table and insert the rest under a new ImportJob.
+
+    Returns (job, new product ids). Caller commits.
+    """
+    errors = errors or []
+    fresh: Dict[str, dict] = {}
+    for row in rows:
+        url = canonical_url(row['url'])
+        fresh.setdefault(url, {**row, 'url': url, 'asin': extract_asin(url)})
+    asins = {row['asin'] for row in fresh.values() if row['asin']}
+
+    # One round trip; older rows may hold a non-canonical URL for the same ASIN
+    existing = db.execute(select(Product.url, Product.asin).where(
+        or_(Product.url.in_(fresh), Product.asin.in_(asins)) if asins else Product.url.in_(fresh)
+    )).all() if fresh else []
+    tracked_urls = {canonical_url(url) for url, _ in existing}
+    tracked_asins = {asin for _, asin in existing if asin}
+    new_rows = [row for url, row in fresh.items()
+                if url not in tracked_urls and not (row['asin'] and row['asin'] in tracked_asins)]
+
+    job = ImportJob(format=fmt, rows=read if read is not None else len(rows) + len(errors),
+                    created=len(new_rows), duplicates=len(rows) - len(new_rows), invalid=len(errors),
+                    errors=json.dumps(errors[:BULK_ERRORS_KEPT]))
+    db.add(job)
+    db.flush()
+    if not new_rows:
+        return job, []
+    ids = db.scalars(insert(Product).returning(Product.id),
+                     [{**row, 'import_job_id': job.id} for row in new_rows]).all()
+    return job, list(ids)
+
+
+def job_progress(db: Session, job_id: int) -> Optional[dict]:
+    """The job's upload counts plus how far its first checks have got. None if there is no such job."""
+    job = db.get(ImportJob, job_id)
+    if job is None:
+        return None
+    remaining, checked, priced = db.execute(
+        select(func.count(Product.id),
+               func.count(Product.next_check_at),  # set after every check, whatever its outcome
+               func.count(Product.last_price))
+        .where(Product.import_job_id == job_id)
+    ).one()
+    return {
+        'id': job.id,
+        'status': 'done' if checked >= remaining else 'checking',
+        'format': job.format,
+        'rows': job.rows,
+        'created': job.created,
+        'duplicates': job.duplicates,
+        'invalid': job.invalid,
+        'errors': json.loads(job.errors or '[]'),
+        'products': remaining,  # created minus any deleted since
+        'checked': checked,
+        'priced': priced,
+        'created_at': job.created_at,
+    }
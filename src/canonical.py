@@ -0,0 +1,65 @@
+"""Canonical product URLs: one marketplace + ASIN, one URL.
+
+``/dp/B0XXXXXXXX``, ``/gp/product/B0XXXXXXXX?ref=...``, ``/Some-Title/dp/...``
+and ``amazon.in`` vs ``www.amazon.in`` all name the same item. They collapse
+to ``https://www.amazon.in/dp/B0XXXXXXXX``. URLs without an ASIN keep their
+path and query, minus the fragment and utm_* tracking parameters.
+
+Pure string handling, so the scrape engine (and its parse processes) can
+import it without touching the database.
+"""
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+ASIN_PATH = re.compile(
+    r'/(?:dp|gp/product|gp/aw/d|exec/obidos/asin|o/asin|product-reviews)/([A-Z0-9]{10})(?=[/?#]|$)',
+    re.IGNORECASE,
+)
+MOBILE_PREFIXES = ('m.', 'smile.')
+
+
+def extract_asin(url: str) -> Optional[str]:
+    match = ASIN_PATH.search(urlsplit(url).path + '/')
+    return match.group(1).upper() if match else None
+
+
+def _marketplace(netloc: str) -> str:
+    host = netloc.lower()
+    if 'amazon.' not in host:
+        return host
+    for prefix in MOBILE_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return host if host.startswith('www.') else f'www.{host}'
+
+
+def canonical_url(url: str) -> str:
+    """The one URL every variant of this product maps to."""
+    parts = urlsplit(url.strip())
+    asin = extract_asin(url)
+    netloc = _marketplace(parts.netloc)
+    if asin:
+        scheme = 'https' if 'amazon.' in netloc else parts.scheme.lower()
+        return urlunsplit((scheme, netloc, f'/dp/{asin}', '', ''))
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                       if not k.lower().startswith('utm_')])
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path or '/', query, ''))
+
+
+def backfill_asins(session_factory) -> int:
+    """Fill ``products.asin`` for rows added before the column existed. Returns rows updated."""
+    from sqlalchemy import select, update
+
+    from .models import Product
+
+    db = session_factory()
+    try:
+        rows = db.execute(select(Product.id, Product.url).where(Product.asin.is_(None))).all()
+        updates = [{'id': pid, 'asin': asin} for pid, url in rows if (asin := extract_asin(url))]
+        if updates:
+            db.execute(update(Product), updates)
+            db.commit()
+        return len(updates)
+    finally:
+        db.close()
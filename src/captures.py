@@ -0,0 +1,282 @@
+"""Failure captures: the raw pages behind failed price checks, kept on disk.
+
+When a page comes back as a CAPTCHA, a block page or something no strategy
+can read a price from, its response bytes are queued here. A background
+thread compresses each page (zstd if ``zstandard`` is installed, else gzip)
+into CAPTURE_DIR (default data/captures). Oldest captures are dropped once
+the directory passes CAPTURE_MAX_BYTES. The scrape never waits on disk: if
+the queue is full, the capture is dropped and counted on /metrics.
+
+One file per capture, named ``<utc time>_<product ids>_<outcome>.html.gz``
+so listing by product, time or failure class needs no index. The first
+line inside the compressed file is a JSON header (url, status, layout), the
+rest is the page exactly as received.
+
+Browse with ``GET /admin/captures``. Turn captures into extractor fixtures
+for bench_extract with:
+
+    python -m src.captures list [--outcome parse_fail]
+    python -m src.captures export <capture id> ... [--dir benchmarks/fixtures]
+"""
+import argparse
+import gzip
+import importlib.util
+import json
+import logging
+import os
+import queue
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Hashable, Iterable, List, Optional, Tuple
+
+from .metrics import CAPTURES
+
+# Checked without importing it: zstandard loads on the first capture written
+ZSTD_AVAILABLE = importlib.util.find_spec('zstandard') is not None
+
+CAPTURE_ID = re.compile(r'^(\d{8}T\d{12})_([0-9+]+|na)_([a-z_]+)$')
+EXTENSIONS = ('.html.zst', '.html.gz')
+MAX_PRODUCTS_IN_NAME = 5
+
+log = logging.getLogger(__name__)
+
+
+def capture_dir() -> str:
+    return os.getenv('CAPTURE_DIR', os.path.join('data', 'captures'))
+
+
+def capture_outcomes() -> set:
+    """Failure classes worth keeping (CAPTURE_OUTCOMES, comma separated; empty disables captures)."""
+    return {o.strip() for o in os.getenv('CAPTURE_OUTCOMES', 'captcha,blocked,parse_fail').split(',') if o.strip()}
+
+
+@dataclass
+class Capture:
+    id: str
+    product_ids: List[int]
+    outcome: str
+    captured_at: datetime
+    path: str
+    stored_bytes: int
+
+
+def _parse_name(name: str) -> Optional[Tuple[str, str]]:
+    """(capture id, extension) for a capture file name, None for anything else."""
+    for ext in EXTENSIONS:
+        if name.endswith(ext) and CAPTURE_ID.match(name[:-len(ext)]):
+            return name[:-len(ext)], ext
+    return None
+
+
+def _capture_for(entry: os.DirEntry) -> Optional[Capture]:
+    parsed = _parse_name(entry.name)
+    if parsed is None:
+        return None
+    capture_id = parsed[0]
+    stamp, products, outcome = CAPTURE_ID.match(capture_id).groups()
+    return Capture(capture_id, [] if products == 'na' else [int(p) for p in products.split('+')], outcome,
+                   datetime.strptime(stamp, '%Y%m%dT%H%M%S%f'), entry.path, entry.stat().st_size)
+
+
+def list_captures(product_id: Optional[int] = None, outcome: Optional[str] = None,
+                  limit: Optional[int] = None) -> List[Capture]:
+    """Captures on disk, newest first, optionally filtered by product and failure class."""
+    try:
+        entries = list(os.scandir(capture_dir()))
+    except FileNotFoundError:
+        return []
+    found = []
+    for entry in sorted(entries, key=lambda e: e.name, reverse=True):
+        try:
+            capture = _capture_for(entry)
+        except FileNotFoundError:  # evicted by another process mid-scan
+            continue
+        if capture is None or (outcome and capture.outcome != outcome) \
+                or (product_id is not None and product_id not in capture.product_ids):
+            continue
+        found.append(capture)
+        if limit and len(found) >= limit:
+            break
+    return found
+
+
+def _open(path: str):
+    if path.endswith('.zst'):
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return gzip.open(path, 'rb')
+
+
+def read_capture(capture_id: str) -> Optional[Tuple[dict, bytes]]:
+    """(header, page bytes) of one capture, None if it does not exist (or was evicted)."""
+    if not CAPTURE_ID.match(capture_id):
+        return None
+    for ext in EXTENSIONS:
+        path = os.path.join(capture_dir(), capture_id + ext)
+        if not os.path.exists(path):
+            continue
+        try:
+            with _open(path) as f:
+                header, _, content = f.read().partition(b'\n')
+        except FileNotFoundError:
+            continue
+        return json.loads(header), content
+    return None
+
+
+def read_header(capture: Capture) -> dict:
+    """Just the JSON header, without decompressing the page."""
+    try:
+        with _open(capture.path) as f:
+            buffered = b''
+            while b'\n' not in buffered:
+                chunk = f.read(4096)
+                if not chunk:
+                    break
+                buffered += chunk
+        return json.loads(buffered.partition(b'\n')[0])
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+class CaptureStore:
+    """Bounded queue in front of one writer thread. Settings are read from the environment when used."""
+
+    def __init__(self):
+        self.queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._total_bytes: Optional[int] = None  # of CAPTURE_DIR, scanned on the first write
+
+    @property
+    def queue_size(self) -> int:
+        return int(os.getenv('CAPTURE_QUEUE_SIZE', 32))
+
+    @property
+    def max_bytes(self) -> int:
+        return int(float(os.getenv('CAPTURE_MAX_BYTES', 64 * 1024 * 1024)))
+
+    # --- producer side (any thread) ---
+
+    def submit(self, outcome: str, content: bytes, url: str, product_ids: Iterable[Hashable] = (),
+               status: Optional[int] = None, layout: Optional[str] = None) -> bool:
+        """Queue a failed page for capture if its outcome is kept. Never blocks. Returns True if queued."""
+        if outcome not in capture_outcomes() or not content:
+            return False
+        header = {'url': url, 'status': status, 'outcome': outcome, 'layout': layout,
+                  'product_ids': [p for p in product_ids if isinstance(p, int)],
+                  'captured_at': datetime.utcnow().isoformat()}
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='capture-writer', daemon=True)
+                self._thread.start()
+        if self.queue.qsize() >= self.queue_size:  # writer is behind: keep the scrape moving
+            CAPTURES.labels(outcome, 'dropped').inc()
+            return False
+        self.queue.put((header, content))
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """Write whatever is queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # --- writer thread ---
+
+    def _run(self):
+        while not (self._stop.is_set() and self.queue.empty()):
+            try:
+                header, content = self.queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                self._write(header, content)
+                CAPTURES.labels(header['outcome'], 'stored').inc()
+            except Exception as e:
+                CAPTURES.labels(header['outcome'], 'failed').inc()
+                log.warning(f"Could not store failure capture: {e}", extra={'url': header['url']})
+
+    def _write(self, header: dict, content: bytes):
+        os.makedirs(capture_dir(), exist_ok=True)
+        products = '+'.join(str(p) for p in header['product_ids'][:MAX_PRODUCTS_IN_NAME]) or 'na'
+        stamp = datetime.fromisoformat(header['captured_at']).strftime('%Y%m%dT%H%M%S%f')
+        payload = json.dumps(header).encode() + b'\n' + content
+        if ZSTD_AVAILABLE:
+            import zstandard
+            ext, data = '.html.zst', zstandard.ZstdCompressor(level=10).compress(payload)
+        else:
+            ext, data = '.html.gz', gzip.compress(payload, compresslevel=6)
+        path = os.path.join(capture_dir(), f"{stamp}_{products}_{header['outcome']}{ext}")
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)  # listings never see a half-written capture
+
+        if self._total_bytes is None:
+            self._total_bytes = sum(c.stored_bytes for c in list_captures())
+        else:
+            self._total_bytes += len(data)
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        """Delete oldest captures until CAPTURE_MAX_BYTES holds. Rescans: other processes write here too."""
+        captures = list_captures()
+        total = sum(c.stored_bytes for c in captures)
+        while captures and total > self.max_bytes:
+            oldest = captures.pop()
+            try:
+                os.remove(oldest.path)
+            except FileNotFoundError:
+                pass
+            total -= oldest.stored_bytes
+        self._total_bytes = total
+
+    def stats(self) -> dict:
+        return {'queued': self.queue.qsize(), 'max_bytes': self.max_bytes,
+                'compression': 'zstd' if ZSTD_AVAILABLE else 'gzip'}
+
+
+captures = CaptureStore()
+
+
+def export_fixture(capture_id: str, directory: str) -> Optional[str]:
+    """Write a capture's page as ``<directory>/<outcome>-<capture id>.html``. Returns the path."""
+    found = read_capture(capture_id)
+    if found is None:
+        return None
+    header, content = found
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{header['outcome']}-{capture_id}.html")
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Browse failure captures and export them as extractor fixtures.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    listing = commands.add_parser('list', help="newest captures first")
+    listing.add_argument('--product-id', type=int)
+    listing.add_argument('--outcome')
+    listing.add_argument('--limit', type=int, default=50)
+    export = commands.add_parser('export', help="write captured pages to the fixture directory")
+    export.add_argument('ids', nargs='+')
+    export.add_argument('--dir', default=os.path.join('benchmarks', 'fixtures'))
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for capture in list_captures(args.product_id, args.outcome, args.limit):
+            header = read_header(capture)
+            print(f"{capture.id}  {capture.stored_bytes / 1024:>7.1f} KB  {header.get('status')}  {header.get('url')}")
+    else:
+        for capture_id in args.ids:
+            path = export_fixture(capture_id, args.dir)
+            print(f"[v] {capture_id} -> {path}" if path else f"[!] No capture {capture_id}")
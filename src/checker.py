@@ -0,0 +1,129 @@
+"""Price check runs, shared by the API's scheduler and queue workers (worker.py).
+
+``check_products`` scrapes a set of already-loaded products, writes the
+results through PriceWriter, and raises alerts and live events.
+``check_prices_job`` is the scheduler entry point: load due products, then
+check them.
+"""
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import or_
+
+from .alerts import Deal, dispatcher
+from .database import SessionLocal
+from .events import bus
+from .metrics import SWEEP_PRODUCTS, SWEEP_SECONDS
+from .models import Product
+from .planner import plan_next_check, recent_prices
+from .scraper import ScrapeTarget, stream_prices
+from .strategies import refresh_strategies
+from .writer import PriceWriter
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class SweepStats:
+    """What one check run did and where its time went."""
+    products: int = 0
+    seconds: float = 0.0
+    outcomes: Counter = field(default_factory=Counter)
+    fetch_seconds: List[float] = field(default_factory=list)
+    parse_seconds: List[float] = field(default_factory=list)
+    db_seconds: float = 0.0
+    rows_written: int = 0
+    checks_written: int = 0
+    coalesced: int = 0
+
+
+def load_products(force: bool = False, product_ids: List[int] | None = None):
+    """({id: Product}, recent price runs) for due products, all of them if forced, or just ``product_ids``."""
+    db = SessionLocal()
+    try:
+        # Load once and release the session: writes go through PriceWriter in short batches
+        query = db.query(Product)
+        if product_ids is not None:
+            query = query.filter(Product.id.in_(product_ids))
+        elif not force:
+            now = datetime.utcnow()
+            query = query.filter(or_(Product.next_check_at.is_(None), Product.next_check_at <= now))
+        products = {p.id: p for p in query.order_by(Product.next_check_at).all()}
+        history = recent_prices(db, products.keys()) if products else {}
+        refresh_strategies(db)  # pick up what other workers learned about page layouts
+    finally:
+        db.close()
+    return products, history
+
+
+def check_products(products: Dict[int, Product], history: dict) -> SweepStats:
+    """Scrape ``products`` concurrently, record results and send alerts."""
+    stats = SweepStats()
+    if not products:
+        return stats
+    started = time.perf_counter()
+    stats.products = len(products)
+    log.info(f"Starting price check ({len(products)} products due)", extra={'products': len(products)})
+    targets = [ScrapeTarget(p.id, p.url, p.etag, p.last_modified, p.price_hash, p.price_strategy)
+               for p in products.values()]
+
+    writer = PriceWriter()
+    try:
+        with writer:
+            # Fetches run concurrently; results arrive in completion order
+            for result in stream_prices(targets):
+                stats.outcomes[result.outcome] += 1
+                if result.source != 'fetch':  # shared another product's fetch, or a cached result
+                    stats.coalesced += 1
+                elif result.outcome != 'cooldown':  # cooled-down hosts were never contacted
+                    stats.fetch_seconds.append(result.elapsed)
+                    if result.parse_seconds:
+                        stats.parse_seconds.append(result.parse_seconds)
+                p = products[result.key]
+                schedule = plan_next_check(p, history.get(p.id, []), result)
+                # Checked-but-unchanged results only bump last_check
+                writer.add(result, last_price=p.last_price, **schedule)
+
+                new_price = result.price
+                if new_price:
+                    if new_price != p.last_price:
+                        # Live dashboards only hear about actual changes
+                        bus.publish('price_change', product_id=p.id, price=new_price, previous=p.last_price,
+                                    checked_at=datetime.utcnow())
+                    if new_price <= p.target_price:
+                        log.warning(f"💰 DEAL FOUND: {p.title} at ₹{new_price} (Target: ₹{p.target_price})",
+                                    extra={'product_id': p.id, 'price': new_price, 'target_price': p.target_price})
+                        # Queued: SMTP runs on the dispatcher thread, not in the sweep
+                        dispatcher.submit(Deal(p.title, new_price, p.url, p.target_price))
+                        bus.publish('deal', product_id=p.id, title=p.title, price=new_price, target_price=p.target_price)
+                    else:
+                        log.info(f"{p.title}: ₹{new_price} (Target: ₹{p.target_price})",
+                                 extra={'product_id': p.id, 'price': new_price})
+
+        log.info(f"Price check complete ({writer.checks_written} checks recorded, {writer.rows_written} history rows "
+                 f"in {writer.flush_count} batches)",
+                 extra={'checks_written': writer.checks_written, 'rows_written': writer.rows_written,
+                        'outcomes': dict(stats.outcomes)})
+        bus.publish('sweep', products=len(products), checks_written=writer.checks_written,
+                    rows_written=writer.rows_written)
+    except Exception as e:
+        log.exception(f"Job error: {e}")
+    stats.db_seconds, stats.rows_written, stats.checks_written = \
+        writer.flush_seconds, writer.rows_written, writer.checks_written
+    stats.seconds = time.perf_counter() - started
+    SWEEP_SECONDS.observe(stats.seconds)
+    SWEEP_PRODUCTS.inc(stats.products)
+    return stats
+
+
+def check_prices_job(force: bool = False, product_ids: List[int] | None = None) -> SweepStats:
+    """Background job: Checks due products (all of them if forced, or just `product_ids`) and sends alerts."""
+    started = time.perf_counter()
+    products, history = load_products(force, product_ids)
+    stats = check_products(products, history)
+    stats.seconds = time.perf_counter() - started
+    return stats
@@ -0,0 +1,54 @@
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+SQLALCHEMY_DATABASE_URL = os.getenv('DATABASE_URL', "sqlite:///./data/tracker.db")
+
+# Sync engine: scheduler sweeps, writer, CLI tools
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _async_url(url: str) -> str:
+    """Same database through an async driver (sqlite -> sqlite+aiosqlite)."""
+    parsed = make_url(url)
+    drivers = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+    if parsed.drivername in drivers:
+        parsed = parsed.set(drivername=drivers[parsed.drivername])
+    return parsed.render_as_string(hide_password=False)
+
+
+# Async engine: API handlers, so requests never queue behind the sweep for a threadpool slot
+async_engine = create_async_engine(os.getenv('ASYNC_DATABASE_URL', _async_url(SQLALCHEMY_DATABASE_URL)))
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+@event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
+def _sqlite_pragmas(dbapi_conn, _):
+    """WAL lets API reads proceed while a sweep is writing; the rest trades durability margin for speed."""
+    if engine.dialect.name != 'sqlite':
+        return
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))}")
+    cursor.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,81 @@
+"""Downsampling price series to a fixed number of chart points.
+
+Both methods return the *indices* of the points to keep (always including
+the first and last, or just the last for ``points=1``), so callers can
+apply them to any number of columns. Below a method's minimum (3 for lttb,
+4 for minmax) only those end points are kept.
+
+* ``lttb``   - Largest-Triangle-Three-Buckets: keeps the visual shape of the line
+* ``minmax`` - the lowest and highest price in each bucket: never hides a dip or spike
+"""
+import math
+from typing import List, Sequence
+
+METHODS = ('lttb', 'minmax')
+
+
+def _ends(n: int, points: int) -> List[int]:
+    """First and last index, or just the last if only one point fits."""
+    return [0, n - 1] if points >= 2 else [n - 1]
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], points: int) -> List[int]:
+    n = len(xs)
+    if points >= n:
+        return list(range(n))
+    if points < 3:
+        return _ends(n, points)
+
+    every = (n - 2) / (points - 2)
+    keep = [0]
+    a = 0
+    for i in range(points - 2):
+        # Average of the *next* bucket is the third triangle corner
+        next_start = int(math.floor((i + 1) * every)) + 1
+        next_end = min(int(math.floor((i + 2) * every)) + 1, n)
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        # Keep the point in this bucket that forms the largest triangle
+        start = int(math.floor(i * every)) + 1
+        end = int(math.floor((i + 1) * every)) + 1
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        keep.append(best)
+        a = best
+    keep.append(n - 1)
+    return keep
+
+
+def minmax(xs: Sequence[float], ys: Sequence[float], points: int) -> List[int]:
+    n = len(xs)
+    if points >= n:
+        return list(range(n))
+    if points < 4:
+        return _ends(n, points)
+
+    buckets = (points - 2) // 2
+    every = (n - 2) / buckets
+    keep = [0]
+    for i in range(buckets):
+        start = int(math.floor(i * every)) + 1
+        end = min(int(math.floor((i + 1) * every)) + 1, n - 1)
+        if start >= end:
+            continue
+        bucket = range(start, end)
+        low = min(bucket, key=ys.__getitem__)
+        high = max(bucket, key=ys.__getitem__)
+        keep.extend(sorted({low, high}))
+    keep.append(n - 1)
+    return keep
+
+
+def downsample(xs: Sequence[float], ys: Sequence[float], points: int, method: str = 'lttb') -> List[int]:
+    """Indices to keep so the series has at most ``points`` points."""
+    if method == 'minmax':
+        return minmax(xs, ys, points)
+    return lttb(xs, ys, points)
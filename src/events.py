@@ -0,0 +1,186 @@
+"""In-process pub/sub for live dashboard updates (served as SSE on GET /events).
+
+Sweeps run on the scheduler thread and API handlers on the event loop, so
+``publish`` can be called from any thread. Each subscriber gets a bounded
+asyncio queue on its own loop. A subscriber that falls too far behind is
+sent a single ``resync`` event telling it to reload a full snapshot, so one
+slow client cannot hold memory for everyone else.
+
+In SCHEDULER_MODE=queue the checks run in ``python -m src.worker``
+processes. A worker's bus hands every event to ``store_event`` (its
+``outbox``), which writes it to the ``live_events`` table. Each API process
+polls that table with an ``EventTail`` and republishes new rows on its own
+bus, so /events sees worker price changes, deals and sweeps. Rows older
+than EVENT_RETENTION_SECONDS are pruned.
+
+Recent events are kept in a ring buffer, so a client reconnecting with
+``Last-Event-ID`` gets what it missed (or ``resync`` if that is too old).
+Ids start from the boot time in milliseconds, so they keep growing across
+restarts: a client that last heard from an earlier process is always older
+than the ring buffer and gets ``resync``, as does one whose id is ahead of
+this process (e.g. after the clock went back).
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Set
+
+from .metrics import EVENT_SUBSCRIBERS
+
+
+@dataclass
+class Event:
+    id: int
+    type: str
+    data: dict = field(default_factory=dict)
+
+    def encode(self) -> str:
+        """SSE wire format."""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.lagging = False
+
+    def push(self, event: Event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: Event):
+        if self.lagging:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Drop the backlog; the client reloads instead of replaying it
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(Event(event.id, 'resync'))
+            self.lagging = True
+
+    async def get(self, timeout: float) -> Optional[Event]:
+        """Next event, or None if nothing happened within ``timeout`` seconds."""
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event.type == 'resync':
+            self.lagging = False
+        return event
+
+
+class EventBus:
+    def __init__(self, history: int = 500, queue_size: int = 1000):
+        self.queue_size = queue_size
+        self._recent: deque = deque(maxlen=history)
+        self._subscribers: Set[Subscription] = set()
+        self._seq = int(time.time() * 1000)
+        self._lock = threading.Lock()
+        self.outbox: Optional[Callable[[str, dict], None]] = None  # also hand events to other processes
+
+    def publish(self, type: str, **data) -> Event:
+        if self.outbox is not None:
+            self.outbox(type, data)
+        with self._lock:
+            self._seq += 1
+            event = Event(self._seq, type, data)
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.push(event)
+        return event
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """Register the calling event loop. Replays events after ``last_event_id`` if given."""
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if last_event_id is not None and last_event_id != self._seq:
+                oldest = self._recent[0].id if self._recent else self._seq + 1
+                if last_event_id > self._seq or last_event_id + 1 < oldest:
+                    subscription._put(Event(self._seq, 'resync'))
+                else:
+                    for event in self._recent:
+                        if event.id > last_event_id:
+                            subscription._put(event)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'last_event_id': self._seq}
+
+
+bus = EventBus()
+
+
+def retention() -> timedelta:
+    return timedelta(seconds=float(os.getenv('EVENT_RETENTION_SECONDS', 600)))
+
+
+def store_event(type: str, data: dict, session_factory=None):
+    """Outbox for queue workers: write one event to ``live_events`` for the API processes to relay."""
+    from .database import SessionLocal
+    from .models import LiveEvent
+
+    db = (session_factory or SessionLocal)()
+    try:
+        db.add(LiveEvent(type=type, data=json.dumps(data, default=str)))
+        db.commit()
+    finally:
+        db.close()
+
+
+class EventTail:
+    """Republishes rows that workers added to ``live_events`` on this process's bus.
+
+    Starts from the newest row, so only events from then on are relayed.
+    Best effort, like the rest of the stream: a client that misses events
+    reloads on ``resync``.
+    """
+
+    def __init__(self, bus: EventBus, batch: int = 1000):
+        self.bus = bus
+        self.batch = batch
+        self.position: Optional[int] = None
+        self._pruned_at = 0.0
+
+    def poll(self, session_factory) -> int:
+        """Relay new rows and prune old ones. Returns the number relayed."""
+        from sqlalchemy import delete, func, select
+
+        from .models import LiveEvent
+
+        db = session_factory()
+        try:
+            if self.position is None:
+                self.position = db.scalar(select(func.max(LiveEvent.id))) or 0
+                return 0
+            rows = db.execute(
+                select(LiveEvent.id, LiveEvent.type, LiveEvent.data)
+                .where(LiveEvent.id > self.position).order_by(LiveEvent.id).limit(self.batch)
+            ).all()
+            for event_id, type, data in rows:
+                self.bus.publish(type, **json.loads(data))
+                self.position = event_id
+            if time.monotonic() - self._pruned_at >= 60:  # a write, so not on every poll
+                db.execute(delete(LiveEvent).where(LiveEvent.created_at < datetime.utcnow() - retention()))
+                db.commit()
+                self._pruned_at = time.monotonic()
+            return len(rows)
+        finally:
+            db.close()
+
+
+event_tail = EventTail(bus)
+EVENT_SUBSCRIBERS.set_function(lambda: bus.stats()['subscribers'])
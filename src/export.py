@@ -0,0 +1,107 @@
+"""Streaming price_history export (GET /export).
+
+Rows are read through a server-side cursor and encoded one chunk at a
+time, so memory stays flat however large the table is. Exports are
+incremental by row id: the response's ``X-Next-Since`` header is the
+highest id included, and passing it back as ``since`` returns only rows
+written after it.
+
+With HISTORY_MODE=changes a run's ``last_seen`` / ``checks`` keep growing
+after its row was exported; re-export from an earlier ``since`` to refresh them.
+"""
+import csv
+import io
+from typing import AsyncIterator, List, Optional, Sequence
+
+from sqlalchemy import func, select
+
+from .database import AsyncSessionLocal
+from .models import PriceLog
+
+COLUMNS = ('id', 'product_id', 'timestamp', 'price', 'last_seen', 'checks')
+CHUNK_ROWS = 5000
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def high_watermark(product_id: Optional[int] = None) -> int:
+    """Highest price_history id right now; the export stops there so it is a consistent snapshot."""
+    query = select(func.max(PriceLog.id))
+    if product_id is not None:
+        query = query.where(PriceLog.product_id == product_id)
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(query) or 0
+
+
+async def iter_batches(since: int, upper: int, product_id: Optional[int] = None,
+                       chunk: int = CHUNK_ROWS) -> AsyncIterator[List[Sequence]]:
+    """Lists of up to ``chunk`` rows (in COLUMNS order) with since < id <= upper, by id."""
+    query = select(*(getattr(PriceLog, name) for name in COLUMNS)).where(PriceLog.id > since, PriceLog.id <= upper)
+    if product_id is not None:
+        query = query.where(PriceLog.product_id == product_id)
+    # Own session: the stream outlives the request's dependency scope
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.order_by(PriceLog.id).execution_options(yield_per=chunk))
+        async for rows in result.partitions():
+            yield rows
+
+
+async def csv_chunks(batches: AsyncIterator[List[Sequence]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    async for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink whose bytes are handed out as they accumulate."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self) -> bytes:
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+async def parquet_chunks(batches: AsyncIterator[List[Sequence]]) -> AsyncIterator[bytes]:
+    """One Parquet row group per chunk, streamed as it is written. Requires pyarrow."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.int64()), ('product_id', pa.int64()), ('timestamp', pa.timestamp('us')),
+        ('price', pa.float64()), ('last_seen', pa.timestamp('us')), ('checks', pa.int64()),
+    ])
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    async for rows in batches:
+        columns = list(zip(*rows))
+        writer.write_table(pa.table([pa.array(col, field.type) for col, field in zip(columns, schema)], schema=schema))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
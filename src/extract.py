@@ -0,0 +1,266 @@
+"""Tiered price extraction for Amazon product pages.
+
+Tiers run cheapest first and stop at the first price found:
+
+1. ``regex`` - byte-level scan of the price block only (no parsing)
+2. ``lxml``  - C-backed HTML parser, skipped if lxml is not installed
+3. ``soup``  - full BeautifulSoup ``html.parser`` parse, last resort
+
+Internally a tier runs as one *strategy* per price class
+(``regex:apexPriceToPay``), so ``extract_with`` can try them in a learned
+order (see strategies.py). Each page is parsed at most once per parser,
+however many strategies ask for the tree.
+"""
+import re
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+log = logging.getLogger(__name__)
+
+# Price containers in priority order
+PRICE_CLASSES = ('a-price-whole', 'a-offscreen', 'priceToPay', 'apexPriceToPay')
+
+# Prices at or below this are treated as junk (ratings, counts, "Page 1 of 2")
+MIN_PRICE = 100
+
+CAPTCHA_MARKERS = (
+    b"Enter the characters you see below",
+    b"/errors/validateCaptcha",
+    b"make sure you're not a robot",
+)
+
+# Containers that wrap the buy-box price, most specific first
+REGION_MARKERS = (
+    b'id="corePriceDisplay_desktop_feature_div"',
+    b'id="corePrice_feature_div"',
+    b'id="apex_desktop"',
+    b'id="corePrice_desktop"',
+)
+REGION_SIZE = 16 * 1024
+
+_NUMBER = re.compile(r'\d[\d,]*(?:\.\d+)?')
+_CLASS_PATTERNS = {
+    cls: re.compile(rb'class="[^"]*\b' + cls.encode() + rb'\b[^"]*"[^>]*>([^<]*)')
+    for cls in PRICE_CLASSES
+}
+
+Extractor = Callable[[bytes], Optional[float]]
+
+
+def parse_price_text(text: str) -> Optional[float]:
+    """Turn '₹52,990.00' / '52,990.' / '$1,299' into a float, or None."""
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    try:
+        price = float(match.group().replace(',', ''))
+    except ValueError:
+        return None
+    return price if price > MIN_PRICE else None
+
+
+def is_captcha(content: bytes) -> bool:
+    """Detect Amazon's robot-check page without decoding or parsing the document."""
+    return any(marker in content for marker in CAPTCHA_MARKERS)
+
+
+def find_price_region(content: bytes) -> Optional[Tuple[int, int]]:
+    """Byte offsets of the buy-box price block, or None if no known container is present."""
+    for marker in REGION_MARKERS:
+        start = content.find(marker)
+        if start != -1:
+            return start, min(len(content), start + REGION_SIZE)
+    start = content.find(b'a-price-whole')
+    if start != -1:
+        return max(0, start - 1024), min(len(content), start + 1024)
+    return None
+
+
+def page_layout(content: bytes) -> str:
+    """Coarse layout key: the price container the page uses."""
+    for marker in REGION_MARKERS:
+        if marker in content:
+            return marker.split(b'"')[1].decode()
+    return 'bare' if b'a-price-whole' in content else 'unknown'
+
+
+def fingerprint_price_region(content: bytes) -> Optional[str]:
+    """Stable hash of the price region, used to skip parsing unchanged pages."""
+    region = find_price_region(content)
+    if region is None:
+        return None
+    return hashlib.blake2b(content[region[0]:region[1]], digest_size=16).hexdigest()
+
+
+# --- TIERS ---
+
+# Each tier is its per-class strategies run in PRICE_CLASSES order (see run_tier).
+
+def extract_regex(content: bytes) -> Optional[float]:
+    """Tier 1: regex over the located price region only."""
+    return run_tier(Page(content), 'regex')
+
+
+def extract_lxml(content: bytes) -> Optional[float]:
+    """Tier 2: lxml tree + XPath class lookups."""
+    return run_tier(Page(content), 'lxml')
+
+
+def extract_soup(content: bytes) -> Optional[float]:
+    """Tier 3: full BeautifulSoup parse (slowest, most forgiving)."""
+    return run_tier(Page(content), 'soup')
+
+
+EXTRACTORS: List[Tuple[str, Extractor]] = [
+    ('regex', extract_regex),
+    ('lxml', extract_lxml),
+    ('soup', extract_soup),
+]
+
+
+def register_extractor(name: str, extractor: Extractor, position: Optional[int] = None):
+    """Add (or replace) a tier. Appended last unless ``position`` is given."""
+    EXTRACTORS[:] = [(n, e) for n, e in EXTRACTORS if n != name]
+    EXTRACTORS.insert(len(EXTRACTORS) if position is None else position, (name, extractor))
+
+
+# --- STRATEGIES ---
+
+class Page:
+    """One document, with its price region and parse trees computed on first use."""
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self._region = None
+        self._lxml = None
+        self._soup = None
+
+    @property
+    def region(self) -> Optional[bytes]:
+        if self._region is None:
+            bounds = find_price_region(self.content)
+            self._region = self.content[bounds[0]:bounds[1]] if bounds else b''
+        return self._region or None
+
+    @property
+    def lxml(self):
+        if self._lxml is None:
+            import lxml.html
+            self._lxml = lxml.html.fromstring(self.content)
+        return self._lxml
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            from bs4 import BeautifulSoup
+            self._soup = BeautifulSoup(self.content, 'html.parser')
+        return self._soup
+
+
+def _regex_class(page: Page, cls: str) -> Optional[float]:
+    if page.region is None:
+        return None
+    for match in _CLASS_PATTERNS[cls].finditer(page.region):
+        price = parse_price_text(match.group(1).decode('utf-8', 'ignore'))
+        if price:
+            return price
+    return None
+
+
+def _lxml_class(page: Page, cls: str) -> Optional[float]:
+    try:
+        root = page.lxml
+    except ImportError:
+        return None
+    for elem in root.xpath(f"//span[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"):
+        price = parse_price_text(elem.text_content().strip())
+        if price:
+            return price
+    return None
+
+
+def _soup_class(page: Page, cls: str) -> Optional[float]:
+    elem = page.soup.find('span', class_=cls)
+    return parse_price_text(elem.get_text(strip=True)) if elem else None
+
+
+CLASS_STRATEGIES: Dict[str, Callable[[Page, str], Optional[float]]] = {
+    'regex': _regex_class,
+    'lxml': _lxml_class,
+    'soup': _soup_class,
+}
+
+
+def default_strategies() -> List[str]:
+    """Every strategy in the static order: tier by tier, PRICE_CLASSES order within a tier.
+    Tiers added with ``register_extractor`` run whole, as one strategy each."""
+    names = []
+    for tier, _ in EXTRACTORS:
+        if tier in CLASS_STRATEGIES:
+            names += [f'{tier}:{cls}' for cls in PRICE_CLASSES]
+        else:
+            names.append(tier)
+    return names
+
+
+def run_tier(page: Page, tier: str) -> Optional[float]:
+    """A whole tier: its strategies in PRICE_CLASSES order, first price wins."""
+    if tier not in CLASS_STRATEGIES:
+        return dict(EXTRACTORS)[tier](page.content)
+    for cls in PRICE_CLASSES:
+        price = CLASS_STRATEGIES[tier](page, cls)
+        if price:
+            return price
+    return None
+
+
+def run_strategy(page: Page, name: str) -> Optional[float]:
+    tier, _, cls = name.partition(':')
+    if cls:
+        return CLASS_STRATEGIES[tier](page, cls)
+    return dict(EXTRACTORS)[tier](page.content)
+
+
+@dataclass
+class Extraction:
+    """What ``extract_with`` found, and which strategies it tried first without success."""
+    price: Optional[float]
+    strategy: Optional[str]
+    layout: str
+    misses: List[str] = field(default_factory=list)
+
+    @property
+    def tier(self) -> Optional[str]:
+        return self.strategy.partition(':')[0] if self.strategy else None
+
+
+def extract_with(content: bytes, ranking: Optional[Dict[str, Sequence[str]]] = None,
+                 hint: Optional[str] = None) -> Extraction:
+    """Try ``hint`` (the product's last winner), then the layout's ranked strategies, then the rest."""
+    layout = page_layout(content)
+    known = default_strategies()
+    preferred = [hint] if hint else []
+    preferred += (ranking or {}).get(layout, ())
+    order = list(dict.fromkeys([name for name in preferred if name in known] + known))
+
+    page = Page(content)
+    extraction = Extraction(None, None, layout)
+    for name in order:
+        try:
+            price = run_strategy(page, name)
+        except Exception as e:
+            log.debug(f"Strategy '{name}' failed: {e}")
+            price = None
+        if price:
+            extraction.price, extraction.strategy = price, name
+            return extraction
+        extraction.misses.append(name)
+    return extraction
+
+
+def extract_price(content: bytes) -> Tuple[Optional[float], Optional[str]]:
+    """Run the tiers in order. Returns (price, tier name) or (None, None)."""
+    extraction = extract_with(content)
+    return extraction.price, extraction.tier
@@ -0,0 +1,353 @@
+"""Price history storage helpers: change-point runs and hourly/daily rollups.
+
+A check is one observation with a known price: a parsed price, or an
+unchanged page (304 / same price region), which repeats the stored price.
+``HISTORY_MODE=full`` (default) writes one price_history row per parsed
+price. ``HISTORY_MODE=changes`` writes a row only when the price moves.
+Other checks (and unchanged pages in either mode) extend the latest row's
+``last_seen`` / ``checks`` run instead of writing a redundant full row.
+
+Either way, every check is folded into ``price_aggregates`` so long ranges
+can be served without scanning raw rows. A run only records its first and
+last check, so ``rebuild_aggregates`` spreads its checks evenly between the
+two. That matches the incremental rollups exactly when the checks were
+evenly spaced (as the planner schedules a stable product), and otherwise
+keeps every check, just not necessarily in the bucket it happened in.
+
+Backfill the rollups for an existing database with:
+    python -m src.history rebuild
+"""
+from __future__ import annotations
+
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import (Column, DateTime, Float, Integer, MetaData, String, Table, bindparam, delete, func, insert,
+                        literal, literal_column, null, or_, select, union_all, update)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .downsample import downsample
+from .models import PriceAggregate, PriceLog
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+RESOLUTIONS = ('hour', 'day')
+EPOCH = datetime(1970, 1, 1)
+
+Observation = Tuple[int, float, datetime]  # (product_id, price, checked_at)
+
+
+def history_mode() -> str:
+    return os.getenv('HISTORY_MODE', 'full')
+
+
+def bucket_start(ts: datetime, resolution: str) -> datetime:
+    if resolution == 'hour':
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def pick_resolution(days: Optional[int]) -> str:
+    """Resolution for resolution=auto: raw for short ranges, rollups for long ones."""
+    if days is None or days <= 2:
+        return 'raw'
+    return 'hour' if days <= 60 else 'day'
+
+
+def latest_log_ids(db: Session, product_ids: Iterable[int]) -> dict:
+    """{product_id: (log id, price)} of the most recent history row per product."""
+    latest = (
+        select(PriceLog.product_id, func.max(PriceLog.id).label('log_id'))
+        .where(PriceLog.product_id.in_(set(product_ids)))
+        .group_by(PriceLog.product_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(latest.c.product_id, latest.c.log_id, PriceLog.price)
+        .join(PriceLog, PriceLog.id == latest.c.log_id)
+    )
+    return {product_id: (log_id, price) for product_id, log_id, price in rows}
+
+
+def write_changes(db: Session, observations: List[Observation]) -> int:
+    """Change-point storage: insert a row on a new price, otherwise extend the current run.
+
+    Expects at most one observation per product (one sweep's batch).
+    Returns the number of rows inserted.
+    """
+    latest = latest_log_ids(db, (pid for pid, _, _ in observations))
+    new_rows, extended = [], []
+    for product_id, price, checked_at in observations:
+        current = latest.get(product_id)
+        if current and current[1] == price:
+            extended.append({'log_id': current[0], 'seen': checked_at})
+        else:
+            new_rows.append({'product_id': product_id, 'price': price, 'timestamp': checked_at,
+                             'last_seen': checked_at, 'checks': 1})
+
+    if new_rows:
+        db.execute(insert(PriceLog), new_rows)
+    if extended:
+        # Core executemany: the ORM bulk UPDATE path cannot express checks = checks + 1
+        table = PriceLog.__table__
+        db.connection().execute(
+            update(table)
+            .where(table.c.id == bindparam('log_id'))
+            .values(last_seen=bindparam('seen'), checks=func.coalesce(table.c.checks, 1) + 1),
+            extended,
+        )
+    return len(new_rows)
+
+
+def aggregates_upsert(dialect: str):
+    """INSERT ... ON CONFLICT that merges bucket dicts into price_aggregates on SQLite or PostgreSQL."""
+    if dialect == 'postgresql':
+        insert_, lesser, greater = pg_insert, func.least, func.greatest
+    else:
+        insert_, lesser, greater = sqlite_insert, func.min, func.max  # SQLite's scalar min()/max()
+    stmt = insert_(PriceAggregate)
+    table = PriceAggregate.__table__.c
+    return stmt.on_conflict_do_update(
+        index_elements=['product_id', 'resolution', 'bucket_start'],
+        set_={
+            'min_price': lesser(table.min_price, stmt.excluded.min_price),
+            'max_price': greater(table.max_price, stmt.excluded.max_price),
+            'sum_price': table.sum_price + stmt.excluded.sum_price,
+            'checks': table.checks + stmt.excluded.checks,
+            'last_price': stmt.excluded.last_price,
+        },
+    )
+
+
+def record_aggregates(db: Session, observations: List[Observation]):
+    """Fold observations into the hourly and daily rollups (upsert)."""
+    buckets = {}
+    for product_id, price, checked_at in observations:
+        for resolution in RESOLUTIONS:
+            key = (product_id, resolution, bucket_start(checked_at, resolution))
+            agg = buckets.get(key)
+            if agg is None:
+                buckets[key] = {'product_id': product_id, 'resolution': resolution, 'bucket_start': key[2],
+                                'min_price': price, 'max_price': price, 'sum_price': price, 'checks': 1,
+                                'last_price': price}
+            else:
+                agg['min_price'] = min(agg['min_price'], price)
+                agg['max_price'] = max(agg['max_price'], price)
+                agg['sum_price'] += price
+                agg['checks'] += 1
+                agg['last_price'] = price
+    if not buckets:
+        return
+    db.execute(aggregates_upsert(db.bind.dialect.name), list(buckets.values()))
+
+
+def query_aggregates(db: Session, product_id: int, resolution: str,
+                     since: Optional[datetime], limit: int) -> List[dict]:
+    """Most recent ``limit`` buckets for a product, returned chronologically."""
+    query = select(PriceAggregate).where(
+        PriceAggregate.product_id == product_id, PriceAggregate.resolution == resolution)
+    if since is not None:
+        query = query.where(PriceAggregate.bucket_start >= since)
+    rows = db.scalars(query.order_by(PriceAggregate.bucket_start.desc()).limit(limit)).all()
+    return [
+        {
+            'product_id': row.product_id,
+            'timestamp': row.bucket_start,
+            'price': round(row.sum_price / row.checks, 2),
+            'min_price': row.min_price,
+            'max_price': row.max_price,
+            'checks': row.checks,
+        }
+        for row in reversed(rows)
+    ]
+
+
+def series_query(product_ids: Iterable[int], resolution: str, since: Optional[datetime]):
+    """(product_id, timestamp, last_seen, price) rows for ``build_series``, ordered by product then time.
+
+    ``raw`` reads price_history; ``hour`` / ``day`` read the rollups, one
+    point per bucket at its average price.
+    """
+    if resolution == 'raw':
+        query = select(PriceLog.product_id, PriceLog.timestamp, PriceLog.last_seen, PriceLog.price) \
+            .where(PriceLog.product_id.in_(set(product_ids)))
+        if since is not None:
+            query = query.where(PriceLog.timestamp >= since)
+        return query.order_by(PriceLog.product_id, PriceLog.timestamp)
+
+    query = select(PriceAggregate.product_id, PriceAggregate.bucket_start, null(),
+                   func.round(PriceAggregate.sum_price / PriceAggregate.checks, 2)) \
+        .where(PriceAggregate.resolution == resolution, PriceAggregate.product_id.in_(set(product_ids)))
+    if since is not None:
+        query = query.where(PriceAggregate.bucket_start >= bucket_start(since, resolution))
+    return query.order_by(PriceAggregate.product_id, PriceAggregate.bucket_start)
+
+
+def _epoch_ms(ts: datetime) -> int:
+    return (ts - EPOCH) // timedelta(milliseconds=1)
+
+
+def build_series(rows: Iterable[Tuple[int, datetime, Optional[datetime], float]], points: int,
+                 method: str = 'lttb') -> Dict[int, Dict[str, list]]:
+    """Columnar per-product series from (product_id, timestamp, last_seen, price) rows.
+
+    Rows must be ordered by product then timestamp. A change-point run adds a
+    second point at ``last_seen`` so charts show how long the price held.
+    Each series is downsampled to at most ``points`` points (0 keeps all).
+    """
+    series: Dict[int, Dict[str, list]] = {}
+    for product_id, timestamp, last_seen, price in rows:
+        columns = series.get(product_id)
+        if columns is None:
+            columns = series[product_id] = {'timestamp': [], 'price': []}
+        columns['timestamp'].append(_epoch_ms(timestamp))
+        columns['price'].append(price)
+        if last_seen is not None and last_seen > timestamp:
+            columns['timestamp'].append(_epoch_ms(last_seen))
+            columns['price'].append(price)
+
+    if points:
+        for columns in series.values():
+            keep = downsample(columns['timestamp'], columns['price'], points, method)
+            if len(keep) < len(columns['timestamp']):
+                columns['timestamp'] = [columns['timestamp'][i] for i in keep]
+                columns['price'] = [columns['price'][i] for i in keep]
+    return series
+
+
+def series_to_arrow(series: Dict[int, Dict[str, list]]) -> bytes:
+    """Arrow IPC stream (product_id, timestamp, price). Raises ImportError without pyarrow."""
+    import pyarrow as pa
+
+    product_ids, timestamps, prices = [], [], []
+    for product_id, columns in series.items():
+        product_ids.extend([product_id] * len(columns['price']))
+        timestamps.extend(columns['timestamp'])
+        prices.extend(columns['price'])
+    table = pa.table({
+        'product_id': pa.array(product_ids, pa.int64()),
+        'timestamp': pa.array(timestamps, pa.timestamp('ms')),
+        'price': pa.array(prices, pa.float64()),
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _spread_checks(rows: pd.DataFrame) -> pd.DataFrame:
+    """One (run, product_id, checked_at, price) row per check, spaced evenly from a run's timestamp to last_seen."""
+    import numpy as np
+    import pandas as pd
+
+    counts = rows['checks'].to_numpy()
+    first = rows['timestamp'].to_numpy('datetime64[ns]').astype('int64')
+    last = rows['last_seen'].fillna(rows['timestamp']).to_numpy('datetime64[ns]').astype('int64')
+    # Integer steps, so evenly spaced checks land exactly where they were taken
+    step, remainder = np.divmod(np.maximum(last - first, 0), np.maximum(counts - 1, 1))
+    run = np.repeat(np.arange(len(rows)), counts)
+    nth = np.arange(len(run)) - np.repeat(np.cumsum(counts) - counts, counts)
+    at = first[run] + nth * step[run] + nth * remainder[run] // np.maximum(counts - 1, 1)[run]
+    return pd.DataFrame({'run': run, 'product_id': rows['product_id'].to_numpy()[run],
+                         'checked_at': pd.to_datetime(at), 'price': rows['price'].to_numpy()[run]})
+
+
+def bucket_expr(column, resolution: str, dialect: str):
+    """SQL for the start of the hour/day containing ``column`` (what ``bucket_start`` does in Python)."""
+    if dialect == 'postgresql':
+        return func.date_trunc(literal_column(f"'{resolution}'"), column)  # inline, so GROUP BY matches it
+    fmt = '%Y-%m-%d %H:00:00.000000' if resolution == 'hour' else '%Y-%m-%d 00:00:00.000000'
+    return func.strftime(fmt, column)
+
+
+# Per-bucket slices of runs that cross a bucket boundary, staged for one rebuild
+_RUN_PIECES = Table(
+    'rebuild_run_pieces', MetaData(),
+    Column('product_id', Integer), Column('price', Float), Column('seen', DateTime), Column('weight', Integer),
+    prefixes=['TEMPORARY'],
+)
+
+
+def _run_pieces(db: Session, resolution: str, dialect: str) -> List[dict]:
+    """Split the runs crossing a ``resolution`` boundary into one piece per bucket they cover."""
+    import pandas as pd
+
+    seen = func.coalesce(PriceLog.last_seen, PriceLog.timestamp)
+    rows = pd.DataFrame(db.execute(
+        select(PriceLog.product_id, PriceLog.timestamp, PriceLog.last_seen, PriceLog.price,
+               func.coalesce(PriceLog.checks, 1))
+        .where(PriceLog.last_seen > PriceLog.timestamp,
+               bucket_expr(PriceLog.timestamp, resolution, dialect) != bucket_expr(seen, resolution, dialect))
+        .order_by(PriceLog.product_id, PriceLog.timestamp)
+    ).all(), columns=['product_id', 'timestamp', 'last_seen', 'price', 'checks'])
+    if rows.empty:
+        return []
+    rows['timestamp'], rows['last_seen'] = pd.to_datetime(rows['timestamp']), pd.to_datetime(rows['last_seen'])
+    checks = _spread_checks(rows)
+    run = checks['run']
+    pieces = checks.groupby([run, checks['checked_at'].dt.floor('h' if resolution == 'hour' else 'D')], sort=False) \
+        .agg(product_id=('product_id', 'first'), price=('price', 'first'), seen=('checked_at', 'max'),
+             weight=('price', 'size'))
+    return [{'product_id': int(pid), 'price': float(price), 'seen': at.to_pydatetime(), 'weight': int(weight)}
+            for pid, price, at, weight in pieces.itertuples(index=False)]
+
+
+def rebuild_aggregates(db: Session):
+    """Recompute every rollup from price_history (one-off backfill). Works on SQLite and PostgreSQL.
+
+    Rows inside one bucket are folded by the database. Runs that cross a
+    bucket boundary are spread over the buckets they cover first (pandas,
+    imported here rather than with the module).
+    """
+    dialect = db.bind.dialect.name
+    conn = db.connection()
+    _RUN_PIECES.create(conn, checkfirst=True)
+    db.execute(delete(PriceAggregate))
+    seen = func.coalesce(PriceLog.last_seen, PriceLog.timestamp)
+    for resolution in RESOLUTIONS:
+        conn.execute(_RUN_PIECES.delete())
+        pieces = _run_pieces(db, resolution, dialect)
+        if pieces:
+            conn.execute(_RUN_PIECES.insert(), pieces)
+
+        source = union_all(
+            select(PriceLog.product_id, PriceLog.price, seen.label('seen'),
+                   func.coalesce(PriceLog.checks, 1).label('weight'))
+            .where(or_(PriceLog.last_seen.is_(None), PriceLog.last_seen <= PriceLog.timestamp,
+                       bucket_expr(PriceLog.timestamp, resolution, dialect) == bucket_expr(seen, resolution, dialect))),
+            select(_RUN_PIECES.c.product_id, _RUN_PIECES.c.price, _RUN_PIECES.c.seen, _RUN_PIECES.c.weight),
+        ).subquery()
+        bucket = bucket_expr(source.c.seen, resolution, dialect)
+        ranked = select(
+            source.c.product_id, source.c.price, source.c.weight, bucket.label('bucket'),
+            func.first_value(source.c.price).over(partition_by=[source.c.product_id, bucket],
+                                                  order_by=source.c.seen.desc()).label('closing_price'),
+        ).subquery()
+        db.execute(insert(PriceAggregate).from_select(
+            ['product_id', 'resolution', 'bucket_start', 'min_price', 'max_price', 'sum_price', 'checks',
+             'last_price'],
+            select(ranked.c.product_id, literal(resolution, String), ranked.c.bucket, func.min(ranked.c.price),
+                   func.max(ranked.c.price), func.sum(ranked.c.price * ranked.c.weight), func.sum(ranked.c.weight),
+                   func.max(ranked.c.closing_price))
+            .group_by(ranked.c.product_id, ranked.c.bucket),
+        ))
+    _RUN_PIECES.drop(conn)
+    db.commit()
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['rebuild']:
+        sys.exit(__doc__)
+    from .database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        rebuild_aggregates(session)
+        print(f"[v] Rebuilt {session.query(PriceAggregate).count()} aggregate buckets")
+    finally:
+        session.close()
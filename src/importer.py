@@ -0,0 +1,162 @@
+"""One-shot bulk import of price history CSV files into the database.
+
+Accepts both formats this project writes:
+
+* the standalone tracker's ``data/price_history.csv`` (Date, Time, Price in
+  local time) - needs ``--product-id`` or ``--url`` to say which product it is
+* ``GET /export`` CSVs (id, product_id, timestamp, ...) - product ids are in the file
+
+Rows already present (same product and timestamp) are skipped, so re-running
+an import is harmless. Everything loads in one transaction and is folded
+into the hourly/daily rollups; the imported products' product_stats rows
+are recomputed in that same transaction. The ``/stats`` totals of the
+process that ran the import are updated on commit; a running API picks the
+new checks up at its next recount (STATS_REFRESH_SECONDS).
+
+    python -m src.importer data/price_history.csv --url https://www.amazon.in/dp/B09V4B6K53
+    python -m src.importer export.csv
+"""
+import argparse
+import csv
+import sys
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.orm import Session
+
+from .canonical import canonical_url, extract_asin
+from .analytics import refresh_stats
+from .history import record_aggregates
+from .models import PriceLog, Product
+from .stats import counters
+
+BATCH_ROWS = 5000
+
+
+def _parse_time(value: str) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def read_rows(path: str, product_id: Optional[int] = None) -> Iterator[dict]:
+    """price_history rows (as dicts) from either CSV format."""
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        columns = set(reader.fieldnames or ())
+        if 'product_id' in columns:
+            for row in reader:
+                yield {
+                    'product_id': int(row['product_id']),
+                    'price': float(row['price']),
+                    'timestamp': _parse_time(row['timestamp']),
+                    'last_seen': _parse_time(row.get('last_seen', '')),
+                    'checks': int(row.get('checks') or 1),
+                }
+        elif {'Date', 'Time', 'Price'} <= columns:
+            if product_id is None:
+                raise ValueError(f"{path}: tracker CSVs need --product-id or --url")
+            for row in reader:
+                local = datetime.strptime(f"{row['Date']} {row['Time']}", "%Y-%m-%d %H:%M:%S")
+                yield {
+                    'product_id': product_id,
+                    'price': float(row['Price']),
+                    # Tracker logged local wall-clock time; the DB stores naive UTC
+                    'timestamp': local.astimezone(timezone.utc).replace(tzinfo=None),
+                    'last_seen': None,
+                    'checks': 1,
+                }
+        else:
+            raise ValueError(f"{path}: unrecognised columns {sorted(columns)}")
+
+
+def _insert_batch(db: Session, batch: List[dict], known_products: set) -> List[dict]:
+    """Insert the rows not already stored. Returns the inserted rows."""
+    rows = [row for row in batch if row['product_id'] in known_products]
+    if not rows:
+        return []
+    existing = set(db.execute(
+        select(PriceLog.product_id, PriceLog.timestamp).where(
+            PriceLog.product_id.in_({row['product_id'] for row in rows}),
+            PriceLog.timestamp.between(min(row['timestamp'] for row in rows), max(row['timestamp'] for row in rows)),
+        )
+    ))
+    new_rows, seen = [], set()
+    for row in rows:
+        key = (row['product_id'], row['timestamp'])
+        if key not in existing and key not in seen:
+            seen.add(key)
+            new_rows.append(row)
+    if new_rows:
+        db.execute(insert(PriceLog), new_rows)
+        record_aggregates(db, [(row['product_id'], row['price'], row['timestamp'])
+                               for row in new_rows for _ in range(row['checks'])])
+    return new_rows
+
+
+def import_csv(db: Session, paths: List[str], product_id: Optional[int] = None,
+               batch_size: int = BATCH_ROWS) -> tuple:
+    """Load CSV files in one transaction. Returns (rows read, rows inserted)."""
+    known_products = set(db.scalars(select(Product.id)))
+    read = inserted = checks = 0
+    touched = set()
+
+    def load(batch: List[dict]):
+        nonlocal inserted, checks
+        new_rows = _insert_batch(db, batch, known_products)
+        inserted += len(new_rows)
+        checks += sum(row['checks'] for row in new_rows)
+        touched.update(row['product_id'] for row in new_rows)
+
+    try:
+        for path in paths:
+            batch = []
+            for row in read_rows(path, product_id):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    load(batch)
+                    read += len(batch)
+                    batch = []
+            if batch:
+                load(batch)
+                read += len(batch)
+        if touched:
+            refresh_stats(db, touched)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    counters.add('total_price_checks', checks)
+    return read, inserted
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Bulk-load price history CSV files into the database.")
+    parser.add_argument('paths', nargs='+', help="CSV files to import")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--product-id', type=int, help="product the tracker CSV belongs to")
+    target.add_argument('--url', help="product URL the tracker CSV belongs to")
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal, engine
+    from .models import init_db
+
+    init_db(engine)
+    db = SessionLocal()
+    try:
+        product_id = args.product_id
+        if args.url:
+            url, asin = canonical_url(args.url), extract_asin(args.url)
+            match = Product.url.in_({args.url, url})
+            product_id = db.scalar(select(Product.id).where(or_(match, Product.asin == asin) if asin else match))
+            if product_id is None:
+                sys.exit(f"[!] No tracked product with URL {args.url}")
+        read, inserted = import_csv(db, args.paths, product_id)
+        print(f"[v] Imported {inserted} of {read} rows ({read - inserted} duplicates or unknown products skipped)")
+    except ValueError as e:
+        sys.exit(f"[!] {e}")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Logging setup shared by the API, queue workers and the standalone tracker.
+
+LOG_LEVEL sets the threshold (default INFO). LOG_FORMAT picks the output:
+
+* ``text`` (default): one readable line per record
+* ``json``: one JSON object per line, for log shippers. Any ``extra={...}``
+  fields passed to a log call (product_id, url, outcome, seconds, ...)
+  become top-level keys.
+"""
+import json
+import logging
+import os
+import sys
+
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRS})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def setup_logging():
+    """Configure the root logger from the environment (idempotent)."""
+    handler = logging.StreamHandler(sys.stdout)
+    if os.getenv('LOG_FORMAT', 'text') == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)-7s %(name)s: %(message)s'))
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), handlers=[handler], force=True)
@@ -1,28 +1,43 @@
 import os
-import smtplib
-import ssl
-from typing import List
-from datetime import datetime
-from email.message import EmailMessage
-
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+import time
+import logging
+from typing import List, Literal
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from apscheduler.schedulers.background import BackgroundScheduler
 from dotenv import load_dotenv
 from pydantic import BaseModel
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from .models import Base, Product, PriceLog
-from .scraper import fetch_amazon_price
+from .alerts import dispatcher
+from .analytics import backfill_if_empty
+from .bulk import format_for, import_products, job_progress, parse_rows
+from .canonical import backfill_asins, canonical_url, extract_asin
+from .captures import captures, list_captures, read_capture, read_header
+from .checker import check_prices_job
+from .database import async_engine, engine, SessionLocal, get_async_db
+from .events import bus, event_tail
+from .export import csv_chunks, high_watermark, iter_batches, parquet_available, parquet_chunks
+from .history import build_series, pick_resolution, query_aggregates, series_query, series_to_arrow
+from .logs import setup_logging
+from .metrics import HTTP_SECONDS
+from .ratelimit import limiter
+from .models import Product, PriceAggregate, PriceLog, ProductStats, init_db
+from .profiling import PYINSTRUMENT_AVAILABLE, profile_dir, profile_sweep
+from .stats import counters
+from .scraper import close_client, pool_stats, shutdown_parse_pool
+from .taskqueue import coordinate, enqueue, queue_stats, scheduler_mode
 
 # --- CONFIG ---
 load_dotenv()
-SQLALCHEMY_DATABASE_URL = "sqlite:///./data/tracker.db"
-from fastapi import FastAPI, Depends
-
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base.metadata.create_all(bind=engine)
+setup_logging()
+log = logging.getLogger(__name__)
 
 app = FastAPI(
     title="🛒 Amazon Price Tracker API",
@@ -31,6 +46,16 @@ app = FastAPI(
 )
 scheduler = BackgroundScheduler()
 
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    """Time every request, labelled by route template so /products/{product_id} stays one series."""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get('route')
+    HTTP_SECONDS.labels(request.method, getattr(route, 'path', 'unmatched'),
+                        response.status_code).observe(time.perf_counter() - start)
+    return response
+
 # --- Pydantic Schemas (Input Validation) ---
 class ProductCreate(BaseModel):
     title: str
@@ -39,106 +64,115 @@ class ProductCreate(BaseModel):
 
 class ProductResponse(ProductCreate):
     id: int
+    asin: str | None = None
     last_price: float | None = None
     last_check: datetime | None = None
     
     class Config:
         from_attributes = True
 
+class ProductStatsResponse(BaseModel):
+    product_id: int
+    title: str | None = None
+    target_price: float | None = None
+    last_price: float | None = None
+    all_time_low: float | None = None
+    low_at: datetime | None = None
+    all_time_high: float | None = None
+    avg_7d: float | None = None
+    avg_30d: float | None = None
+    pct_from_low: float | None = None
+    checks: int | None = None
+    drops: int | None = None
+    drop_frequency: float | None = None
+    deal_score: float | None = None
+    updated_at: datetime | None = None
+
+class CaptureResponse(BaseModel):
+    id: str
+    product_ids: List[int]
+    outcome: str
+    captured_at: datetime
+    stored_bytes: int
+    url: str | None = None
+    status: int | None = None
+    layout: str | None = None
+
+class ImportJobResponse(BaseModel):
+    id: int
+    status: Literal['checking', 'done']
+    format: str
+    rows: int
+    created: int
+    duplicates: int
+    invalid: int
+    errors: List[dict]
+    products: int
+    checked: int
+    priced: int
+    created_at: datetime
+
+PRODUCT_FIELDS = tuple(ProductResponse.model_fields)
+MAX_BULK_IDS = 1000
+
 class PriceLogResponse(BaseModel):
     id: int
     product_id: int
     price: float
     timestamp: datetime
+    last_seen: datetime | None = None
+    checks: int | None = None
     
     class Config:
         from_attributes = True
 
-# --- Dependency ---
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-# --- NOTIFICATION LOGIC ---
-def send_email_alert(product_title: str, current_price: float, link: str):
-    """Send email notification when price drops below target."""
-    sender = os.getenv('EMAIL_USER')
-    password = os.getenv('EMAIL_PASS')
-    receiver = os.getenv('EMAIL_RECEIVER')
-    
-    if not sender or not password:
-        print("[!] Skipping email: Credentials missing in .env")
-        return
-
-    msg = EmailMessage()
-    msg['Subject'] = f"🚨 Price Drop Alert: {product_title} is ₹{current_price}!"
-    msg['From'] = sender
-    msg['To'] = receiver
-    msg.set_content(f"Great news! The price for {product_title} has dropped to ₹{current_price}!\n\nBuy Now: {link}")
-
-    try:
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as server:
-            server.login(sender, password)
-            server.sendmail(sender, receiver, msg.as_string())
-        print(f"[v] Email sent for {product_title}")
-    except Exception as e:
-        print(f"[!] Email error: {e}")
-
-# --- SCHEDULER TASKS ---
-def check_prices_job():
-    """Background job: Checks all products in DB and sends alerts."""
-    db = SessionLocal()
-    try:
-        products = db.query(Product).all()
-        print(f"\n[*] --- Starting Price Check Job ({len(products)} products) ---")
-        
-        for p in products:
-            new_price = fetch_amazon_price(p.url)
-            if new_price:
-                # 1. Update Product Status
-                p.last_price = new_price
-                p.last_check = datetime.utcnow()
-                
-                # 2. Log History
-                log = PriceLog(product_id=p.id, price=new_price)
-                db.add(log)
-                
-                # 3. Check Condition & Alert
-                if new_price <= p.target_price:
-                    print(f"[!] 💰 DEAL FOUND: {p.title} at ₹{new_price} (Target: ₹{p.target_price})")
-                    send_email_alert(p.title, new_price, p.url)
-                else:
-                    print(f"[+] {p.title}: ₹{new_price} (Target: ₹{p.target_price})")
-        
-        db.commit()
-        print("[*] --- Price Check Complete ---\n")
-    except Exception as e:
-        print(f"[!] Job error: {e}")
-    finally:
-        db.close()
+class PriceBucketResponse(BaseModel):
+    product_id: int
+    timestamp: datetime
+    price: float
+    min_price: float
+    max_price: float
+    checks: int
 
 # --- LIFECYCLE EVENTS ---
 @app.on_event("startup")
 def startup_event():
-    """Initialize scheduler on startup."""
-    scheduler.add_job(check_prices_job, 'interval', hours=1, id='price_check')
+    """Create/upgrade the schema (unless DB_MIGRATE_ON_STARTUP=0), then start the scheduler."""
+    # Here rather than at import: importing the app (tests, tooling) stays free of DB I/O
+    if int(os.getenv('DB_MIGRATE_ON_STARTUP', 1)):
+        init_db(engine)
+    tick = int(os.getenv('SCHEDULER_TICK_MINUTES', 5))
+    if scheduler_mode() == 'queue':
+        # Scraping happens in `python -m src.worker` processes; enqueueing is idempotent per product
+        scheduler.add_job(coordinate, 'interval', minutes=tick, id='price_check',
+                          max_instances=1, coalesce=True)
+        # Workers store their events in the database; relay them to this process's /events
+        scheduler.add_job(event_tail.poll, 'interval', args=[SessionLocal], id='event_relay',
+                          seconds=float(os.getenv('EVENT_RELAY_SECONDS', 1)), max_instances=1, coalesce=True,
+                          next_run_time=datetime.now())
+    else:
+        scheduler.add_job(check_prices_job, 'interval', minutes=tick, id='price_check',
+                          max_instances=1, coalesce=True)
+    scheduler.add_job(backfill_if_empty, args=[SessionLocal], id='analytics_backfill')
+    scheduler.add_job(backfill_asins, args=[SessionLocal], id='asin_backfill')
     scheduler.start()
-    print("[v] Scheduler started - checks every 1 hour")
+    log.info(f"Scheduler started ({scheduler_mode()} mode) - checking due products every {tick} min")
 
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
     """Gracefully shutdown scheduler."""
     scheduler.shutdown()
-    print("[*] Scheduler shutdown")
+    close_client()
+    shutdown_parse_pool()
+    dispatcher.close()
+    captures.close()
+    await async_engine.dispose()
+    log.info("Scheduler shutdown")
 
 # --- ENDPOINTS ---
 
 @app.get("/", tags=["Health"])
-def home():
+async def home():
     """API health check."""
     return {
         "status": "✅ Active",
@@ -147,77 +181,328 @@ def home():
     }
 
 @app.post("/products", response_model=ProductResponse, tags=["Products"])
-def add_product(product: ProductCreate, db: Session = Depends(get_db)):
-    """Add a new Amazon product to track."""
-    # Check if URL already exists
-    existing = db.query(Product).filter(Product.url == product.url).first()
-    if existing:
+async def add_product(product: ProductCreate, db: AsyncSession = Depends(get_async_db)):
+    """Add a new Amazon product to track. Its first price check is queued, not awaited.
+    
+    The URL is stored in canonical form (`https://www.amazon.in/dp/<ASIN>`), so tracking-parameter
+    and `/gp/product/` variants of a tracked item are rejected as duplicates.
+    """
+    url, asin = canonical_url(product.url), extract_asin(product.url)
+    # Older rows may hold a non-canonical URL for the same ASIN
+    candidates = select(Product.url).where(Product.url == url)
+    if asin:
+        candidates = candidates.union(select(Product.url).where(Product.asin == asin))
+    if any(canonical_url(existing) == url for existing in await db.scalars(candidates)):
         raise HTTPException(status_code=400, detail="Product URL already tracked")
     
-    db_product = Product(**product.dict())
+    db_product = Product(**product.model_dump(exclude={'url'}), url=url, asin=asin)
     db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
-    
-    # Trigger immediate price check
-    price = fetch_amazon_price(db_product.url)
-    if price:
-        db_product.last_price = price
-        db_product.last_check = datetime.utcnow()
-        db.commit()
-        print(f"[+] Product added: {db_product.title} at ₹{price}")
+    await db.commit()
+    counters.add('total_products', 1)
+    bus.publish('product_added', product=ProductResponse.model_validate(db_product).model_dump())
     
+    # next_check_at is NULL, so the next tick would pick it up anyway; this just runs it now
+    if scheduler_mode() == 'queue':
+        await db.run_sync(enqueue, product_ids=[db_product.id])
+        await db.commit()
+    else:
+        scheduler.add_job(check_prices_job, kwargs={'product_ids': [db_product.id]},
+                          id=f"first_check_{db_product.id}", replace_existing=True)
+    log.info(f"Product added: {db_product.title} (first check queued)", extra={'product_id': db_product.id})
     return db_product
 
+@app.post("/products/bulk", response_model=ImportJobResponse, status_code=202, tags=["Products"])
+async def bulk_import_products(request: Request, format: Literal['csv', 'ndjson'] | None = None,
+                               db: AsyncSession = Depends(get_async_db)):
+    """Add many products from a CSV or JSON-lines body (`title`, `url`, `target_price` per row).
+    
+    The format comes from the Content-Type (`text/csv`, `application/x-ndjson`) unless `format` is given.
+    Already tracked and repeated URLs are skipped, the rest are inserted in one transaction, and their first
+    checks run as one concurrent sweep. Poll `GET /products/bulk/{job_id}` for progress.
+    """
+    fmt = format or format_for(request.headers.get('content-type'))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or pass ?format=")
+    try:
+        rows, errors, read = parse_rows(await request.body(), fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    job, product_ids = await db.run_sync(import_products, rows, fmt, read, errors)
+    job_id = job.id
+    await db.commit()
+    if product_ids:
+        counters.add('total_products', len(product_ids))
+        # Same path as a sweep: one job, fetched concurrently, written in batches
+        if scheduler_mode() == 'queue':
+            await db.run_sync(enqueue, product_ids=product_ids)
+            await db.commit()
+        else:
+            scheduler.add_job(check_prices_job, kwargs={'product_ids': product_ids},
+                              id=f"bulk_import_{job_id}", replace_existing=True)
+        bus.publish('products_imported', job_id=job_id, created=len(product_ids))
+    log.info(f"Bulk import {job_id}: {len(product_ids)} added, {len(rows) - len(product_ids)} duplicates, "
+             f"{len(errors)} invalid", extra={'job_id': job_id, 'products': len(product_ids)})
+    return await db.run_sync(job_progress, job_id)
+
+@app.get("/products/bulk/{job_id}", response_model=ImportJobResponse, tags=["Products"])
+async def get_bulk_import(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Progress of a bulk import: how many of its new products have been checked and priced so far."""
+    progress = await db.run_sync(job_progress, job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return progress
+
 @app.get("/products", response_model=List[ProductResponse], tags=["Products"])
-def get_products(db: Session = Depends(get_db)):
-    """List all tracked products."""
-    return db.query(Product).all()
+async def get_products(response: Response, limit: int = Query(100, ge=1, le=1000), after: int | None = None,
+                       fields: str | None = None, at_or_below_target: bool = False,
+                       db: AsyncSession = Depends(get_async_db)):
+    """List tracked products in id order, `limit` per page.
+    
+    Pass the `X-Next-Cursor` response header back as `after` to get the next page (no header on the last page).
+    `fields=id,title,last_price` returns only those columns; `at_or_below_target=true` lists current deals.
+    """
+    names = list(PRODUCT_FIELDS)
+    if fields:
+        names = [name.strip() for name in fields.split(',') if name.strip()]
+        unknown = set(names) - set(PRODUCT_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    
+    # Keyset pagination on the primary key: each page is an index range scan, however deep
+    query = select(Product.id, *(getattr(Product, name) for name in names if name != 'id'))
+    if after is not None:
+        query = query.where(Product.id > after)
+    if at_or_below_target:
+        query = query.where(Product.last_price.is_not(None), Product.last_price <= Product.target_price)
+    rows = (await db.execute(query.order_by(Product.id).limit(limit + 1))).mappings().all()
+    
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers['X-Next-Cursor'] = str(rows[-1]['id'])
+    items = [{name: row[name] for name in names} for row in rows]
+    if fields:
+        # Partial rows don't fit ProductResponse, so skip response_model validation
+        return JSONResponse(jsonable_encoder(items), headers=headers)
+    response.headers.update(headers)
+    return items
 
 @app.get("/products/{product_id}", response_model=ProductResponse, tags=["Products"])
-def get_product(product_id: int, db: Session = Depends(get_db)):
+async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get details of a specific product."""
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
 
 @app.delete("/products/{product_id}", tags=["Products"])
-def delete_product(product_id: int, db: Session = Depends(get_db)):
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
     """Remove a product from tracking."""
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    db.delete(product)
-    db.commit()
+    # Set-based deletes: an ORM cascade would lazy-load every history row first
+    await db.execute(delete(PriceLog).where(PriceLog.product_id == product_id))
+    await db.execute(delete(PriceAggregate).where(PriceAggregate.product_id == product_id))
+    await db.execute(delete(ProductStats).where(ProductStats.product_id == product_id))
+    await db.execute(delete(Product).where(Product.id == product_id))
+    await db.commit()
+    counters.invalidate()  # its price checks left with it
+    bus.publish('product_deleted', product_id=product_id)
     return {"message": f"Product {product.title} deleted"}
 
-@app.get("/products/{product_id}/history", response_model=List[PriceLogResponse], tags=["History"])
-def get_price_history(product_id: int, limit: int = 100, db: Session = Depends(get_db)):
-    """Get price history for a product (for charts/analytics)."""
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+@app.get("/products/{product_id}/history", response_model=List[PriceLogResponse] | List[PriceBucketResponse], tags=["History"])
+async def get_price_history(product_id: int, limit: int = 100, days: int | None = None,
+                            resolution: Literal["raw", "hour", "day", "auto"] = "raw",
+                            db: AsyncSession = Depends(get_async_db)):
+    """Get price history for a product (for charts/analytics).
+    
+    `resolution=hour|day` serves pre-aggregated buckets; `auto` picks one from `days`.
+    """
+    if not await db.scalar(select(Product.id).where(Product.id == product_id)):
         raise HTTPException(status_code=404, detail="Product not found")
     
-    history = db.query(PriceLog).filter(PriceLog.product_id == product_id).order_by(PriceLog.timestamp.desc()).limit(limit).all()
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    if resolution == "auto":
+        resolution = pick_resolution(days)
+    if resolution != "raw":
+        return await db.run_sync(query_aggregates, product_id, resolution, since, limit)
+    
+    query = select(PriceLog).where(PriceLog.product_id == product_id)
+    if since is not None:
+        query = query.where(PriceLog.timestamp >= since)
+    history = (await db.scalars(query.order_by(PriceLog.timestamp.desc()).limit(limit))).all()
     return list(reversed(history))  # Return chronologically
 
+@app.get("/history", tags=["History"])
+async def get_bulk_history(ids: str, days: int = Query(30, ge=1, le=3650),
+                           resolution: Literal["raw", "hour", "day", "auto"] = "auto",
+                           points: int = Query(200, ge=0, le=5000), method: Literal["lttb", "minmax"] = "lttb",
+                           format: Literal["json", "arrow"] = "json", db: AsyncSession = Depends(get_async_db)):
+    """Price history for many products in one query (for dashboards).
+    
+    `ids=1,2,3` selects products (required, at most 1000). `days` (default 30) bounds the range, and
+    `resolution=auto` serves ranges over two days from the hourly/daily rollups. Each series is downsampled
+    server-side to at most `points` points (`0` = no downsampling). The JSON response is columnar:
+    `{"series": {"<id>": {"timestamp": [epoch ms, ...], "price": [...]}}}`.
+    `format=arrow` returns an Arrow IPC stream of (product_id, timestamp, price) if pyarrow is installed.
+    """
+    try:
+        product_ids = {int(pid) for pid in ids.split(',') if pid.strip()}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not product_ids:
+        raise HTTPException(status_code=400, detail="ids must name at least one product")
+    if len(product_ids) > MAX_BULK_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_IDS} ids per request")
+    if resolution == "auto":
+        resolution = pick_resolution(days)
+    since = datetime.utcnow() - timedelta(days=days)
+    
+    # One index range scan for all products instead of a request per product
+    rows = (await db.execute(series_query(product_ids, resolution, since))).all()
+    # Downsampling is CPU-bound Python: keep it off the event loop
+    series = await run_in_threadpool(build_series, rows, points, method)
+    if format == "arrow":
+        try:
+            return Response(await run_in_threadpool(series_to_arrow, series),
+                            media_type="application/vnd.apache.arrow.stream")
+        except ImportError:
+            raise HTTPException(status_code=501, detail="format=arrow requires pyarrow")
+    return {"series": series}
+
+@app.get("/export", tags=["History"])
+async def export_history(format: Literal["csv", "parquet"] = "csv", since: int = Query(0, ge=0),
+                         product_id: int | None = None):
+    """Stream price_history rows with id > `since` as CSV or Parquet.
+    
+    Memory use is constant regardless of table size. The `X-Next-Since` header is the watermark to pass
+    as `since` next time to pull only new rows.
+    """
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="format=parquet requires pyarrow")
+    upper = max(since, await high_watermark(product_id))
+    batches = iter_batches(since, upper, product_id)
+    body = parquet_chunks(batches) if format == "parquet" else csv_chunks(batches)
+    media_type = "application/vnd.apache.parquet" if format == "parquet" else "text/csv"
+    return StreamingResponse(body, media_type=media_type, headers={
+        "X-Next-Since": str(upper),
+        "Content-Disposition": f"attachment; filename=price_history_{since}_{upper}.{format}",
+    })
+
+def _stats_query():
+    return select(ProductStats.__table__, Product.title, Product.target_price).join(
+        Product, Product.id == ProductStats.product_id)
+
+@app.get("/analytics/deals", response_model=List[ProductStatsResponse], tags=["Analytics"])
+async def get_top_deals(limit: int = Query(50, ge=1, le=1000), min_score: float = 0,
+                        db: AsyncSession = Depends(get_async_db)):
+    """Products ranked by deal score (0-100: price vs target, nearness to the all-time low, discount vs 30-day average).
+    
+    Served from the materialized product_stats table, refreshed after every sweep batch.
+    """
+    query = _stats_query().where(ProductStats.deal_score >= min_score)
+    rows = await db.execute(query.order_by(ProductStats.deal_score.desc()).limit(limit))
+    return rows.mappings().all()
+
+@app.get("/analytics/products/{product_id}", response_model=ProductStatsResponse, tags=["Analytics"])
+async def get_product_analytics(product_id: int, db: AsyncSession = Depends(get_async_db)):
+    """All-time low/high, rolling averages, drop frequency and deal score for one product."""
+    row = (await db.execute(_stats_query().where(ProductStats.product_id == product_id))).mappings().first()
+    if not row:
+        raise HTTPException(status_code=404, detail="No analytics yet for this product")
+    return row
+
+@app.get("/events", tags=["Live"])
+async def stream_events(request: Request, last_event_id: str | None = Header(None),
+                        heartbeat: float = Query(15, ge=1, le=60)):
+    """Server-Sent Events: `price_change`, `deal`, `product_added`, `products_imported`, `product_deleted`, `sweep`.
+    
+    Reconnecting with `Last-Event-ID` replays missed events. A `resync` event means the client fell
+    too far behind and should reload its data. A keep-alive comment is sent after `heartbeat` quiet seconds.
+    """
+    subscription = bus.subscribe(int(last_event_id) if last_event_id and last_event_id.isdigit() else None)
+    
+    async def body():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=heartbeat)
+                yield event.encode() if event else ": keep-alive\n\n"
+        finally:
+            bus.unsubscribe(subscription)
+    
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.post("/trigger-scan", tags=["Admin"])
-def trigger_manual_scan(background_tasks: BackgroundTasks):
+async def trigger_manual_scan():
     """Force an immediate price check on all tracked items."""
-    background_tasks.add_task(check_prices_job)
+    # Scheduler thread, not the request threadpool: a long sweep must not starve API handlers
+    if scheduler_mode() == 'queue':
+        scheduler.add_job(coordinate, kwargs={'force': True}, id='manual_scan', replace_existing=True)
+    else:
+        scheduler.add_job(check_prices_job, kwargs={'force': True}, id='manual_scan', replace_existing=True)
     return {"message": "✅ Scan triggered - running in background"}
 
 @app.get("/stats", tags=["Admin"])
-def get_stats(db: Session = Depends(get_db)):
-    """Get system statistics."""
-    total_products = db.query(Product).count()
-    total_logs = db.query(PriceLog).count()
+async def get_stats(db: AsyncSession = Depends(get_async_db)):
+    """Get system statistics. Totals come from in-process counters, not a table scan per call."""
+    totals = counters.snapshot()
+    if totals is None:
+        totals = {
+            "total_products": await db.scalar(select(func.count(Product.id))),
+            # Change-point rows carry a run length, so count checks rather than rows
+            "total_price_checks": await db.scalar(select(func.coalesce(func.sum(func.coalesce(PriceLog.checks, 1)), 0))),
+        }
+        counters.load(totals)
     
     return {
-        "total_products": total_products,
-        "total_price_checks": total_logs,
+        **totals,
         "database": "SQLite",
-        "scheduler": "APScheduler (1-hour interval)"
+        "scheduler": f"APScheduler (per-product adaptive intervals, {scheduler_mode()} mode)",
+        "http_pool": pool_stats(),
+        "rate_limits": limiter.stats(),
+        "alerts": dispatcher.stats(),
+        "captures": captures.stats(),
+        "events": bus.stats(),
+        "check_queue": await db.run_sync(queue_stats) if scheduler_mode() == 'queue' else None
     }
+
+@app.get("/metrics", tags=["Admin"], include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.post("/admin/profile-sweep", status_code=202, tags=["Admin"])
+async def trigger_profiled_sweep(engine: Literal['cprofile', 'pyinstrument'] = 'cprofile'):
+    """Run one forced sweep under a profiler; the report lands in PROFILE_DIR (default data/profiles)."""
+    if engine == 'pyinstrument' and not PYINSTRUMENT_AVAILABLE:
+        raise HTTPException(status_code=501, detail="pyinstrument is not installed")
+    scheduler.add_job(profile_sweep, kwargs={'engine': engine}, id='profile_sweep', replace_existing=True)
+    return {"message": f"✅ Profiled sweep started ({engine})", "profile_dir": profile_dir()}
+
+# Plain `def`: listing and decompressing captures is disk work, so these run in the threadpool
+@app.get("/admin/captures", response_model=List[CaptureResponse], tags=["Admin"])
+def get_captures(product_id: int | None = None, outcome: str | None = None,
+                 limit: int = Query(50, ge=1, le=500)):
+    """Stored pages of failed checks (CAPTCHA, block, parse failure), newest first."""
+    found = []
+    for capture in list_captures(product_id, outcome, limit):
+        header = read_header(capture)
+        found.append(CaptureResponse(id=capture.id, product_ids=capture.product_ids, outcome=capture.outcome,
+                                     captured_at=capture.captured_at, stored_bytes=capture.stored_bytes,
+                                     url=header.get('url'), status=header.get('status'), layout=header.get('layout')))
+    return found
+
+@app.get("/admin/captures/{capture_id}", tags=["Admin"])
+def get_capture(capture_id: str):
+    """One captured page, exactly as it was received (served as text/plain so it is not rendered)."""
+    found = read_capture(capture_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Capture not found (it may have been evicted)")
+    header, content = found
+    return Response(content, media_type="text/plain; charset=utf-8",
+                    headers={"X-Capture-Url": header.get('url') or '', "X-Capture-Outcome": header['outcome']})
@@ -0,0 +1,69 @@
+"""Prometheus metrics for the sweep hot path and the API, served at GET /metrics.
+
+Queue workers (python -m src.worker) serve their own registry on
+METRICS_PORT when it is set.
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+FETCH_SECONDS = Histogram(
+    'scrape_fetch_seconds', 'HTTP fetch latency per product page, by outcome', ['outcome'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+PARSE_SECONDS = Histogram(
+    'scrape_parse_seconds', 'Price extraction time per page',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
+COALESCED_RESULTS = Counter(
+    'scrape_coalesced_results', 'Results served without a fetch of their own, by source', ['source'],
+)
+EXTRACT_STRATEGY_RESULTS = Counter(
+    'extract_strategy_results', 'Extraction strategy attempts, by page layout and outcome',
+    ['layout', 'strategy', 'result'],
+)
+EXTRACT_PAGES = Counter('extract_pages', 'Parsed pages, by layout and whether a price was found', ['layout', 'result'])
+EXTRACT_HIT_RATE = Gauge('extract_layout_hit_rate', "Recent share of a layout's pages whose first strategy hit",
+                         ['layout'])
+CAPTURES = Counter('failure_captures', 'Failed pages sent to the capture store, by outcome and result',
+                   ['outcome', 'result'])
+PARSE_QUEUE_DEPTH = Gauge('scrape_parse_queue_depth', 'Fetched pages waiting for the parse stage')
+
+DB_FLUSH_SECONDS = Histogram(
+    'db_flush_seconds', 'PriceWriter batch flush time',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+DB_ROWS_WRITTEN = Counter('db_price_rows_written', 'price_history rows inserted by sweeps')
+DB_CHECKS_WRITTEN = Counter('db_price_checks_written', 'Price checks recorded by sweeps (rows inserted or runs extended)')
+
+SWEEP_SECONDS = Histogram(
+    'sweep_duration_seconds', 'Wall time of one check run',
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800),
+)
+SWEEP_PRODUCTS = Counter('sweep_products_checked', 'Products checked by sweeps')
+CHECK_QUEUE_DEPTH = Gauge('check_queue_depth', 'check_tasks rows (queue mode), by state', ['state'])
+
+ALERT_QUEUE_DEPTH = Gauge('alert_queue_depth', 'Deals waiting for the alert dispatcher')
+ALERT_SEND_SECONDS = Histogram(
+    'alert_send_seconds', 'SMTP time per alert email, including retries', ['result'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+ALERT_DELIVERY_SECONDS = Histogram(
+    'alert_delivery_seconds', 'Time from deal found to email sent (queue + digest window + SMTP)',
+    buckets=(1, 5, 15, 30, 60, 120, 300, 900),
+)
+EVENT_SUBSCRIBERS = Gauge('event_subscribers', 'Connected /events clients')
+
+HTTP_SECONDS = Histogram(
+    'http_request_seconds', 'API request latency', ['method', 'route', 'status'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+
+def observe_result(result):
+    """Record one ScrapeResult's fetch and parse timings."""
+    if result.source != 'fetch':  # another product's fetch, already recorded
+        COALESCED_RESULTS.labels(result.source).inc()
+        return
+    if result.outcome != 'cooldown':  # cooled-down hosts were never contacted
+        FETCH_SECONDS.labels(result.outcome).observe(result.elapsed)
+    if result.parse_seconds:
+        PARSE_SECONDS.observe(result.parse_seconds)
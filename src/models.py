@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, UniqueConstraint, inspect, text
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 
@@ -9,19 +9,160 @@ class Product(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
-    url = Column(String, unique=True)
+    url = Column(String, unique=True)  # canonical form, see canonical.py
+    asin = Column(String, default=None, index=True)
     target_price = Column(Float)
     last_check = Column(DateTime, default=None)
     last_price = Column(Float, default=None)
     
+    # Validators for conditional fetching
+    etag = Column(String, default=None)
+    last_modified = Column(String, default=None)
+    price_hash = Column(String, default=None)
+    price_strategy = Column(String, default=None)  # extraction strategy that last found the price
+    
+    # Scheduling (see planner.py)
+    next_check_at = Column(DateTime, default=None, index=True)
+    fail_count = Column(Integer, default=0)
+    
+    import_job_id = Column(Integer, ForeignKey("import_jobs.id"), default=None, index=True)  # bulk import, see bulk.py
+    
     history = relationship("PriceLog", back_populates="product", cascade="all, delete-orphan")
+    aggregates = relationship("PriceAggregate", cascade="all, delete-orphan")
+    stats = relationship("ProductStats", uselist=False, cascade="all, delete-orphan")
 
 class PriceLog(Base):
     __tablename__ = "price_history"
+    __table_args__ = (
+        Index("ix_price_history_product_timestamp", "product_id", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
     price = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow)
     
+    # Run-length encoding (HISTORY_MODE=changes): the price held until last_seen, over `checks` checks
+    last_seen = Column(DateTime, default=None)
+    checks = Column(Integer, default=1)
+    
     product = relationship("Product", back_populates="history")
+
+class PriceAggregate(Base):
+    """Hourly / daily rollup of price observations, maintained by the writer."""
+    __tablename__ = "price_aggregates"
+    __table_args__ = (
+        UniqueConstraint("product_id", "resolution", "bucket_start", name="uq_price_aggregates_bucket"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"))
+    resolution = Column(String)  # 'hour' | 'day'
+    bucket_start = Column(DateTime)
+    min_price = Column(Float)
+    max_price = Column(Float)
+    sum_price = Column(Float)
+    checks = Column(Integer)
+    last_price = Column(Float)
+
+class ProductStats(Base):
+    """Materialized per-product analytics, kept current by the writer (see analytics.py)."""
+    __tablename__ = "product_stats"
+    
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    last_price = Column(Float)
+    all_time_low = Column(Float)
+    low_at = Column(DateTime)
+    all_time_high = Column(Float)
+    avg_7d = Column(Float)
+    avg_30d = Column(Float)
+    pct_from_low = Column(Float)   # (last - low) / low
+    checks = Column(Integer)
+    drops = Column(Integer)        # checks at which the price fell
+    drop_frequency = Column(Float)  # drops / (checks - 1)
+    deal_score = Column(Float, index=True)  # 0-100, see analytics.deal_score
+    updated_at = Column(DateTime)
+
+
+class CheckTask(Base):
+    """A pending price check for one product, claimed by queue workers (see taskqueue.py)."""
+    __tablename__ = "check_tasks"
+    __table_args__ = (
+        Index("ix_check_tasks_claim", "lease_expires_at", "enqueued_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), unique=True)
+    enqueued_at = Column(DateTime, default=datetime.utcnow)
+    lease_owner = Column(String, default=None)
+    lease_expires_at = Column(DateTime, default=None)  # claimable once this has passed
+    attempts = Column(Integer, default=0)
+
+class ExtractionStat(Base):
+    """Learned hit/attempt counts per (page layout, extraction strategy), see strategies.py."""
+    __tablename__ = "extraction_stats"
+    __table_args__ = (
+        UniqueConstraint("layout", "strategy", name="uq_extraction_stats_layout_strategy"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    layout = Column(String, nullable=False)
+    strategy = Column(String, nullable=False)
+    hits = Column(Float, default=0)
+    attempts = Column(Float, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class LiveEvent(Base):
+    """A live event published by a queue worker, relayed to each API's /events (see events.py)."""
+    __tablename__ = "live_events"
+
+    id = Column(Integer, primary_key=True)
+    type = Column(String)
+    data = Column(String)  # JSON
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class AlertSent(Base):
+    """Last alert per product link, shared by queue workers for dedupe (see alerts.py)."""
+    __tablename__ = "alerts_sent"
+
+    link = Column(String, primary_key=True)
+    price = Column(Float)
+    alerted_at = Column(DateTime)
+
+class ImportJob(Base):
+    """One POST /products/bulk upload. Check progress is counted from its products (see bulk.py)."""
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True)
+    format = Column(String)       # 'csv' | 'ndjson'
+    rows = Column(Integer)        # data rows in the upload
+    created = Column(Integer)     # products inserted
+    duplicates = Column(Integer)  # already tracked, or repeated within the upload
+    invalid = Column(Integer)
+    errors = Column(String)       # JSON list of the first BULK_ERRORS_KEPT row errors
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+def init_db(engine):
+    """Create missing tables and add columns/indexes introduced since the database was created."""
+    Base.metadata.create_all(bind=engine)
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    col_type = column.type.compile(engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+if __name__ == '__main__':
+    # Explicit migration step, e.g. before starting API containers with DB_MIGRATE_ON_STARTUP=0
+    from dotenv import load_dotenv
+    load_dotenv()
+    from .database import engine
+
+    init_db(engine)
+    print(f"[v] Schema up to date ({engine.url.render_as_string(hide_password=True)})")
@@ -0,0 +1,99 @@
+"""Per-product check scheduling.
+
+Each product's next check time is derived from its recent history:
+
+* **volatility** - how often the price changed across recent checks
+* **proximity** - how close the last price is to ``target_price``
+* **failures**  - consecutive checks that returned no price back off exponentially
+
+The more urgent of volatility and proximity picks an interval between
+CHECK_INTERVAL_MIN and CHECK_INTERVAL_MAX (geometric interpolation). Failures
+then multiply it. The result is stored in the indexed ``products.next_check_at``
+column, and each scheduler tick only loads products that are due.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .models import PriceLog, Product
+from .scraper import ScrapeResult
+
+HISTORY_WINDOW = 20  # recent history rows considered per product
+
+Run = Tuple[float, int]  # (price, number of checks it was seen for)
+
+
+def _minutes(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def recent_prices(db: Session, product_ids: Iterable[int], window: int = HISTORY_WINDOW) -> Dict[int, List[Run]]:
+    """{product_id: [(price, checks), ...]} for the latest ``window`` rows, oldest first."""
+    ranked = (
+        select(
+            PriceLog.product_id,
+            PriceLog.price,
+            func.coalesce(PriceLog.checks, 1).label('checks'),
+            func.row_number().over(partition_by=PriceLog.product_id, order_by=PriceLog.timestamp.desc()).label('rn'),
+        )
+        .where(PriceLog.product_id.in_(list(product_ids)))
+        .subquery()
+    )
+    history: Dict[int, List[Run]] = {}
+    rows = db.execute(select(ranked.c.product_id, ranked.c.price, ranked.c.checks)
+                      .where(ranked.c.rn <= window).order_by(ranked.c.product_id, ranked.c.rn.desc()))
+    for product_id, price, checks in rows:
+        history.setdefault(product_id, []).append((price, checks))
+    return history
+
+
+def volatility(runs: List[Run]) -> float:
+    """Share of recent checks at which the price moved, scaled so ~1 change in 3 checks is 'maximally volatile'."""
+    observations = sum(checks for _, checks in runs)
+    if observations < 2:
+        return 0.5  # unknown: treat as moderately volatile
+    changes = sum(1 for (a, _), (b, _) in zip(runs, runs[1:]) if a != b)
+    return min(1.0, 3 * changes / (observations - 1))
+
+
+def proximity(last_price: Optional[float], target_price: Optional[float]) -> float:
+    """1.0 at or within 5% of target, falling linearly to 0 at 50% above it."""
+    if not last_price or not target_price:
+        return 0.5
+    gap = (last_price - target_price) / target_price
+    if gap <= 0.05:
+        return 1.0
+    return max(0.0, 1 - (gap - 0.05) / 0.45)
+
+
+def check_interval(runs: List[Run], last_price: Optional[float], target_price: Optional[float],
+                   fail_count: int = 0) -> timedelta:
+    low = _minutes('CHECK_INTERVAL_MIN', 15)
+    high = _minutes('CHECK_INTERVAL_MAX', 24 * 60)
+    urgency = max(volatility(runs), proximity(last_price, target_price))
+    minutes = high ** (1 - urgency) * low ** urgency
+    minutes *= 2 ** min(fail_count, 10)
+    return timedelta(minutes=min(high, minutes))
+
+
+def plan_next_check(product: Product, runs: List[Run], result: ScrapeResult,
+                    now: Optional[datetime] = None) -> dict:
+    """Product column updates (next_check_at, fail_count) after a check."""
+    now = now or datetime.utcnow()
+    if result.outcome == 'cooldown':
+        # Host is paused, not the product's fault: retry on the first tick after the cooldown
+        return {'next_check_at': now + timedelta(minutes=_minutes('CHECK_INTERVAL_MIN', 15))}
+
+    if result.price or result.outcome == 'unchanged':
+        fail_count = 0
+        price = result.price or product.last_price
+        runs = runs + [(price, 1)]
+    else:
+        fail_count = (product.fail_count or 0) + 1
+        price = product.last_price
+
+    interval = check_interval(runs[-HISTORY_WINDOW:], price, product.target_price, fail_count)
+    return {'next_check_at': now + interval, 'fail_count': fail_count}
@@ -0,0 +1,108 @@
+"""Profile one price check run on demand.
+
+The run scrapes in the calling process, also in SCHEDULER_MODE=queue.
+
+A sweep runs on two threads. The calling thread loads products and writes
+results. The scrape engine's event loop thread fetches the pages. Both are
+profiled, and pages parsed in the PARSE_WORKERS processes show up only as
+waits. Set PARSE_WORKERS=0 to profile extraction inline.
+
+* ``cprofile`` (default): one merged ``.prof`` file, for snakeviz or pstats
+* ``pyinstrument`` (if installed): one HTML report per thread
+
+Reports go to PROFILE_DIR (default data/profiles). Trigger with
+``POST /admin/profile-sweep`` or:
+
+    python -m src.profiling [--engine pyinstrument] [--due-only]
+"""
+import argparse
+import cProfile
+import importlib.util
+import logging
+import os
+import pstats
+from datetime import datetime
+from typing import List
+
+from .checker import check_prices_job
+from .scraper import get_client
+
+# Checked without importing it: pyinstrument loads only when a profile is requested
+PYINSTRUMENT_AVAILABLE = importlib.util.find_spec('pyinstrument') is not None
+
+ENGINES = ('cprofile', 'pyinstrument')
+
+log = logging.getLogger(__name__)
+
+
+def profile_dir() -> str:
+    return os.getenv('PROFILE_DIR', os.path.join('data', 'profiles'))
+
+
+def _on_engine_loop(fn):
+    """Run ``fn`` on the scrape engine's loop thread (profilers attach per thread)."""
+    async def call():
+        return fn()
+    return get_client().submit(call()).result()
+
+
+def profile_sweep(engine: str = 'cprofile', force: bool = True) -> List[str]:
+    """Run one check (all products if ``force``) under a profiler. Returns the report paths."""
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}")
+    if engine == 'pyinstrument' and not PYINSTRUMENT_AVAILABLE:
+        raise RuntimeError("pyinstrument is not installed")
+    os.makedirs(profile_dir(), exist_ok=True)
+    base = os.path.join(profile_dir(), f"sweep-{datetime.utcnow():%Y%m%dT%H%M%S}")
+
+    if engine == 'cprofile':
+        sweep, loop = cProfile.Profile(), cProfile.Profile()
+    else:
+        from pyinstrument import Profiler
+        sweep, loop = Profiler(async_mode='disabled'), Profiler(async_mode='disabled')
+    start = 'enable' if engine == 'cprofile' else 'start'
+    stop = 'disable' if engine == 'cprofile' else 'stop'
+
+    _on_engine_loop(getattr(loop, start))
+    getattr(sweep, start)()
+    try:
+        check_prices_job(force=force)
+    finally:
+        getattr(sweep, stop)()
+        _on_engine_loop(getattr(loop, stop))
+
+    if engine == 'cprofile':
+        stats = pstats.Stats(sweep)
+        stats.add(loop)
+        paths = [f"{base}.prof"]
+        stats.dump_stats(paths[0])
+    else:
+        paths = [f"{base}.html", f"{base}-engine.html"]
+        for profiler, path in zip((sweep, loop), paths):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+    log.info(f"Sweep profile written to {', '.join(paths)}")
+    return paths
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+
+    from .database import engine
+    from .logs import setup_logging
+    from .models import init_db
+    from .scraper import close_client, shutdown_parse_pool
+
+    parser = argparse.ArgumentParser(description="Profile one price check run.")
+    parser.add_argument('--engine', choices=ENGINES, default='cprofile')
+    parser.add_argument('--due-only', action='store_true', help="check only due products instead of all")
+    args = parser.parse_args()
+
+    load_dotenv()
+    setup_logging()
+    init_db(engine)
+    try:
+        profile_sweep(args.engine, force=not args.due_only)
+    finally:
+        close_client()
+        shutdown_parse_pool()
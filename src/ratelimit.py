@@ -0,0 +1,132 @@
+"""Per-host token-bucket rate limiting with adaptive (AIMD) backoff.
+
+Every scrape path shares one ``limiter``. Each host gets a token bucket
+whose refill rate adapts to how the host responds:
+
+* a fetch that returns a price (or an unchanged page) raises the rate
+  additively, up to SCRAPE_RATE_MAX
+* a 429, any 5xx or a block page halves it, down to SCRAPE_RATE_MIN
+* a CAPTCHA also halves it and puts the host in a cooldown. The cooldown
+  doubles with each consecutive CAPTCHA and resets on the next success.
+* anything else (other 4xx, unparseable pages, network errors) says
+  nothing about the host's load and leaves the rate alone
+
+All state lives in memory; nothing is polled from disk.
+"""
+import os
+import time
+import logging
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+log = logging.getLogger(__name__)
+
+SUCCESS_OUTCOMES = ('ok', 'unchanged')
+
+
+def is_congestion(outcome: str, status: Optional[int]) -> bool:
+    """Block page, 429 or 5xx: the host wants us to slow down."""
+    return outcome == 'blocked' or status == 429 or (status is not None and status >= 500)
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+class HostThrottle:
+    """Token bucket for one host."""
+
+    def __init__(self, rate: float, burst: float, min_rate: float, max_rate: float,
+                 cooldown: float, max_cooldown: float):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.cooldown_until = 0.0
+        self.strikes = 0
+        self.successes = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def cooldown_remaining(self) -> float:
+        return max(0.0, self.cooldown_until - time.monotonic())
+
+    def reserve(self) -> float:
+        """Take a token and return how long the caller must wait before sending."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.cooldown_until - now)
+
+    def record(self, outcome: str, status: Optional[int] = None):
+        """Adapt the rate to a fetch outcome."""
+        with self._lock:
+            if outcome == 'captcha':
+                self.throttled += 1
+                if time.monotonic() < self.cooldown_until:
+                    return  # request was already in flight when the cooldown started
+                self.strikes += 1
+                self.rate = max(self.min_rate, self.rate / 2)
+                cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (self.strikes - 1))
+                self.cooldown_until = time.monotonic() + cooldown
+                log.warning(f"CAPTCHA strike {self.strikes}: cooling down for {cooldown / 60:.0f} min")
+            elif is_congestion(outcome, status):
+                self.throttled += 1
+                self.rate = max(self.min_rate, self.rate / 2)
+            elif outcome in SUCCESS_OUTCOMES:
+                self.strikes = 0
+                self.successes += 1
+                self.rate = min(self.max_rate, self.rate + self.min_rate)
+
+    def stats(self) -> dict:
+        return {
+            'rate_per_sec': round(self.rate, 3),
+            'cooldown_seconds': round(self.cooldown_remaining()),
+            'captcha_strikes': self.strikes,
+            'successes': self.successes,
+            'throttled': self.throttled,
+        }
+
+
+class RateLimiter:
+    """Registry of HostThrottles, created on first use with settings from the environment."""
+
+    def __init__(self):
+        self._hosts: Dict[str, HostThrottle] = {}
+        self._lock = threading.Lock()
+
+    def for_host(self, host: str) -> HostThrottle:
+        with self._lock:
+            throttle = self._hosts.get(host)
+            if throttle is None:
+                throttle = self._hosts[host] = HostThrottle(
+                    rate=_env_float('SCRAPE_RATE', 1.0),
+                    burst=_env_float('SCRAPE_BURST', 5),
+                    min_rate=_env_float('SCRAPE_RATE_MIN', 0.05),
+                    max_rate=_env_float('SCRAPE_RATE_MAX', 5.0),
+                    cooldown=_env_float('CAPTCHA_COOLDOWN', 900),
+                    max_cooldown=_env_float('CAPTCHA_COOLDOWN_MAX', 7200),
+                )
+            return throttle
+
+    def for_url(self, url: str) -> HostThrottle:
+        return self.for_host(urlsplit(url).hostname or '')
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {host: throttle.stats() for host, throttle in self._hosts.items()}
+
+
+limiter = RateLimiter()
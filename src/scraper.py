@@ -1,77 +1,563 @@
-import re
-import requests
-from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
-
-ua = UserAgent()
-
-def fetch_amazon_price(url: str):
-    """Fetch Amazon product price with anti-bot headers and multiple fallback selectors."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Referer': 'https://www.google.com/',
-        'Upgrade-Insecure-Requests': '1',
-        'Connection': 'keep-alive',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'none',
-        'Cache-Control': 'max-age=0',
-    }
+import os
+import time
+import queue
+import logging
+import asyncio
+import threading
+import multiprocessing
+import concurrent.futures
+import concurrent.futures.process
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
 
-    try:
-        session = requests.Session()
-        response = session.get(url, headers=headers, timeout=15)
-
-        if response.status_code != 200:
-            print(f"[!] Error {response.status_code} for {url}")
-            return None
-
-        # Check if response is suspiciously small (likely blocked)
-        if len(response.content) < 10000:
-            if '₹' not in response.text:
-                print(f"[!] WARNING: Amazon may have blocked this request")
-                return None
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Check for block messages
-        if any(msg in soup.get_text() for msg in ["Enter the characters", "Please try again", "robot"]):
-            print("[!] CAPTCHA or block detected")
-            return None
-
-        # Strategies for price extraction (in priority order)
-        selectors = [
-            ('span', 'a-price-whole'),
-            ('span', 'a-offscreen'),
-            ('span', 'priceToPay'),
-            ('span', 'apexPriceToPay'),
-        ]
-
-        for tag, cls in selectors:
-            elem = soup.find(tag, class_=cls)
-            if elem:
-                txt = elem.get_text(strip=True)
-                txt = txt.replace('₹', '').replace('$', '').replace(',', '').replace('.', '').strip()
-                numbers = re.findall(r'\d+', txt)
-
-                if numbers:
-                    try:
-                        price_str = numbers[0]
-                        price = float(price_str)
-                        if price > 100:
-                            return price
-                    except (ValueError, IndexError):
-                        continue
-
-        print(f"[!] Could not extract price from {url}")
-        return None
+import httpx
+
+from .canonical import canonical_url
+from .captures import captures
+from .extract import Extraction, extract_with, fingerprint_price_region, is_captcha
+from .logs import setup_logging
+from .metrics import PARSE_QUEUE_DEPTH, observe_result
+from .ratelimit import limiter
+from .strategies import strategies
+from .useragents import random_user_agent
+
+log = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Referer': 'https://www.google.com/',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Cache-Control': 'max-age=0',
+}
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting at call time so values from .env are honoured."""
+    return int(os.getenv(name, default))
+
+
+@dataclass
+class ScrapeTarget:
+    """A page to check, with the validators stored from its previous fetch."""
+    key: Hashable
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    price_hash: Optional[str] = None
+    strategy: Optional[str] = None  # extraction strategy that found its price last time
+
+
+@dataclass
+class ScrapeResult:
+    """Outcome of a single product fetch, streamed back to the caller."""
+    key: Hashable
+    url: str
+    price: Optional[float]
+    outcome: str  # ok | unchanged | cooldown | http_error | blocked | captcha | parse_fail | network | error
+    elapsed: float = 0.0
+    status: Optional[int] = None
+    parse_seconds: float = 0.0
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    price_hash: Optional[str] = None
+    source: str = 'fetch'  # fetch | coalesced (shared another product's fetch) | cache
+    extraction: Optional[Extraction] = None
+
+
+def parse_price(status_code: int, content: bytes, url: str, ranking: Optional[Dict[str, List[str]]] = None,
+                hint: Optional[str] = None) -> Tuple[Optional[float], str, Optional[Extraction]]:
+    """Extract the price from a fetched product page. Returns (price, outcome, extraction details).
+
+    ``ranking`` (learned strategy order per layout) and ``hint`` (the product's
+    last winning strategy) only change the order strategies are tried in.
+    """
+    if status_code != 200:
+        log.warning(f"Error {status_code} for {url}", extra={'url': url, 'status': status_code})
+        return None, 'http_error', None
+
+    # Check for block messages (byte scan, no parse)
+    if is_captcha(content):
+        log.warning("CAPTCHA or block detected", extra={'url': url})
+        return None, 'captcha', None
+
+    # Check if response is suspiciously small (likely blocked)
+    if len(content) < 10000:
+        if '₹'.encode() not in content:
+            log.warning("Amazon may have blocked this request", extra={'url': url})
+            return None, 'blocked', None
+
+    extraction = extract_with(content, ranking, hint)
+    if extraction.price:
+        return extraction.price, 'ok', extraction
+
+    # Per-layout hit rates on /metrics show layout changes; this is for digging into one URL
+    log.debug(f"Could not extract price from {url}", extra={'url': url, 'layout': extraction.layout})
+    return None, 'parse_fail', extraction
+
+
+# --- SHARED HTTP CLIENT ---
+
+class ScrapeClient:
+    """Long-lived, thread-safe HTTP client shared by every scrape path.
+
+    A single httpx.AsyncClient lives on a dedicated event loop thread, so its
+    keep-alive pools (one per host, HTTP/2 when ``h2`` is installed) survive
+    across products and sweeps. Sync callers block on ``get``; coroutines are
+    scheduled onto the client loop with ``submit``.
+    """
+
+    def __init__(self, pool_size: Optional[int] = None, timeout: Optional[float] = None):
+        self.pool_size = pool_size or _env_int('SCRAPE_POOL_SIZE', 32)
+        self.timeout = timeout or float(os.getenv('SCRAPE_TIMEOUT', 15))
+        self.requests = 0
+        self.new_connections = 0
+        self._lock = threading.Lock()
+
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size,
+                              keepalive_expiry=60)
+        self._client = httpx.AsyncClient(headers=HEADERS, timeout=self.timeout, limits=limits,
+                                         http2=HTTP2_AVAILABLE, follow_redirects=True)
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='scrape-client', daemon=True)
+        self._thread.start()
+
+    async def _trace(self, event: str, info: dict):
+        if event == 'connection.connect_tcp.complete':
+            with self._lock:
+                self.new_connections += 1
+
+    async def aget(self, url: str, headers: Optional[dict] = None, **kwargs) -> httpx.Response:
+        """GET on the shared pool. Must be awaited on the client loop (see ``submit``)."""
+        with self._lock:
+            self.requests += 1
+        return await self._client.get(url, headers=headers, extensions={'trace': self._trace}, **kwargs)
+
+    def get(self, url: str, headers: Optional[dict] = None, **kwargs) -> httpx.Response:
+        """Blocking GET for threaded callers. Never call from the client loop itself."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("ScrapeClient.get() called from its own event loop; await aget() instead")
+        return self.submit(self.aget(url, headers, **kwargs)).result()
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """Schedule a coroutine on the client loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
 
-    except requests.exceptions.RequestException as e:
-        print(f"[!] Network error: {e}")
+    def user_agent(self) -> str:
+        """Random User-Agent from the bundled pool (src/useragents.py)."""
+        return random_user_agent()
+
+    def stats(self) -> dict:
+        """Connection pool statistics."""
+        pool = getattr(self._client._transport, '_pool', None)
+        connections = list(getattr(pool, 'connections', []))
+        with self._lock:
+            requests, new_connections = self.requests, self.new_connections
+        return {
+            'requests': requests,
+            'new_connections': new_connections,
+            'reuse_ratio': round((requests - new_connections) / requests, 3) if requests else 0.0,
+            'open_sockets': sum(1 for c in connections if not c.is_closed()),
+            'idle_sockets': sum(1 for c in connections if c.is_idle()),
+            'pool_size': self.pool_size,
+            'http2': HTTP2_AVAILABLE,
+        }
+
+    def close(self):
+        """Close pooled connections and stop the loop thread."""
+        self.submit(self._client.aclose()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+_client: Optional[ScrapeClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> ScrapeClient:
+    """Return the process-wide ScrapeClient, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ScrapeClient()
+        return _client
+
+
+def pool_stats() -> dict:
+    """Pool statistics of the shared client, or {} if nothing has been fetched yet."""
+    return _client.stats() if _client else {}
+
+
+def close_client():
+    """Shut down the shared client (called on application shutdown)."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+# --- PARSE STAGE ---
+
+_parse_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def parse_workers() -> int:
+    """PARSE_WORKERS processes for the parse stage; 0 parses on the engine loop instead."""
+    default = min(4, max(1, (os.cpu_count() or 2) - 1))
+    return _env_int('PARSE_WORKERS', default)
+
+
+def get_parse_pool() -> Optional[concurrent.futures.ProcessPoolExecutor]:
+    """Shared process pool for HTML parsing, created on first use (None if disabled).
+
+    Workers are spawned rather than forked because the parent runs several
+    threads (event loop, scheduler). Each worker sets up logging like the
+    parent (LOG_FORMAT, LOG_LEVEL), so parse warnings keep their format and
+    ``extra`` fields. Extractors added with ``register_extractor`` at runtime
+    are not visible inside the workers.
+    """
+    global _parse_pool
+    workers = parse_workers()
+    if workers <= 0:
         return None
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=setup_logging)
+        return _parse_pool
+
+
+def shutdown_parse_pool():
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(cancel_futures=True)
+            _parse_pool = None
+
+
+def _parse_job(status_code: int, content: bytes, url: str, ranking: Optional[Dict[str, List[str]]] = None,
+               hint: Optional[str] = None) -> Tuple[Optional[float], str, Optional[Extraction], float]:
+    """parse_price plus its CPU time; module-level so it can run in a worker process."""
+    start = time.perf_counter()
+    price, outcome, extraction = parse_price(status_code, content, url, ranking, hint)
+    return price, outcome, extraction, time.perf_counter() - start
+
+
+# --- CONCURRENT ENGINE ---
+
+def _conditional_headers(target: ScrapeTarget) -> Optional[dict]:
+    headers = {}
+    if target.etag:
+        headers['If-None-Match'] = target.etag
+    if target.last_modified:
+        headers['If-Modified-Since'] = target.last_modified
+    return headers or None
+
+
+@dataclass
+class _Fetched:
+    """A downloaded page waiting for the parse stage."""
+    result: ScrapeResult
+    content: bytes
+    fingerprint: Optional[str]
+
+
+async def _fetch_one(client: ScrapeClient, target: ScrapeTarget, global_limit: asyncio.Semaphore,
+                     host_limit: asyncio.Semaphore) -> Union[ScrapeResult, _Fetched]:
+    """Fetch stage for one page, under the rate limiter and concurrency limits.
+
+    Sends the stored validators as a conditional request. Returns a finished
+    ScrapeResult when no parsing is needed: network errors, hosts in a
+    CAPTCHA cooldown (never contacted), a 304, or a price region that hashes
+    the same as last time. Otherwise returns the page for the parse stage.
+    """
+    result = ScrapeResult(target.key, target.url, None, 'error', etag=target.etag,
+                          last_modified=target.last_modified, price_hash=target.price_hash)
+    throttle = limiter.for_url(target.url)
+    start = time.perf_counter()
+    try:
+        async with host_limit:
+            if not throttle.cooldown_remaining():
+                await asyncio.sleep(throttle.reserve())
+            if throttle.cooldown_remaining():
+                result.outcome = 'cooldown'
+                return result
+            start = time.perf_counter()
+            async with global_limit:
+                response = await client.aget(target.url, headers=_conditional_headers(target))
+        result.elapsed = time.perf_counter() - start
+        result.status = response.status_code
+        result.etag = response.headers.get('ETag', target.etag)
+        result.last_modified = response.headers.get('Last-Modified', target.last_modified)
+
+        fingerprint = fingerprint_price_region(response.content) if response.status_code == 200 else None
+        if response.status_code == 304 or (fingerprint and fingerprint == target.price_hash):
+            result.outcome = 'unchanged'
+        else:
+            return _Fetched(result, response.content, fingerprint)
+    except httpx.HTTPError as e:
+        log.warning(f"Network error: {e}", extra={'url': target.url})
+        result.outcome = 'network'
     except Exception as e:
-        print(f"[!] Scrape failed: {e}")
+        log.exception(f"Scrape failed: {e}")
+    result.elapsed = time.perf_counter() - start
+    throttle.record(result.outcome, result.status)
+    return result
+
+
+# --- COALESCING ---
+# Products with the same canonical URL (marketplace + ASIN) share one fetch:
+# within a sweep, across concurrent sweeps (in flight), and for
+# RESULT_CACHE_SECONDS afterwards (recent). Only the client loop touches
+# these dicts, so they need no lock.
+
+_RECENT_MAX = 10000
+
+ValidatorKey = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def result_cache_seconds() -> float:
+    """How long a fetched price may be reused by later checks (0 disables)."""
+    return float(os.getenv('RESULT_CACHE_SECONDS', 120))
+
+
+@dataclass
+class _Shared:
+    """One fetch's result, as handed to every product with that canonical URL."""
+    result: ScrapeResult
+    validators: ValidatorKey  # conditional headers the request was sent with
+    at: float
+
+
+@dataclass
+class _Job:
+    """One fetch on behalf of every target in ``group``."""
+    request: ScrapeTarget
+    group: List[ScrapeTarget]
+    future: asyncio.Future
+
+
+_inflight: Dict[str, asyncio.Future] = {}
+_recent: Dict[str, _Shared] = {}
+
+
+def _validators(target: ScrapeTarget) -> ValidatorKey:
+    return target.etag, target.last_modified, target.price_hash
+
+
+def _request_for(url: str, group: List[ScrapeTarget]) -> ScrapeTarget:
+    """Conditional only if every target holds the same validators, else a 304 would be ambiguous."""
+    validators = {_validators(t) for t in group}
+    request = ScrapeTarget(url, url, *validators.pop()) if len(validators) == 1 else ScrapeTarget(url, url)
+    request.strategy = next((t.strategy for t in group if t.strategy), None)
+    return request
+
+
+def _reusable(shared: _Shared, request: ScrapeTarget) -> bool:
+    """'unchanged' carries no price, so it only answers requests with the same validators."""
+    return shared.result.outcome != 'unchanged' or shared.validators == _validators(request)
+
+
+def _cached(request: ScrapeTarget) -> Optional[_Shared]:
+    shared = _recent.get(request.url)
+    if shared is None:
+        return None
+    if time.monotonic() - shared.at > result_cache_seconds():
+        del _recent[request.url]
         return None
+    return shared if _reusable(shared, request) else None
+
+
+def _remember(shared: _Shared):
+    url = shared.result.url
+    _recent.pop(url, None)
+    if shared.result.outcome in ('ok', 'unchanged') and result_cache_seconds() > 0:
+        _recent[url] = shared
+        while len(_recent) > _RECENT_MAX:
+            del _recent[next(iter(_recent))]
+
+
+def _fan_out(shared: _Shared, group: List[ScrapeTarget], source: str) -> List[ScrapeResult]:
+    """A copy of the result per target. Of a fresh fetch, only the first copy counts as the fetch."""
+    results = [replace(shared.result, key=t.key, url=t.url, source=source) for t in group]
+    if source == 'fetch':
+        for result in results[1:]:
+            result.source = 'coalesced'
+    return results
+
+
+async def _parse_one(item: _Fetched, pool: Optional[concurrent.futures.ProcessPoolExecutor],
+                     ranking: Optional[Dict[str, List[str]]] = None, hint: Optional[str] = None) -> ScrapeResult:
+    """Parse stage for one page: in the process pool if configured, else inline."""
+    result = item.result
+    try:
+        parsed = None
+        if pool is not None:
+            loop = asyncio.get_running_loop()
+            try:
+                parsed = await loop.run_in_executor(pool, _parse_job, result.status, item.content, result.url,
+                                                    ranking, hint)
+            except concurrent.futures.process.BrokenProcessPool:
+                # A worker died; drop the pool (recreated next sweep) and parse this page inline
+                log.error("Parse pool broken; falling back to inline parsing")
+                shutdown_parse_pool()
+        if parsed is None:
+            parsed = _parse_job(result.status, item.content, result.url, ranking, hint)
+        result.price, result.outcome, result.extraction, result.parse_seconds = parsed
+        if result.extraction:
+            strategies.record(result.extraction)
+        # Only trust the fingerprint when the price was read from inside the hashed region
+        tier = result.extraction.tier if result.extraction else None
+        result.price_hash = item.fingerprint if tier == 'regex' else None
+    except Exception as e:
+        log.warning(f"Parse failed for {result.url}: {e}", extra={'url': result.url})
+        result.outcome = 'error'
+    limiter.for_url(result.url).record(result.outcome, result.status)
+    return result
+
+
+TargetLike = Union[ScrapeTarget, Tuple[Hashable, str]]
+
+
+async def scrape_prices(targets: Iterable[TargetLike], concurrency: Optional[int] = None,
+                        per_host: Optional[int] = None) -> AsyncIterator[ScrapeResult]:
+    """Fetch and parse many targets concurrently, yielding results as they finish.
+
+    Targets are ScrapeTargets or plain (key, url) tuples.
+
+    Two stages connected by bounded queues (PARSE_QUEUE_SIZE):
+    fetch tasks (at most ``concurrency`` requests in flight overall and
+    ``per_host`` per host) -> parse workers (PARSE_WORKERS processes) -> caller.
+    A slow stage fills its input queue and stalls the one before it.
+    Targets with the same canonical URL are fetched once; a fresh cached or
+    in-flight result for that URL is reused instead of fetching at all.
+    Runs on the shared client's loop; use ``stream_prices`` from threaded code.
+    """
+    concurrency = concurrency or _env_int('SCRAPE_CONCURRENCY', 16)
+    per_host = per_host or _env_int('SCRAPE_PER_HOST', 4)
+    queue_size = _env_int('PARSE_QUEUE_SIZE', 64)
+
+    loop = asyncio.get_running_loop()
+    client = get_client()
+    pool = get_parse_pool()
+    ranking = strategies.ranking()  # learned per-layout order, fixed for this run
+    global_limit = asyncio.Semaphore(concurrency)
+    host_limits = defaultdict(lambda: asyncio.Semaphore(per_host))
+    to_parse: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    finished: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    owned: List[_Job] = []
+
+    async def deliver(results: List[ScrapeResult]):
+        for result in results:
+            await finished.put(result)
+
+    async def settle(job: _Job, result: ScrapeResult):
+        shared = _Shared(result, _validators(job.request), time.monotonic())
+        if _inflight.get(job.request.url) is job.future:
+            del _inflight[job.request.url]
+        _remember(shared)
+        job.future.set_result(shared)
+        await deliver(_fan_out(shared, job.group, 'fetch'))
+
+    async def fetch_stage(url: str, group: List[ScrapeTarget]):
+        request = _request_for(url, group)
+        shared = _cached(request)
+        if shared is not None:
+            return await deliver(_fan_out(shared, group, 'cache'))
+        pending = _inflight.get(url)
+        if pending is not None:
+            # Another sweep is fetching this page right now; shield it from our own cancellation
+            shared = await asyncio.shield(pending)
+            if _reusable(shared, request):
+                return await deliver(_fan_out(shared, group, 'coalesced'))
+        job = _Job(request, group, loop.create_future())
+        _inflight[url] = job.future
+        owned.append(job)
+        try:
+            item = await _fetch_one(client, request, global_limit, host_limits[urlsplit(url).hostname])
+        except Exception as e:  # never leave the caller waiting on a lost result
+            item = ScrapeResult(url, url, None, 'error')
+            log.exception(f"Scrape failed: {e}")
+        if isinstance(item, _Fetched):
+            await to_parse.put((job, item))
+            PARSE_QUEUE_DEPTH.set(to_parse.qsize())
+        else:
+            await settle(job, item)
+
+    async def parse_stage():
+        while True:
+            job, item = await to_parse.get()
+            PARSE_QUEUE_DEPTH.set(to_parse.qsize())
+            result = await _parse_one(item, pool, ranking, job.request.strategy)
+            # Failed pages are kept for debugging; compressed and written off this loop
+            captures.submit(result.outcome, item.content, result.url, [t.key for t in job.group],
+                            result.status, result.extraction.layout if result.extraction else None)
+            await settle(job, result)
+
+    targets = [t if isinstance(t, ScrapeTarget) else ScrapeTarget(*t) for t in targets]
+    groups: Dict[str, List[ScrapeTarget]] = defaultdict(list)
+    for target in targets:
+        groups[canonical_url(target.url)].append(target)
+    tasks = [asyncio.create_task(fetch_stage(url, group)) for url, group in groups.items()]
+    tasks += [asyncio.create_task(parse_stage()) for _ in range(max(1, parse_workers()))]
+    try:
+        for _ in range(len(targets)):
+            result = await finished.get()
+            observe_result(result)
+            yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Release other sweeps waiting on fetches this one abandoned
+        for job in owned:
+            if not job.future.done():
+                if _inflight.get(job.request.url) is job.future:
+                    del _inflight[job.request.url]
+                abandoned = ScrapeResult(job.request.key, job.request.url, None, 'error')
+                job.future.set_result(_Shared(abandoned, _validators(job.request), time.monotonic()))
+
+
+def stream_prices(targets: Iterable[TargetLike], **limits) -> Iterator[ScrapeResult]:
+    """Synchronous view of scrape_prices for threaded callers (e.g. the scheduler).
+
+    The sweep runs on the shared client loop; results are handed over
+    through a queue as soon as each page is parsed.
+    """
+    targets = list(targets)
+    results: queue.Queue = queue.Queue()
+    done = object()
+
+    async def produce():
+        async for result in scrape_prices(targets, **limits):
+            results.put(result)
+
+    def finished(future: concurrent.futures.Future):
+        if not future.cancelled() and future.exception():
+            log.error(f"Scrape engine error: {future.exception()}")
+        results.put(done)
+
+    sweep = get_client().submit(produce())
+    sweep.add_done_callback(finished)
+    try:
+        while True:
+            item = results.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        sweep.cancel()
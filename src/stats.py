@@ -0,0 +1,47 @@
+"""In-process counters behind GET /stats.
+
+The totals are counted once, then kept current by the code paths that
+change them (the writer, product add/delete), so dashboard polling does not
+scan price_history. A full recount still happens every STATS_REFRESH_SECONDS
+to pick up writes made by other processes.
+"""
+import os
+import time
+import threading
+from typing import Dict, Optional
+
+
+class StatsCounters:
+    def __init__(self):
+        self._values: Optional[Dict[str, int]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self) -> float:
+        return float(os.getenv('STATS_REFRESH_SECONDS', 300))
+
+    def snapshot(self) -> Optional[Dict[str, int]]:
+        """Current totals, or None if they need a recount."""
+        with self._lock:
+            if self._values is None or time.monotonic() - self._loaded_at > self.ttl:
+                return None
+            return dict(self._values)
+
+    def load(self, values: Dict[str, int]):
+        with self._lock:
+            self._values = dict(values)
+            self._loaded_at = time.monotonic()
+
+    def add(self, name: str, delta: int):
+        """Apply a write to a loaded total (no-op until the first recount)."""
+        with self._lock:
+            if self._values is not None:
+                self._values[name] = self._values.get(name, 0) + delta
+
+    def invalidate(self):
+        with self._lock:
+            self._values = None
+
+
+counters = StatsCounters()
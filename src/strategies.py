@@ -0,0 +1,149 @@
+"""Learned extraction order, per page layout, shared through the database.
+
+Every parsed page reports which strategy found the price and which ones
+were tried before it and missed. ``StrategyCache`` keeps hit/attempt counts
+per (layout, strategy) and ranks each layout's strategies by smoothed hit
+rate, (hits + 1) / (attempts + 2). Strategies that keep winning are tried
+first. A strategy that starts missing drops below untried ones within a few
+pages, because counts are halved once they pass STRATEGY_WINDOW attempts.
+
+Counts are folded into ``extraction_stats`` by the writer and reloaded
+every STRATEGY_REFRESH_SECONDS, so all API processes and queue workers
+learn from each other. ``extract_layout_hit_rate`` on /metrics is the share
+of a layout's recent pages whose first strategy hit. A drop there means
+Amazon changed that layout.
+"""
+import os
+import time
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .extract import Extraction, default_strategies
+from .metrics import EXTRACT_HIT_RATE, EXTRACT_PAGES, EXTRACT_STRATEGY_RESULTS
+
+Key = Tuple[str, str]  # (layout, strategy)
+
+
+def strategy_window() -> float:
+    return float(os.getenv('STRATEGY_WINDOW', 200))
+
+
+def _decayed(hits: float, attempts: float) -> Tuple[float, float]:
+    return (hits / 2, attempts / 2) if attempts > strategy_window() else (hits, attempts)
+
+
+class StrategyCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[Key, List[float]] = defaultdict(lambda: [0.0, 0.0])  # hits, attempts
+        self._pending: Dict[Key, List[int]] = defaultdict(lambda: [0, 0])      # not yet in the DB
+        self._first_try: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0.0])
+        self._loaded_at: Optional[float] = None
+
+    @property
+    def refresh_seconds(self) -> float:
+        return float(os.getenv('STRATEGY_REFRESH_SECONDS', 60))
+
+    def ranking(self) -> Dict[str, List[str]]:
+        """Per known layout, every strategy best first. Untried ones score 0.5; ties keep the static order."""
+        static = default_strategies()
+        with self._lock:
+            scores: Dict[str, Dict[str, float]] = defaultdict(dict)
+            for (layout, strategy), (hits, attempts) in self._counts.items():
+                scores[layout][strategy] = (hits + 1) / (attempts + 2)
+        return {layout: sorted(static, key=lambda name: -scored.get(name, 0.5))
+                for layout, scored in scores.items()}
+
+    def record(self, extraction: Extraction):
+        """Count one parsed page: a miss for each strategy tried before the winner, a hit for the winner."""
+        layout = extraction.layout
+        outcomes = [(name, False) for name in extraction.misses]
+        if extraction.strategy:
+            outcomes.append((extraction.strategy, True))
+        with self._lock:
+            for name, hit in outcomes:
+                counts, pending = self._counts[(layout, name)], self._pending[(layout, name)]
+                counts[0], counts[1] = _decayed(counts[0] + hit, counts[1] + 1)
+                pending[0] += hit
+                pending[1] += 1
+                EXTRACT_STRATEGY_RESULTS.labels(layout, name, 'hit' if hit else 'miss').inc()
+            first_try = self._first_try[layout]
+            first_try[0], first_try[1] = _decayed(first_try[0] + (not extraction.misses), first_try[1] + 1)
+            rate = first_try[0] / first_try[1]
+        EXTRACT_PAGES.labels(layout, 'ok' if extraction.strategy else 'fail').inc()
+        EXTRACT_HIT_RATE.labels(layout).set(rate)
+
+    def due(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_seconds
+
+    def load(self, rows):
+        """Replace the counts with the DB's (plus what this process has not written yet)."""
+        with self._lock:
+            self._counts.clear()
+            for layout, strategy, hits, attempts in rows:
+                self._counts[(layout, strategy)] = [hits, attempts]
+            for key, (hits, attempts) in self._pending.items():
+                counts = self._counts[key]
+                counts[0], counts[1] = _decayed(counts[0] + hits, counts[1] + attempts)
+            self._loaded_at = time.monotonic()
+
+    def drain(self) -> Dict[Key, List[int]]:
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(lambda: [0, 0])
+        return pending
+
+    def restore(self, pending: Dict[Key, List[int]]):
+        """Put drained counts back after the transaction writing them rolled back."""
+        with self._lock:
+            for key, (hits, attempts) in pending.items():
+                counts = self._pending[key]
+                counts[0] += hits
+                counts[1] += attempts
+
+
+strategies = StrategyCache()
+
+
+def refresh_strategies(db, force: bool = False):
+    """Reload the shared counts if STRATEGY_REFRESH_SECONDS have passed."""
+    from sqlalchemy import select
+
+    from .models import ExtractionStat
+
+    if force or strategies.due():
+        strategies.load(db.execute(select(ExtractionStat.layout, ExtractionStat.strategy,
+                                          ExtractionStat.hits, ExtractionStat.attempts)).all())
+
+
+def write_strategy_stats(db, now: Optional[datetime] = None) -> Dict[Key, List[int]]:
+    """Add this process's new counts to ``extraction_stats``. Caller commits.
+
+    Returns the drained counts; hand them to ``strategies.restore`` if the
+    transaction rolls back, or they are lost.
+    """
+    from sqlalchemy import case
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+    from .models import ExtractionStat
+
+    pending = strategies.drain()
+    if not pending:
+        return pending
+    now = now or datetime.utcnow()
+    insert = pg_insert if db.bind.dialect.name == 'postgresql' else sqlite_insert
+    stmt = insert(ExtractionStat)
+    hits = ExtractionStat.hits + stmt.excluded.hits
+    attempts = ExtractionStat.attempts + stmt.excluded.attempts
+    over = attempts > strategy_window()
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['layout', 'strategy'],
+        set_={'hits': case((over, hits / 2), else_=hits),
+              'attempts': case((over, attempts / 2), else_=attempts),
+              'updated_at': stmt.excluded.updated_at},
+    )
+    db.execute(stmt, [{'layout': layout, 'strategy': strategy, 'hits': h, 'attempts': a, 'updated_at': now}
+                      for (layout, strategy), (h, a) in pending.items()])
+    return pending
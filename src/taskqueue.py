@@ -0,0 +1,125 @@
+"""DB-backed queue of product checks, for scraping in separate worker processes.
+
+With ``SCHEDULER_MODE=queue`` the API's scheduler only *coordinates*: each
+tick it enqueues one ``check_tasks`` row per due product. The unique
+product_id makes that idempotent, so every uvicorn worker may run it safely.
+``python -m src.worker`` processes, on any number of nodes, do the scraping.
+
+Workers claim tasks with a lease. One ``UPDATE ... RETURNING`` sets
+lease_owner and pushes lease_expires_at into the future. On Postgres the
+candidate rows are picked ``FOR UPDATE SKIP LOCKED``, so concurrent workers
+never block on or double-claim a row. SQLite serializes writers, so the
+single statement is already atomic there.
+
+A worker heartbeats its leases while checking and deletes the tasks once the
+results are written. If it dies, the lease lapses and another worker picks
+the task up. A task whose last of TASK_MAX_ATTEMPTS leases lapsed is dropped.
+Its product stays due, so the next tick enqueues it fresh.
+"""
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import DateTime, Integer, delete, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .metrics import CHECK_QUEUE_DEPTH
+from .models import CheckTask, Product
+
+log = logging.getLogger(__name__)
+
+
+def scheduler_mode() -> str:
+    """'local' (default): the API process scrapes. 'queue': workers scrape, the API only enqueues."""
+    return os.getenv('SCHEDULER_MODE', 'local')
+
+
+def lease_seconds() -> float:
+    return float(os.getenv('TASK_LEASE_SECONDS', 300))
+
+
+def max_attempts() -> int:
+    return int(os.getenv('TASK_MAX_ATTEMPTS', 3))
+
+
+def enqueue(db: Session, force: bool = False, product_ids: Optional[List[int]] = None,
+            now: Optional[datetime] = None) -> int:
+    """Queue a task for every due product (all if forced, or just ``product_ids``). Caller commits."""
+    now = now or datetime.utcnow()
+    source = select(Product.id, literal(now, DateTime), literal(now, DateTime), literal(0, Integer))
+    if product_ids is not None:
+        source = source.where(Product.id.in_(product_ids))
+    elif not force:
+        source = source.where(or_(Product.next_check_at.is_(None), Product.next_check_at <= now))
+
+    insert = pg_insert if db.bind.dialect.name == 'postgresql' else sqlite_insert
+    stmt = insert(CheckTask).from_select(['product_id', 'enqueued_at', 'lease_expires_at', 'attempts'], source)
+    return db.execute(stmt.on_conflict_do_nothing(index_elements=['product_id'])).rowcount
+
+
+def lease(db: Session, owner: str, limit: int, now: Optional[datetime] = None) -> List[int]:
+    """Claim up to ``limit`` tasks for ``owner``. Returns their product ids."""
+    now = now or datetime.utcnow()
+    candidates = (
+        select(CheckTask.id)
+        .where(CheckTask.lease_expires_at <= now, CheckTask.attempts < max_attempts())
+        .order_by(CheckTask.enqueued_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)  # no-op on SQLite, where the UPDATE holds the write lock
+    )
+    claimed = db.scalars(
+        update(CheckTask)
+        .where(CheckTask.id.in_(candidates))
+        .values(lease_owner=owner, lease_expires_at=now + timedelta(seconds=lease_seconds()),
+                attempts=CheckTask.attempts + 1)
+        .returning(CheckTask.product_id)
+    ).all()
+    db.commit()
+    return list(claimed)
+
+
+def heartbeat(db: Session, owner: str, product_ids: List[int]) -> int:
+    """Extend ``owner``'s leases on ``product_ids``. Returns how many are still held."""
+    held = db.execute(
+        update(CheckTask)
+        .where(CheckTask.lease_owner == owner, CheckTask.product_id.in_(product_ids))
+        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds()))
+    ).rowcount
+    db.commit()
+    return held
+
+
+def complete(db: Session, owner: str, product_ids: List[int]):
+    """Delete finished tasks (only those ``owner`` still holds)."""
+    db.execute(delete(CheckTask).where(CheckTask.lease_owner == owner, CheckTask.product_id.in_(product_ids)))
+    db.commit()
+
+
+def coordinate(session_factory=SessionLocal, force: bool = False) -> int:
+    """Scheduler tick in queue mode: drop dead tasks, enqueue due products."""
+    db = session_factory()
+    try:
+        dead = db.execute(delete(CheckTask).where(
+            CheckTask.attempts >= max_attempts(), CheckTask.lease_expires_at <= datetime.utcnow())).rowcount
+        if dead:
+            log.warning(f"Dropped {dead} check tasks after {max_attempts()} attempts")
+        queued = enqueue(db, force=force)
+        db.commit()
+        for state, depth in queue_stats(db).items():
+            CHECK_QUEUE_DEPTH.labels(state).set(depth)
+    finally:
+        db.close()
+    if queued:
+        log.info(f"Queued {queued} product checks")
+    return queued
+
+
+def queue_stats(db: Session) -> dict:
+    now = datetime.utcnow()
+    leased = func.count(CheckTask.id).filter(CheckTask.lease_expires_at > now)
+    total, in_progress = db.execute(select(func.count(CheckTask.id), leased)).one()
+    return {'queued': total - in_progress, 'leased': in_progress}
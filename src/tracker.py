@@ -1,42 +1,34 @@
 import os
 import csv
 import time
-import requests
+import logging
 import schedule
-import smtplib
-import ssl
-import random
 from datetime import datetime
-from bs4 import BeautifulSoup
-from email.message import EmailMessage
 from dotenv import load_dotenv
-from datetime import timedelta
+
+from .alerts import Deal, dispatcher
+from .captures import captures
+from .logs import setup_logging
+from .ratelimit import limiter
+from .scraper import get_client, parse_price
+from .strategies import strategies
 
 # Load environment variables
 load_dotenv()
+log = logging.getLogger(__name__)
 
 class AmazonPriceTracker:
     def __init__(self):
         self.url = os.getenv('TARGET_URL')
         self.target_price = float(os.getenv('TARGET_PRICE', 0))
         self.csv_file = 'data/price_history.csv'
-        self.session = requests.Session()
-        try:
-            from fake_useragent import UserAgent
-            self.ua = UserAgent()
-        except ImportError:
-            self.ua = None
+        self.strategy = None  # last winning extraction strategy, tried first next cycle
+        # Shared pooled client (keep-alive connections survive between cycles)
+        self.client = get_client()
         self.base_headers = {
-            'User-Agent': self.ua.random if self.ua else 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-            'Referer': 'https://www.google.com/',
+            'User-Agent': self.client.user_agent(),
             'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
         }
-        self.cooldown_file = 'data/captcha_cooldown.txt'
         # Ensure data directory exists
         os.makedirs('data', exist_ok=True)
         if not os.path.exists(self.csv_file):
@@ -46,158 +38,82 @@ class AmazonPriceTracker:
 
     def fetch_price(self):
         """Scrapes Amazon with multi-layer fallback strategies."""
-        print(f"[*] Checking price for product...")
-        # Check for cooldown after CAPTCHA
-        if os.path.exists(self.cooldown_file):
-            with open(self.cooldown_file, 'r') as f:
-                cooldown_until = f.read().strip()
-            if cooldown_until:
-                try:
-                    cooldown_dt = datetime.strptime(cooldown_until, "%Y-%m-%d %H:%M:%S")
-                    if datetime.now() < cooldown_dt:
-                        print(f"[!] CAPTCHA detected previously. Pausing scraping until {cooldown_until}.")
-                        return None
-                    else:
-                        os.remove(self.cooldown_file)
-                except Exception:
-                    os.remove(self.cooldown_file)
-        # Add longer random delay to seem human
-        time.sleep(random.uniform(5, 15))
+        log.info("Checking price for product...")
+        # Shared per-host rate limiter: skips while cooling down after a CAPTCHA,
+        # otherwise waits only as long as the host's current rate requires
+        throttle = limiter.for_url(self.url)
+        if throttle.cooldown_remaining():
+            log.warning(f"CAPTCHA detected previously. Pausing scraping for {throttle.cooldown_remaining() / 60:.0f} more minutes.")
+            return None
+        time.sleep(throttle.reserve())
         # Rotate User-Agent if possible
-        if self.ua:
-            self.base_headers['User-Agent'] = self.ua.random
-        # Optional: Use proxy if set in environment
-        proxies = {}
-        http_proxy = os.getenv('HTTP_PROXY')
-        https_proxy = os.getenv('HTTPS_PROXY')
-        if http_proxy:
-            proxies['http'] = http_proxy
-        if https_proxy:
-            proxies['https'] = https_proxy
+        self.base_headers['User-Agent'] = self.client.user_agent()
+        # HTTP_PROXY / HTTPS_PROXY from the environment are honoured by the shared client
         try:
-            response = self.session.get(self.url, headers=self.base_headers, proxies=proxies if proxies else None, timeout=20)
+            response = self.client.get(self.url, headers=self.base_headers, timeout=20)
             if response.status_code != 200:
-                print(f"[!] Blocked/Error: HTTP {response.status_code}")
+                log.warning(f"Blocked/Error: HTTP {response.status_code}")
+                throttle.record('http_error', response.status_code)
                 return None
-            soup = BeautifulSoup(response.content, 'html.parser')
-            # 1. Check for Bot Detection (CAPTCHA)
-            if "Enter the characters you see below" in soup.get_text():
-                print("[!] ALERT: Amazon presented a CAPTCHA. IP might be temporarily flagged.")
-                self.save_debug_html(soup)
-                # Set cooldown for 2 hours
-                cooldown_until = (datetime.now() + timedelta(hours=2)).strftime("%Y-%m-%d %H:%M:%S")
-                with open(self.cooldown_file, 'w') as f:
-                    f.write(cooldown_until)
-                print(f"[!] Pausing scraping until {cooldown_until} due to CAPTCHA.")
-                return None
-            # 2. Strategy: Try Multiple Selectors
-            price = self.extract_price_logic(soup)
+            # Same extraction pipeline as the API sweeps, in the order learned for this layout
+            price, outcome, extraction = parse_price(response.status_code, response.content, self.url,
+                                                     strategies.ranking(), self.strategy)
+            if extraction:
+                strategies.record(extraction)
             if price:
+                self.strategy = extraction.strategy
+                throttle.record('ok')
                 return price
+            if outcome == 'captcha':
+                log.warning("ALERT: Amazon presented a CAPTCHA. IP might be temporarily flagged.")
             else:
-                print("[!] Error: Could not extract price. Layout might have changed.")
-                self.save_debug_html(soup)
-                return None
+                log.error("Could not extract price. Layout might have changed.")
+            captures.submit(outcome, response.content, self.url, status=response.status_code,
+                            layout=extraction.layout if extraction else None)
+            throttle.record(outcome)
+            return None
         except Exception as e:
-            print(f"[!] Network Exception: {e}")
+            log.warning(f"Network Exception: {e}")
+            throttle.record('network')
             return None
 
-    def extract_price_logic(self, soup):
-        """Attempts to find price using different common Amazon patterns."""
-        
-        # List of potential price containers in order of likelihood
-        selectors = [
-            # Strategy A: Main price whole number class
-            ('span', 'a-price-whole'),
-            # Strategy B: Offscreen actual text (often safer)
-            ('span', 'a-offscreen'),
-            # Strategy C: Deal block price
-            ('span', 'apexPriceToPay'),
-            # Strategy D: Unified price block
-            ('span', 'priceToPay')
-        ]
-
-        for tag, class_name in selectors:
-            element = soup.find(tag, class_=class_name)
-            if element:
-                raw_text = element.get_text(strip=True)
-                print(f"[*] Found element ({class_name}): {raw_text}")
-                
-                # Cleanup currency symbols and commas (e.g., "₹70,000.00")
-                clean_text = raw_text.replace('₹', '').replace('$', '').replace(',', '')
-                
-                # Handle cases where offscreen text might be 'Page 1 of 2' or junk
-                try:
-                    # Extract just the number (float)
-                    price = float(clean_text)
-                    return price
-                except ValueError:
-                    continue # Try next selector if text isn't a number
-        
-        return None
-
-    def save_debug_html(self, soup):
-        """Saves HTML to inspect why it failed."""
-        with open('debug_fail.html', 'w', encoding='utf-8') as f:
-            f.write(str(soup))
-        print("[*] Debug: HTML saved to 'debug_fail.html'. Open this file in your browser to check.")
-
     def log_data(self, price):
         now = datetime.now()
         with open(self.csv_file, 'a', newline='') as f:
             writer = csv.writer(f)
             writer.writerow([now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S"), price])
-        print(f"[{now.strftime('%H:%M:%S')}] Success: Data logged: {price}")
+        log.info(f"Success: Data logged: {price}", extra={'price': price})
 
     def send_notification(self, current_price):
-        sender_email = os.getenv('EMAIL_USER')
-        password = os.getenv('EMAIL_PASS')
-        receiver_email = os.getenv('EMAIL_RECEIVER')
-
-        if not sender_email or not password:
-            print("[!] Email credentials missing in .env")
-            return
-
-        subject = f'🚨 Price Alert: {current_price}'
-        body = f"Price dropped to {current_price}! \nLink: {self.url}"
-
-        em = EmailMessage()
-        em['From'] = sender_email
-        em['To'] = receiver_email
-        em['Subject'] = subject
-        em.set_content(body)
-
-        context = ssl.create_default_context()
-        try:
-            with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as server:
-                server.login(sender_email, password)
-                server.sendmail(sender_email, receiver_email, em.as_string())
-            print("[v] Notification Email Sent!")
-        except Exception as e:
-            print(f"[!] Email failed: {e}")
+        # Shared dispatcher: persistent SMTP session, digests, retries and dedupe
+        if dispatcher.submit(Deal('Tracked product', current_price, self.url, self.target_price)):
+            log.info("Notification queued")
+        else:
+            log.info("Already notified at this price")
 
     def job(self):
-        print("\n--- Starting Cycle ---")
+        log.info("--- Starting Cycle ---")
         price = self.fetch_price()
         
         if price:
             self.log_data(price)
             if price <= self.target_price:
-                print("[$] Target met! Notifying...")
+                log.info("Target met! Notifying...")
                 self.send_notification(price)
             else:
-                print(f"[-] Price {price} is above target {self.target_price}.")
+                log.info(f"Price {price} is above target {self.target_price}.")
         else:
-            print("[!] Skipping this cycle.")
+            log.warning("Skipping this cycle.")
 
 def run_scheduler():
+    setup_logging()
     tracker = AmazonPriceTracker()
     tracker.job() # Run once immediately
     
     # Randomize check time to 60-80 minutes to avoid patterns
     schedule.every(60).to(80).minutes.do(tracker.job)
     
-    print("\n[-] Scheduler active (Checks every 60-80 mins). Ctrl+C to stop.")
+    log.info("Scheduler active (Checks every 60-80 mins). Ctrl+C to stop.")
     while True:
         schedule.run_pending()
         time.sleep(1)
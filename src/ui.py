@@ -1,12 +1,96 @@
 import streamlit as st
 import requests
 import pandas as pd
+import json
 import time
 
 # --- CONFIG ---
 API_URL = "http://127.0.0.1:8000"
 st.set_page_config(page_title="Amazon Tracker", page_icon="🛒", layout="wide")
 
+def fetch_products(deals_only=False):
+    """Follow the API's X-Next-Cursor pages. Returns None if the API errors."""
+    products, params = [], {"limit": 500, "at_or_below_target": deals_only}
+    while True:
+        res = requests.get(f"{API_URL}/products", params=params)
+        if res.status_code != 200:
+            return None
+        products.extend(res.json())
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            return products
+        params["after"] = cursor
+
+def fetch_history(product_ids, points=200, days=30):
+    """{product id (str): {"timestamp": [...], "price": [...]}} for many products in one request."""
+    series = {}
+    for start in range(0, len(product_ids), 1000):  # API accepts up to 1000 ids per call
+        ids = ",".join(str(pid) for pid in product_ids[start:start + 1000])
+        res = requests.get(f"{API_URL}/history", params={"ids": ids, "points": points, "days": days})
+        if res.status_code == 200:
+            series.update(res.json()["series"])
+    return series
+
+def load_snapshot():
+    """Full reload into session state. After this, only pushed deltas are applied."""
+    stats = requests.get(f"{API_URL}/stats").json()
+    products = fetch_products()
+    st.session_state.stats = stats
+    st.session_state.products = {p['id']: p for p in products or []}
+    st.session_state.history = fetch_history(list(st.session_state.products))
+    # Events after this id are replayed on the first /events connection
+    st.session_state.last_event_id = stats.get('events', {}).get('last_event_id', 0)
+
+def apply_event(kind, data):
+    state = st.session_state
+    if kind == 'price_change':
+        product = state.products.get(data['product_id'])
+        if product:
+            product['last_price'] = data['price']
+            product['last_check'] = data['checked_at']
+            series = state.history.setdefault(str(data['product_id']), {"timestamp": [], "price": []})
+            series['timestamp'].append(int(pd.Timestamp(data['checked_at']).timestamp() * 1000))
+            series['price'].append(data['price'])
+    elif kind == 'deal':
+        st.toast(f"💰 {data['title']} is at ₹{data['price']}!", icon="🟢")
+    elif kind == 'product_added':
+        state.products[data['product']['id']] = data['product']
+        state.stats['total_products'] = state.stats.get('total_products', 0) + 1
+    elif kind == 'product_deleted':
+        if state.products.pop(data['product_id'], None):
+            state.stats['total_products'] = state.stats.get('total_products', 1) - 1
+    elif kind == 'sweep':
+        state.stats['total_price_checks'] = state.stats.get('total_price_checks', 0) + data['checks_written']
+    elif kind in ('products_imported', 'resync'):
+        load_snapshot()
+
+def wait_for_events(timeout=60, quiet=2):
+    """Listen on /events until something happens (or `timeout`), apply the burst, return the count.
+    
+    The server sends a keep-alive every `quiet` seconds of silence, which marks the end of a burst.
+    """
+    params = {"heartbeat": quiet}
+    headers = {"Last-Event-ID": str(st.session_state.last_event_id)}
+    deadline = time.monotonic() + timeout
+    applied, event = 0, {}
+    with requests.get(f"{API_URL}/events", params=params, headers=headers, stream=True,
+                      timeout=(5, quiet + 10)) as res:
+        for line in res.iter_lines(decode_unicode=True):
+            if line.startswith(":"):  # keep-alive: stream went quiet
+                if applied or time.monotonic() > deadline:
+                    break
+            elif line:
+                key, _, value = line.partition(":")
+                event[key] = value.strip()
+            elif 'event' in event:
+                apply_event(event['event'], json.loads(event.get('data') or '{}'))
+                st.session_state.last_event_id = int(event['id'])
+                applied += 1
+                event = {}
+                if applied >= 500:
+                    break
+    return applied
+
 # --- CSS STYLING ---
 st.markdown("""
 <style>
@@ -48,9 +132,10 @@ st.title("🛒 Amazon Price Tracker Dashboard")
 
 # Top Stats Row
 try:
-    stats_req = requests.get(f"{API_URL}/stats")
-    if stats_req.status_code == 200:
-        stats = stats_req.json()
+    if 'stats' not in st.session_state:
+        load_snapshot()
+    if st.session_state.stats:
+        stats = st.session_state.stats
         col1, col2, col3 = st.columns(3)
         col1.metric("Total Products", stats.get('total_products', 0))
         col2.metric("Total Scans", stats.get('total_price_checks', 0))
@@ -69,55 +154,58 @@ st.divider()
 
 # --- MAIN DATA TABLE ---
 st.subheader("📦 Tracked Items")
+deals_only = st.toggle("Only show items at or below target")
 
-products_req = requests.get(f"{API_URL}/products")
-if products_req.status_code == 200:
-    products = products_req.json()
+products = list(st.session_state.products.values())
+if deals_only:
+    products = [p for p in products if p['last_price'] and p['last_price'] <= p['target_price']]
+history = st.session_state.history
+if products:
+    # Convert to DataFrame for nicer table
+    df = pd.DataFrame(products)
     
-    if products:
-        # Convert to DataFrame for nicer table
-        df = pd.DataFrame(products)
+    # UI Layout per product using Expanders
+    for index, row in df.iterrows():
+        last_price = row['last_price'] if row['last_price'] else 0
+        target = row['target_price']
         
-        # UI Layout per product using Expanders
-        for index, row in df.iterrows():
-            last_price = row['last_price'] if row['last_price'] else 0
-            target = row['target_price']
+        # Determine Color Status
+        if last_price > 0 and last_price <= target:
+            status_color = "🟢 **BUY NOW!**"
+        elif last_price == 0:
+            status_color = "🟡 Checking..."
+        else:
+            status_color = "🔴 Watch"
+
+        with st.expander(f"{status_color} {row['title']} - ₹{last_price} (Target: ₹{target})"):
+            c1, c2 = st.columns([2, 1])
             
-            # Determine Color Status
-            if last_price > 0 and last_price <= target:
-                status_color = "🟢 **BUY NOW!**"
-            elif last_price == 0:
-                status_color = "🟡 Checking..."
-            else:
-                status_color = "🔴 Watch"
-
-            with st.expander(f"{status_color} {row['title']} - ₹{last_price} (Target: ₹{target})"):
-                c1, c2 = st.columns([2, 1])
+            with c1:
+                st.caption(f"Last Checked: {row.get('last_check', 'Never')}")
+                st.markdown(f"[View on Amazon]({row['url']})")
                 
-                with c1:
-                    st.caption(f"Last Checked: {row.get('last_check', 'Never')}")
-                    st.markdown(f"[View on Amazon]({row['url']})")
-                    
-                    # Fetch History for Chart
-                    hist_req = requests.get(f"{API_URL}/products/{row['id']}/history")
-                    if hist_req.status_code == 200:
-                        hist_data = hist_req.json()
-                        if hist_data:
-                            hist_df = pd.DataFrame(hist_data)
-                            hist_df['timestamp'] = pd.to_datetime(hist_df['timestamp'])
-                            st.line_chart(hist_df, x='timestamp', y='price')
-                        else:
-                            st.info("No price history yet.")
-
-                with c2:
-                    st.metric("Current Price", f"₹{last_price}", delta=f"{target - last_price} vs Target")
-                    if st.button("Stop Tracking", key=f"del_{row['id']}"):
-                        requests.delete(f"{API_URL}/products/{row['id']}")
-                        st.rerun()
-    else:
-        st.info("No products tracked yet. Add one via the sidebar!")
+                # Series from the snapshot, extended by price_change events
+                hist_data = history.get(str(row['id']))
+                if hist_data:
+                    hist_df = pd.DataFrame(hist_data)
+                    hist_df['timestamp'] = pd.to_datetime(hist_df['timestamp'], unit='ms')
+                    st.line_chart(hist_df, x='timestamp', y='price')
+                else:
+                    st.info("No price history yet.")
+
+            with c2:
+                st.metric("Current Price", f"₹{last_price}", delta=f"{target - last_price} vs Target")
+                if st.button("Stop Tracking", key=f"del_{row['id']}"):
+                    requests.delete(f"{API_URL}/products/{row['id']}")
+                    apply_event('product_deleted', {'product_id': row['id']})  # don't wait for the echo
+                    st.rerun()
+else:
+    st.info("No products tracked yet. Add one via the sidebar!")
 
-# Auto-refresh mechanism (every 60 seconds)
-if st.checkbox("Auto-refresh data (60s)", value=True):
-    time.sleep(60)
+# Live updates: block on the event stream, redraw only when the API pushes a change
+if st.checkbox("Live updates", value=True):
+    try:
+        wait_for_events()
+    except requests.RequestException:
+        time.sleep(5)  # API restarting; reconnect on the next run
     st.rerun()
@@ -0,0 +1,144 @@
+"""Queue worker: claims product checks from ``check_tasks`` and runs them.
+
+Start as many as you like, on any machine that can reach the database:
+
+    python -m src.worker                 # scrape queued checks
+    python -m src.worker --coordinate    # also enqueue due products (if no API runs with SCHEDULER_MODE=queue)
+
+Rate limits and CAPTCHA cooldowns are per process, so size SCRAPE_RATE for
+one worker's share of the traffic. Live events and alert dedupe go through
+the database, so the API's /events and a single alert per deal work no
+matter which worker checked the product. Set METRICS_PORT to serve this worker's
+Prometheus metrics.
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+from dotenv import load_dotenv
+from prometheus_client import start_http_server
+
+from .alerts import dispatcher
+from .checker import check_products, load_products
+from .database import SessionLocal, engine
+from .events import bus, store_event
+from .logs import setup_logging
+from .models import init_db
+from .scraper import close_client, shutdown_parse_pool
+from .taskqueue import complete, coordinate, heartbeat, lease, lease_seconds
+
+log = logging.getLogger(__name__)
+
+
+class _Heartbeat(threading.Thread):
+    """Keeps this worker's leases alive while a batch is being checked."""
+
+    def __init__(self, owner: str, product_ids: List[int]):
+        super().__init__(name='lease-heartbeat', daemon=True)
+        self.owner = owner
+        self.product_ids = product_ids
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(lease_seconds() / 3):
+            db = SessionLocal()
+            try:
+                heartbeat(db, self.owner, self.product_ids)
+            except Exception as e:
+                log.warning(f"Lease heartbeat failed: {e}")
+            finally:
+                db.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+        self.join()
+
+
+class Worker:
+    def __init__(self, owner: Optional[str] = None, batch_size: Optional[int] = None,
+                 idle_seconds: float = 5.0, coordinate_every: Optional[float] = None):
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.batch_size = batch_size or int(os.getenv('TASK_BATCH_SIZE', 50))
+        self.idle_seconds = idle_seconds
+        self.coordinate_every = coordinate_every
+        self.stopping = threading.Event()
+        self.checked = 0
+
+    def run_once(self) -> int:
+        """Claim and check one batch. Returns the number of products checked."""
+        db = SessionLocal()
+        try:
+            product_ids = lease(db, self.owner, self.batch_size)
+        finally:
+            db.close()
+        if not product_ids:
+            return 0
+
+        with _Heartbeat(self.owner, product_ids):
+            products, history = load_products(product_ids=product_ids)
+            check_products(products, history)
+
+        db = SessionLocal()
+        try:
+            complete(db, self.owner, product_ids)
+        finally:
+            db.close()
+        self.checked += len(product_ids)
+        return len(product_ids)
+
+    def run(self):
+        log.info(f"Worker {self.owner} started (batch {self.batch_size})")
+        next_tick = 0.0
+        while not self.stopping.is_set():
+            if self.coordinate_every and time.monotonic() >= next_tick:
+                coordinate()
+                next_tick = time.monotonic() + self.coordinate_every
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                log.exception(f"Worker error: {e}")
+            self.stopping.wait(self.idle_seconds)
+        log.info(f"Worker {self.owner} stopped after {self.checked} checks")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run queued product price checks.")
+    parser.add_argument('--batch', type=int, help="tasks claimed per lease (TASK_BATCH_SIZE, default 50)")
+    parser.add_argument('--idle', type=float, default=5.0, help="seconds to wait when the queue is empty")
+    parser.add_argument('--coordinate', action='store_true', help="also enqueue due products every tick")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    setup_logging()
+    if os.getenv('METRICS_PORT'):
+        start_http_server(int(os.getenv('METRICS_PORT')))
+    init_db(engine)
+    bus.outbox = store_event              # relayed to /events by the API processes
+    dispatcher.session_factory = SessionLocal  # one alert per deal across workers
+    tick = int(os.getenv('SCHEDULER_TICK_MINUTES', 5)) * 60
+    worker = Worker(batch_size=args.batch, idle_seconds=args.idle,
+                    coordinate_every=tick if args.coordinate else None)
+    # Finish the current batch on Ctrl+C / SIGTERM instead of abandoning its leases
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: worker.stopping.set())
+    try:
+        worker.run()
+    finally:
+        close_client()
+        shutdown_parse_pool()
+        dispatcher.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import insert, select, update
+
+from .analytics import update_stats
+from .database import SessionLocal
+from .history import history_mode, record_aggregates, write_changes
+from .metrics import DB_CHECKS_WRITTEN, DB_FLUSH_SECONDS, DB_ROWS_WRITTEN
+from .models import Product, PriceLog
+from .scraper import ScrapeResult
+from .stats import counters
+from .strategies import strategies, write_strategy_stats
+
+
+class PriceWriter:
+    """Collects sweep results and writes them in chunks.
+
+    Every ``batch_size`` results the pending rows are flushed in one short
+    transaction: price_history rows (per HISTORY_MODE), the hourly/daily
+    rollups, the product_stats analytics, and a bulk UPDATE of products by
+    primary key. A failure later in the sweep only loses the current chunk.
+    Use as a context manager so the tail is flushed on exit.
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int | None = None,
+                 mode: str | None = None):
+        self.session_factory = session_factory
+        self.batch_size = batch_size or int(os.getenv('WRITE_BATCH_SIZE', 200))
+        self.mode = mode or history_mode()
+        self.pending_logs = []
+        self.pending_repeats = []
+        self.pending_observations = []
+        self.pending_updates = []
+        self.rows_written = 0    # price_history rows inserted
+        self.checks_written = 0  # price checks recorded; more than rows when runs are extended
+        self.flush_count = 0
+        self.flush_seconds = 0.0
+
+    def add(self, result: ScrapeResult, last_price: float | None = None, checked_at: datetime | None = None,
+            **product_fields):
+        """Queue the DB changes for one ScrapeResult (keyed by product id).
+
+        ``last_price`` is the product's price before this check; it stands in
+        for the price of 'unchanged' results, which count as checks like any
+        parsed price but only extend the latest history row. Extra
+        ``product_fields`` (e.g. scheduling columns) are written to the product
+        whatever the outcome.
+        """
+        checked_at = checked_at or datetime.utcnow()
+        if result.outcome == 'unchanged':
+            self.pending_updates.append({'id': result.key, 'last_check': checked_at, **product_fields})
+            if last_price:
+                self.pending_repeats.append((result.key, last_price, checked_at))
+                self.pending_observations.append((result.key, last_price, checked_at))
+        elif result.price:
+            self.pending_updates.append({
+                'id': result.key,
+                'last_price': result.price,
+                'last_check': checked_at,
+                'etag': result.etag,
+                'last_modified': result.last_modified,
+                'price_hash': result.price_hash,
+                'price_strategy': result.extraction.strategy if result.extraction else None,
+                **product_fields,
+            })
+            self.pending_logs.append({'product_id': result.key, 'price': result.price, 'timestamp': checked_at})
+            self.pending_observations.append((result.key, result.price, checked_at))
+        elif product_fields:
+            self.pending_updates.append({'id': result.key, **product_fields})
+        else:
+            return
+
+        if len(self.pending_updates) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write everything pending in a single transaction."""
+        if not self.pending_updates:
+            return
+        start = time.perf_counter()
+        db = self.session_factory()
+        drained = {}
+        try:
+            self._drop_deleted(db)
+            inserted = 0
+            if self.mode == 'changes':
+                if self.pending_observations:
+                    inserted = write_changes(db, self.pending_observations)
+            else:
+                if self.pending_logs:
+                    db.execute(insert(PriceLog), self.pending_logs)
+                    inserted = len(self.pending_logs)
+                if self.pending_repeats:  # no redundant full row for a 304 / unchanged page
+                    inserted += write_changes(db, self.pending_repeats)
+            record_aggregates(db, self.pending_observations)
+            update_stats(db, self.pending_observations)
+            if self.pending_updates:
+                db.execute(update(Product), self.pending_updates)
+            drained = write_strategy_stats(db)
+            db.commit()
+            counters.add('total_price_checks', len(self.pending_observations))
+        except Exception:
+            db.rollback()
+            strategies.restore(drained)  # written again by the next flush
+            raise
+        finally:
+            db.close()
+        elapsed = time.perf_counter() - start
+        self.rows_written += inserted
+        self.checks_written += len(self.pending_observations)
+        self.flush_count += 1
+        self.flush_seconds += elapsed
+        DB_FLUSH_SECONDS.observe(elapsed)
+        DB_ROWS_WRITTEN.inc(inserted)
+        DB_CHECKS_WRITTEN.inc(len(self.pending_observations))
+        self.pending_logs, self.pending_repeats, self.pending_observations, self.pending_updates = [], [], [], []
+
+    def _drop_deleted(self, db):
+        """Skip products deleted through the API while the sweep was running."""
+        ids = {row['id'] for row in self.pending_updates}
+        live = set(db.scalars(select(Product.id).where(Product.id.in_(ids))))
+        if live == ids:
+            return
+        self.pending_logs = [row for row in self.pending_logs if row['product_id'] in live]
+        self.pending_repeats = [obs for obs in self.pending_repeats if obs[0] in live]
+        self.pending_observations = [obs for obs in self.pending_observations if obs[0] in live]
+        self.pending_updates = [row for row in self.pending_updates if row['id'] in live]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
@@ -0,0 +1,58 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import Product, init_db  # noqa: E402
+from src.scraper import ScrapeResult  # noqa: E402
+from src.writer import PriceWriter  # noqa: E402
+
+PRODUCTS = 4
+START = datetime(2026, 3, 1, 9, 40)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tracker.db'}")
+    init_db(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.execute(insert(Product), [{'id': pid, 'title': f"Product {pid}", 'url': f"https://example.com/dp/{pid}",
+                                      'target_price': 50.0} for pid in range(1, PRODUCTS + 1)])
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+def run_sweeps(session_factory, mode: str, sweeps: int = 60, every: timedelta = timedelta(minutes=7),
+               start: datetime = START, failures: bool = True):
+    """Feed ``sweeps`` rounds of checks through PriceWriter the way the checker does.
+
+    Prices hold for a few rounds then move, and most repeats come back as
+    'unchanged' (a 304), so runs cross hour and day boundaries. With
+    ``failures`` some checks fail, leaving gaps inside runs.
+    Returns the writers' (rows_written, checks_written) totals.
+    """
+    last_price, rows, checks = {}, 0, 0
+    for sweep in range(sweeps):
+        checked_at = start + sweep * every
+        with PriceWriter(session_factory=session_factory, batch_size=3, mode=mode) as writer:
+            for pid in range(1, PRODUCTS + 1):
+                price = 40.0 + pid + (sweep // (pid + 2)) % 3 * 2.5
+                key = (sweep + pid) % 5
+                if key == 0 and failures:
+                    result = ScrapeResult(pid, '', None, 'network')
+                elif price == last_price.get(pid) and key != 1:
+                    result = ScrapeResult(pid, '', None, 'unchanged', status=304)
+                else:
+                    result = ScrapeResult(pid, '', price, 'ok', status=200)
+                writer.add(result, last_price=last_price.get(pid), checked_at=checked_at)
+                if result.price:
+                    last_price[pid] = result.price
+        rows, checks = rows + writer.rows_written, checks + writer.checks_written
+    return rows, checks
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from src.analytics import rebuild_stats
+from src.importer import import_csv
+from src.models import PriceLog, ProductStats
+from src.stats import counters
+
+from conftest import PRODUCTS, run_sweeps
+
+COLUMNS = ['last_price', 'all_time_low', 'low_at', 'all_time_high', 'avg_7d', 'avg_30d',
+           'pct_from_low', 'checks', 'drops', 'drop_frequency', 'deal_score']
+
+
+def _stats(db):
+    rows = db.scalars(select(ProductStats).order_by(ProductStats.product_id)).all()
+    return {row.product_id: {name: getattr(row, name) for name in COLUMNS} for row in rows}
+
+
+@pytest.mark.parametrize('mode', ['full', 'changes'])
+def test_rebuilt_stats_match_incremental(session_factory, mode):
+    # Five-hourly checks over two weeks, so the 7-day window cuts through the history
+    counters.load({'total_price_checks': 0})
+    run_sweeps(session_factory, mode, sweeps=70, every=timedelta(hours=5),
+               start=datetime.utcnow() - timedelta(days=14, hours=12))
+    with session_factory() as db:
+        incremental = _stats(db)
+        assert rebuild_stats(db) == PRODUCTS
+        rebuilt = _stats(db)
+        recounted = db.scalar(select(func.sum(func.coalesce(PriceLog.checks, 1))))  # what /stats loads
+    assert incremental[1]['avg_7d'] != incremental[1]['avg_30d']
+    assert rebuilt == incremental
+    assert counters.snapshot()['total_price_checks'] == recounted == sum(s['checks'] for s in rebuilt.values())
+
+
+def test_import_refreshes_stats(session_factory, tmp_path):
+    counters.load({'total_price_checks': 0})
+    run_sweeps(session_factory, 'changes', sweeps=20, every=timedelta(hours=5),
+               start=datetime.utcnow() - timedelta(days=5))
+    # Older history with a new low, imported after the sweeps already built the stats
+    path = tmp_path / 'export.csv'
+    path.write_text('product_id,timestamp,price,last_seen,checks\n'
+                    '1,2026-01-01T08:00:00,30.0,2026-01-01T20:00:00,3\n'
+                    '1,2026-01-02T08:00:00,45.0,,1\n')
+    before = counters.snapshot()['total_price_checks']
+    with session_factory() as db:
+        assert import_csv(db, [str(path)]) == (2, 2)
+        imported = _stats(db)
+        rebuild_stats(db)
+        assert imported == _stats(db)
+    assert imported[1]['all_time_low'] == 30.0
+    assert imported[1]['low_at'] == datetime(2026, 1, 1, 8)
+    assert counters.snapshot()['total_price_checks'] == before + 4
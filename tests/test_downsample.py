@@ -0,0 +1,19 @@
+import pytest
+
+from src.downsample import METHODS, downsample
+
+
+@pytest.mark.parametrize('method', METHODS)
+@pytest.mark.parametrize('points', [1, 2, 3, 4, 5, 50])
+def test_never_more_than_points(method, points):
+    xs = list(range(1000))
+    ys = [(i * 37) % 101 for i in xs]
+    keep = downsample(xs, ys, points, method)
+    assert 0 < len(keep) <= points
+    assert keep[-1] == len(xs) - 1
+    assert keep == sorted(set(keep))
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_short_series_kept_whole(method):
+    assert downsample([1, 2, 3], [5, 4, 6], 200, method) == [0, 1, 2]
@@ -0,0 +1,63 @@
+import asyncio
+
+from src.alerts import AlertDispatcher, Deal
+from src.events import EventBus, EventTail, store_event
+
+
+def _received(bus, last_event_id):
+    async def drain():
+        subscription = bus.subscribe(last_event_id)
+        events = []
+        while (event := await subscription.get(0.01)) is not None:
+            events.append(event)
+        return events
+    return asyncio.run(drain())
+
+
+def test_reconnect_replays_missed_events():
+    bus = EventBus()
+    first = bus.publish('sweep').id
+    bus.publish('deal')
+    bus.publish('sweep')
+    assert [e.type for e in _received(bus, first)] == ['deal', 'sweep']
+    assert _received(bus, first + 2) == []
+
+
+def test_reconnect_after_restart_resyncs():
+    old = EventBus()
+    for _ in range(50):
+        last = old.publish('sweep').id
+    restarted = EventBus()
+    restarted._seq = old._seq - 1000  # e.g. the clock went back
+    assert [e.type for e in _received(restarted, last)] == ['resync']
+
+    restarted = EventBus()
+    restarted.publish('deal')
+    assert [e.type for e in _received(restarted, last)] == ['resync']
+
+
+def test_worker_events_reach_the_api_bus(session_factory):
+    api_bus = EventBus()
+    tail = EventTail(api_bus)
+    assert tail.poll(session_factory) == 0  # starts from the newest row
+    store_event('price_change', {'product_id': 1, 'price': 45.0}, session_factory)
+    store_event('sweep', {'products': 1, 'checks_written': 1}, session_factory)
+
+    assert tail.poll(session_factory) == 2
+    assert tail.poll(session_factory) == 0
+    assert [(e.type, e.data) for e in api_bus._recent] == [
+        ('price_change', {'product_id': 1, 'price': 45.0}), ('sweep', {'products': 1, 'checks_written': 1})]
+
+
+def test_alert_dedupe_is_shared_between_workers(session_factory, monkeypatch):
+    monkeypatch.setenv('ALERT_DIGEST_SECONDS', '0')
+    monkeypatch.delenv('EMAIL_USER', raising=False)  # deliveries are skipped
+    first, second = AlertDispatcher(), AlertDispatcher()
+    first.session_factory = second.session_factory = session_factory
+    try:
+        assert first.submit(Deal('Kettle', 45.0, 'https://example.com/dp/1'))
+        assert not second.submit(Deal('Kettle', 45.0, 'https://example.com/dp/1'))
+        assert second.submit(Deal('Kettle', 42.0, 'https://example.com/dp/1'))  # fell further
+    finally:
+        first.close()
+        second.close()
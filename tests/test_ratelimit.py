@@ -0,0 +1,34 @@
+import pytest
+
+from src.ratelimit import HostThrottle
+
+
+def _throttle():
+    return HostThrottle(rate=1.0, burst=5, min_rate=0.1, max_rate=5.0, cooldown=900, max_cooldown=7200)
+
+
+@pytest.mark.parametrize('outcome, status, rate', [
+    ('ok', 200, 1.1),
+    ('unchanged', 304, 1.1),
+    ('http_error', 429, 0.5),
+    ('http_error', 500, 0.5),
+    ('http_error', 503, 0.5),
+    ('blocked', 200, 0.5),
+    ('http_error', 404, 1.0),
+    ('http_error', 403, 1.0),
+    ('parse_fail', 200, 1.0),
+    ('network', None, 1.0),
+])
+def test_outcome_moves_rate(outcome, status, rate):
+    throttle = _throttle()
+    throttle.record(outcome, status)
+    assert throttle.rate == pytest.approx(rate)
+
+
+def test_neutral_outcomes_keep_captcha_strikes():
+    throttle = _throttle()
+    throttle.record('captcha', 200)
+    throttle.record('parse_fail', 200)
+    assert throttle.strikes == 1
+    throttle.record('ok', 200)
+    assert throttle.strikes == 0
@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import select
+
+from src.extract import Extraction
+from src.models import ExtractionStat
+from src.scraper import ScrapeResult
+from src.strategies import strategies
+from src.writer import PriceWriter
+
+
+def _stored(db):
+    return {(row.layout, row.strategy): (row.hits, row.attempts) for row in db.scalars(select(ExtractionStat))}
+
+
+def test_counts_survive_a_failed_flush(session_factory):
+    strategies.drain()
+    strategies.record(Extraction(99.0, 'css:price', 'classic', misses=['json_ld']))
+
+    def failing_commit():
+        db = session_factory()
+        db.commit = lambda: (_ for _ in ()).throw(RuntimeError("disk full"))
+        return db
+
+    writer = PriceWriter(session_factory=failing_commit, mode='full')
+    writer.add(ScrapeResult(1, '', 99.0, 'ok', status=200))
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    with session_factory() as db:
+        assert _stored(db) == {}
+
+    writer.session_factory = session_factory
+    writer.flush()
+    with session_factory() as db:
+        assert _stored(db) == {('classic', 'css:price'): (1, 1), ('classic', 'json_ld'): (0, 1)}